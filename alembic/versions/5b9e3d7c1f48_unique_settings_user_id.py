@@ -0,0 +1,31 @@
+"""unique settings user id
+
+Revision ID: 5b9e3d7c1f48
+Revises: c4e8b1f0a2d6
+Create Date: 2026-10-17 15:21:44.630871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9e3d7c1f48'
+down_revision: Union[str, Sequence[str], None] = 'c4e8b1f0a2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ON CONFLICT (user_id) needs a unique index; every user already has at most one settings row
+    op.drop_index(op.f('ix_liquid_monitor_settings_user_id'), table_name='liquid_monitor_settings')
+    op.create_unique_constraint('uq_liquid_monitor_settings_user_id', 'liquid_monitor_settings', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_liquid_monitor_settings_user_id', 'liquid_monitor_settings', type_='unique')
+    op.create_index(op.f('ix_liquid_monitor_settings_user_id'), 'liquid_monitor_settings', ['user_id'], unique=False)
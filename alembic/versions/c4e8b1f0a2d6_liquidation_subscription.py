@@ -0,0 +1,88 @@
+"""liquidation subscription
+
+Revision ID: c4e8b1f0a2d6
+Revises: 7a41c2e9d5f3
+Create Date: 2026-10-17 14:03:27.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8b1f0a2d6'
+down_revision: Union[str, Sequence[str], None] = '7a41c2e9d5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 1000
+
+settings_table = sa.table(
+    'liquid_monitor_settings',
+    sa.column('id', sa.Integer()),
+    sa.column('user_id', sa.Integer()),
+    sa.column('exchange', sa.String()),
+    sa.column('pairs', sa.JSON()),
+    sa.column('threshold', sa.Float()),
+)
+subscription_table = sa.table(
+    'liquidation_subscription',
+    sa.column('user_id', sa.Integer()),
+    sa.column('exchange', sa.String()),
+    sa.column('symbol', sa.String()),
+    sa.column('threshold', sa.Float()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('liquidation_subscription',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('exchange', sa.String(length=64), nullable=False),
+    sa.Column('symbol', sa.String(length=64), nullable=False),
+    sa.Column('threshold', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'exchange', 'symbol', name='uq_liquidation_subscription_user_exchange_symbol')
+    )
+    op.create_index('ix_liquidation_subscription_exchange_symbol_threshold', 'liquidation_subscription', ['exchange', 'symbol', 'threshold'], unique=False)
+    op.create_index(op.f('ix_liquid_monitor_settings_user_id'), 'liquid_monitor_settings', ['user_id'], unique=False)
+    op.create_index(op.f('ix_liquid_monitor_settings_enabled'), 'liquid_monitor_settings', ['enabled'], unique=False)
+
+    # Backfill one row per (user, exchange, symbol) from the JSON pairs,
+    # normalised the way the monitor compares them
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(settings_table)
+            .where(settings_table.c.id > last_id)
+            .order_by(settings_table.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        subscriptions = []
+        for row in rows:
+            exchange = (row.exchange or '').strip().lower()
+            symbols = dict.fromkeys((pair or '').strip().upper() for pair in row.pairs or [])
+            subscriptions.extend(
+                {'user_id': row.user_id, 'exchange': exchange, 'symbol': symbol, 'threshold': row.threshold or 0.0}
+                for symbol in symbols
+                if symbol
+            )
+        if subscriptions:
+            op.bulk_insert(subscription_table, subscriptions)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_liquid_monitor_settings_enabled'), table_name='liquid_monitor_settings')
+    op.drop_index(op.f('ix_liquid_monitor_settings_user_id'), table_name='liquid_monitor_settings')
+    op.drop_index('ix_liquidation_subscription_exchange_symbol_threshold', table_name='liquidation_subscription')
+    op.drop_table('liquidation_subscription')
@@ -0,0 +1,51 @@
+"""
+Microbenchmark of the exchange frame decoders.
+
+Replays the sample frames in benchmarks/frames/ through every installed
+decoder backend and reports frames/s and µs/frame per exchange.
+
+    python -m benchmarks.bench_decoders [--repeat 200]
+"""
+import argparse
+import time
+from pathlib import Path
+
+from bot.services.liquidation_monitor.decoders import BACKENDS, get_decoders
+from bot.services.liquidation_monitor.events import Exchange
+
+
+FRAMES_DIR = Path(__file__).parent / "frames"
+
+
+def load_frames(exchange: Exchange) -> list[str]:
+    return (FRAMES_DIR / f"{exchange.value}.jsonl").read_text().splitlines()
+
+
+def bench(decode, frames: list[str], repeat: int) -> tuple[float, int]:
+    events = sum(len(decode(frame)) for frame in frames)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            decode(frame)
+    return time.perf_counter() - start, events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the recorded frames")
+    args = parser.parse_args()
+
+    print(f"{'exchange':<10}{'backend':<10}{'frames/s':>12}{'µs/frame':>10}{'events':>8}")
+    for exchange in Exchange:
+        frames = load_frames(exchange)
+        for backend in BACKENDS:
+            elapsed, events = bench(get_decoders(backend)[exchange], frames, args.repeat)
+            total = len(frames) * args.repeat
+            print(
+                f"{exchange.label:<10}{backend:<10}{total / elapsed:>12,.0f}"
+                f"{elapsed / total * 1e6:>10.2f}{events:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
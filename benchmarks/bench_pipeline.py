@@ -0,0 +1,190 @@
+"""
+Throughput and latency benchmark of the liquidation pipeline.
+
+Generates a synthetic liquidation stream and drives it through
+process_liquidation against synthetic subscriber populations, with alerts
+delivered to an in-memory sink instead of Telegram through a send queue
+sized like production (TELEGRAM_QUEUE_SIZE), so latency includes
+backpressure from a full send queue but not Telegram rate limits.
+
+Symbols are drawn from a Zipf distribution (--skew 0 for uniform), both for
+the stream and for the pairs users watch. For every population it reports
+events/s, p50/p99 process_liquidation latency per event, sends/s and the
+peak RSS of the process so far; populations run smallest first so the peak
+belongs to the largest one run. --output saves the results as JSON to
+compare runs across commits.
+
+    python -m benchmarks.bench_pipeline [--subscribers 1000 10000 100000] [--events 10000] [--rate 0]
+                                        [--symbols 200] [--skew 1.1] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import quantiles
+
+from benchmarks.common import SinkBot
+from bot.config.base import settings
+from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+from bot.services.liquidation_monitor.delivery import TelegramDelivery
+from bot.services.liquidation_monitor.events import Exchange, LiquidationEvent, Side
+from bot.services.liquidation_monitor.liquidation_starter import process_liquidation
+from bot.services.liquidation_monitor.subscriptions import subscription_index
+
+
+TOP_SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT", "BNBUSDT", "ADAUSDT", "LINKUSDT"]
+THRESHOLDS = (10_000.0, 50_000.0, 100_000.0, 500_000.0, 1_000_000.0)
+
+
+def make_symbols(count: int) -> list[str]:
+    return (TOP_SYMBOLS + [f"SYM{i}USDT" for i in range(count)])[:count]
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    return [1 / rank ** skew for rank in range(1, count + 1)]
+
+
+def make_subscribers(
+    count: int, symbols: list[str], weights: list[float], pairs_per_user: int, rng: random.Random
+) -> list[LiquidMonitorSettingsDB]:
+    exchanges = [exchange.value for exchange in Exchange]
+    return [
+        LiquidMonitorSettingsDB(
+            user_id=user_id,
+            enabled=True,
+            exchange=exchanges[user_id % len(exchanges)],
+            pairs=sorted(set(rng.choices(symbols, weights, k=pairs_per_user))),
+            threshold=rng.choice(THRESHOLDS),
+        )
+        for user_id in range(1, count + 1)
+    ]
+
+
+def make_events(count: int, symbols: list[str], weights: list[float], rng: random.Random) -> list[LiquidationEvent]:
+    exchanges = list(Exchange)
+    sides = list(Side)
+    return [
+        LiquidationEvent.create(
+            rng.choice(exchanges),
+            symbol,
+            rng.choice(sides),
+            100.0,
+            # USD value around a median of 10k with a long tail of whales
+            rng.lognormvariate(4.6, 1.5),
+            timestamp,
+        )
+        for timestamp, symbol in enumerate(rng.choices(symbols, weights, k=count), 1)
+    ]
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def bench(subscribers: list[LiquidMonitorSettingsDB], events: list[LiquidationEvent], rate: float) -> dict:
+    subscription_index.load(subscribers)
+    bot = SinkBot()
+    delivery = TelegramDelivery(
+        bot,  # type: ignore[arg-type]
+        workers=settings.TELEGRAM_WORKERS,
+        global_rate=1e9,
+        chat_rate=1e9,
+        queue_size=settings.TELEGRAM_QUEUE_SIZE,
+    )
+    delivery.start()
+
+    latencies = []
+    started = time.perf_counter()
+    for i, event in enumerate(events):
+        if rate:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        t0 = time.perf_counter()
+        await process_liquidation(delivery, event)
+        latencies.append(time.perf_counter() - t0)
+    processed = time.perf_counter() - started
+    await delivery.join()
+    elapsed = time.perf_counter() - started
+    await delivery.close()
+
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "subscribers": len(subscribers),
+        "events": len(events),
+        "sends": bot.sent,
+        "events_per_s": len(events) / processed,
+        "p50_us": percentiles[49] * 1e6,
+        "p99_us": percentiles[98] * 1e6,
+        "sends_per_s": bot.sent / elapsed,
+        "elapsed_s": elapsed,
+        "peak_rss_bytes": peak_rss(),
+    }
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    rng = random.Random(args.seed)
+    symbols = make_symbols(args.symbols)
+    weights = zipf_weights(len(symbols), args.skew)
+    events = make_events(args.events, symbols, weights, rng)
+
+    print(f"{'subscribers':>12}{'events/s':>12}{'p50 µs':>10}{'p99 µs':>10}{'sends':>12}{'sends/s':>12}{'peak MiB':>10}")
+    results = []
+    for count in sorted(args.subscribers):
+        subscribers = make_subscribers(count, symbols, weights, args.pairs_per_user, rng)
+        result = await bench(subscribers, events, args.rate)
+        results.append(result)
+        print(
+            f"{result['subscribers']:>12,}{result['events_per_s']:>12,.0f}{result['p50_us']:>10.1f}"
+            f"{result['p99_us']:>10.1f}{result['sends']:>12,}{result['sends_per_s']:>12,.0f}"
+            f"{result['peak_rss_bytes'] / 2**20:>10.1f}"
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="subscriber populations to benchmark")
+    parser.add_argument("--events", type=int, default=10_000, help="liquidations per population")
+    parser.add_argument("--rate", type=float, default=0.0, help="events per second, 0 = as fast as possible")
+    parser.add_argument("--symbols", type=int, default=200, help="distinct symbols in the stream")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of symbol popularity, 0 = uniform")
+    parser.add_argument("--pairs-per-user", type=int, default=5, help="symbols each subscriber watches")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic stream and population")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+class SinkBot:
+    """Stands in for the Telegram bot and counts the alerts it is given."""
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.chats: set[int] = set()
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        self.sent += 1
+        self.chats.add(chat_id)
@@ -0,0 +1,407 @@
+"""
+Local stand-in for the Binance, OKX and BitMEX liquidation websockets.
+
+Speaks enough of each protocol for the listeners in liquidation_starter:
+the Binance all-market forceOrder stream and the combined-stream endpoint
+with live SUBSCRIBE/UNSUBSCRIBE, the OKX liquidation-orders subscribe
+handshake and the BitMEX welcome/subscribe/partial sequence, plus each
+exchange's keep-alive requests. Every connection streams randomised
+liquidations at --rate frames per second, or cycles the frames in
+--frames DIR/<exchange>.jsonl verbatim, and can be made to disconnect,
+stall or send truncated frames.
+
+    python -m benchmarks.fake_exchange [--port 8765] [--rate 1000] [--frames benchmarks/frames]
+                                       [--disconnect-after 30] [--stall-every 60 --stall-for 10]
+                                       [--malformed 0.01]
+
+Point the bot at it with:
+
+    BINANCE_WS_URLS='["ws://127.0.0.1:8765/ws/!forceOrder@arr"]'
+    BINANCE_COMBINED_WS_URLS='["ws://127.0.0.1:8765/stream"]'
+    OKX_WS_URLS='["ws://127.0.0.1:8765/ws/v5/public"]'
+    BITMEX_WS_URLS='["ws://127.0.0.1:8765/realtime?subscribe=liquidation"]'
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from websockets.asyncio.server import Server, ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+from bot.services.liquidation_monitor.events import Exchange
+
+
+FIREHOSE = "!forceOrder@arr"
+TICK = 0.01
+
+SYMBOLS = {
+    Exchange.BINANCE: ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT", "BNBUSDT"],
+    Exchange.OKX: ["BTC-USD-251226", "ETH-USD-251226", "BTC-USDT-SWAP", "ETH-USDT-SWAP"],
+    Exchange.BITMEX: ["XBTUSD", "ETHUSD", "XBTUSDT", "SOLUSDT"],
+}
+
+
+def binance_payload(rng: random.Random, symbol: str) -> dict[str, Any]:
+    now = int(time.time() * 1000)
+    price = f"{rng.uniform(1, 100_000):.4f}"
+    qty = f"{rng.uniform(0.001, 50):.3f}"
+    return {
+        "e": "forceOrder",
+        "E": now,
+        "o": {
+            "s": symbol, "S": rng.choice(("BUY", "SELL")), "o": "LIMIT", "f": "IOC",
+            "q": qty, "p": price, "ap": price, "X": "FILLED", "l": qty, "z": qty, "T": now,
+        },
+    }
+
+
+def okx_payload(rng: random.Random, symbol: str) -> dict[str, Any]:
+    side, pos_side = rng.choice((("buy", "short"), ("sell", "long")))
+    return {
+        "arg": {"channel": "liquidation-orders", "instType": "FUTURES"},
+        "data": [{
+            "details": [{
+                "bkLoss": "0", "bkPx": f"{rng.uniform(1, 100_000):.1f}", "ccy": "", "posSide": pos_side,
+                "side": side, "sz": str(rng.randint(1, 1000)), "ts": str(int(time.time() * 1000)),
+            }],
+            "instId": symbol,
+            "instType": "FUTURES",
+        }],
+    }
+
+
+def bitmex_payload(rng: random.Random, symbol: str) -> dict[str, Any]:
+    return {
+        "table": "liquidation",
+        "action": "insert",
+        "data": [{
+            "orderID": str(uuid.UUID(int=rng.getrandbits(128))),
+            "symbol": symbol,
+            "side": rng.choice(("Buy", "Sell")),
+            "price": round(rng.uniform(1, 100_000), 1),
+            "leavesQty": rng.randint(1, 100_000),
+        }],
+    }
+
+
+PAYLOADS = {
+    Exchange.BINANCE: binance_payload,
+    Exchange.OKX: okx_payload,
+    Exchange.BITMEX: bitmex_payload,
+}
+
+
+@dataclass
+class Faults:
+    """Misbehaviour injected into every connection; zero disables each fault."""
+
+    disconnect_after: float = 0.0  # close the connection after this many seconds
+    stall_every: float = 0.0  # go silent, answering nothing, every this many seconds...
+    stall_for: float = 0.0  # ...for this long
+    malformed: float = 0.0  # fraction of frames cut in half
+
+
+class FakeExchangeServer:
+    """Websocket server serving every exchange protocol on one port.
+
+    The protocol follows the request path: /stream is the Binance
+    combined-stream endpoint, any other /ws/... path but /ws/v5/public the
+    Binance all-market stream, /ws/v5/public OKX and /realtime BitMEX.
+    `scripts` replaces the random liquidations of an exchange with its
+    frames, cycled verbatim.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        rate: float = 100.0,
+        scripts: dict[Exchange, list[str]] | None = None,
+        faults: Faults | None = None,
+        seed: int | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.scripts = scripts or {}
+        self.faults = faults or Faults()
+        self.rng = random.Random(seed)
+        self.connections = 0
+        self.sent = {exchange: 0 for exchange in Exchange}
+        self._server: Server | None = None
+
+    def url(self, exchange: Exchange, combined: bool = False) -> str:
+        base = f"ws://{self.host}:{self.port}"
+        if exchange is Exchange.BINANCE:
+            return f"{base}/stream" if combined else f"{base}/ws/{FIREHOSE}"
+        if exchange is Exchange.OKX:
+            return f"{base}/ws/v5/public"
+        return f"{base}/realtime?subscribe=liquidation"
+
+    async def start(self) -> None:
+        self._server = await serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "FakeExchangeServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def _handle(self, ws: ServerConnection) -> None:
+        self.connections += 1
+        path = ws.request.path
+        if path.startswith("/stream"):
+            session: _Session = _BinanceCombinedSession(self, ws)
+        elif path.startswith("/ws/v5/public"):
+            session = _OkxSession(self, ws)
+        elif path.startswith("/ws/"):
+            session = _BinanceSession(self, ws)
+        elif path.startswith("/realtime"):
+            session = _BitmexSession(self, ws)
+        else:
+            await ws.close(code=1008, reason="unknown path")
+            return
+        try:
+            await session.run()
+        except ConnectionClosed:
+            pass
+
+
+class _Session:
+    exchange: Exchange
+
+    def __init__(self, server: FakeExchangeServer, ws: ServerConnection):
+        self.server = server
+        self.ws = ws
+        self.streaming = False
+        self.started = time.monotonic()
+        self._script = server.scripts.get(self.exchange)
+        self._position = 0
+
+    def stalled(self) -> bool:
+        faults = self.server.faults
+        if not (faults.stall_every and faults.stall_for):
+            return False
+        return (time.monotonic() - self.started) % (faults.stall_every + faults.stall_for) >= faults.stall_every
+
+    async def run(self) -> None:
+        await self.on_connect()
+        tasks = {asyncio.create_task(self._read()), asyncio.create_task(self._write())}
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _read(self) -> None:
+        async for message in self.ws:
+            if self.stalled():
+                continue
+            if message == "ping":
+                await self.ws.send("pong")
+                continue
+            try:
+                request = json.loads(message)
+            except ValueError:
+                continue
+            await self.on_request(request)
+
+    async def _write(self) -> None:
+        faults = self.server.faults
+        owed = 0.0
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(TICK)
+            now = time.monotonic()
+            if faults.disconnect_after and now - self.started >= faults.disconnect_after:
+                await self.ws.close(code=1001, reason="scheduled disconnect")
+                return
+            owed += (now - last) * self.server.rate
+            last = now
+            if not self.streaming or self.stalled():
+                owed = 0.0
+                continue
+            while owed >= 1:
+                owed -= 1
+                frame = self.next_frame()
+                if frame is None:
+                    continue
+                if faults.malformed and self.server.rng.random() < faults.malformed:
+                    frame = frame[:len(frame) // 2]
+                await self.ws.send(frame)
+                self.server.sent[self.exchange] += 1
+
+    def scripted(self) -> str | None:
+        if not self._script:
+            return None
+        frame = self._script[self._position % len(self._script)]
+        self._position += 1
+        return frame
+
+    def random_frame(self, symbol: str | None = None) -> str:
+        rng = self.server.rng
+        symbol = symbol or rng.choice(SYMBOLS[self.exchange])
+        return json.dumps(PAYLOADS[self.exchange](rng, symbol), separators=(",", ":"))
+
+    async def on_connect(self) -> None:
+        pass
+
+    async def on_request(self, request: Any) -> None:
+        pass
+
+    def next_frame(self) -> str | None:
+        return self.scripted() or self.random_frame()
+
+
+class _BinanceSession(_Session):
+    exchange = Exchange.BINANCE
+
+    async def on_connect(self) -> None:
+        self.streaming = True
+
+    async def on_request(self, request: Any) -> None:
+        method = request.get("method")
+        result = [FIREHOSE] if method == "LIST_SUBSCRIPTIONS" else None
+        await self.ws.send(json.dumps({"result": result, "id": request.get("id")}))
+
+
+class _BinanceCombinedSession(_Session):
+    exchange = Exchange.BINANCE
+
+    def __init__(self, server: FakeExchangeServer, ws: ServerConnection):
+        super().__init__(server, ws)
+        self.streams: set[str] = set()
+
+    async def on_request(self, request: Any) -> None:
+        method = request.get("method")
+        params = request.get("params") or []
+        if method == "SUBSCRIBE":
+            self.streams.update(params)
+        elif method == "UNSUBSCRIBE":
+            self.streams.difference_update(params)
+        result = sorted(self.streams) if method == "LIST_SUBSCRIPTIONS" else None
+        await self.ws.send(json.dumps({"result": result, "id": request.get("id")}))
+        self.streaming = bool(self.streams)
+
+    def next_frame(self) -> str | None:
+        if FIREHOSE in self.streams:
+            stream, frame = FIREHOSE, self.scripted() or self.random_frame()
+        else:
+            stream = self.server.rng.choice(sorted(self.streams))
+            frame = self.scripted() or self.random_frame(stream.partition("@")[0].upper())
+        return f'{{"stream":"{stream}","data":{frame}}}'
+
+
+class _OkxSession(_Session):
+    exchange = Exchange.OKX
+
+    async def on_request(self, request: Any) -> None:
+        if request.get("op") != "subscribe":
+            return
+        for arg in request.get("args", ()):
+            await self.ws.send(json.dumps({"event": "subscribe", "arg": arg, "connId": uuid.uuid4().hex[:8]}))
+            if arg.get("channel") == "liquidation-orders":
+                self.streaming = True
+
+
+class _BitmexSession(_Session):
+    exchange = Exchange.BITMEX
+
+    async def on_connect(self) -> None:
+        await self.ws.send(json.dumps({
+            "info": "Welcome to the BitMEX Realtime API.",
+            "version": "fake",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "limit": {"remaining": 39},
+        }))
+        if "liquidation" in self.ws.request.path.partition("?")[2]:
+            await self._subscribe()
+
+    async def on_request(self, request: Any) -> None:
+        if request.get("op") == "subscribe" and "liquidation" in request.get("args", ()):
+            await self._subscribe()
+
+    async def _subscribe(self) -> None:
+        await self.ws.send(json.dumps({
+            "success": True,
+            "subscribe": "liquidation",
+            "request": {"op": "subscribe", "args": ["liquidation"]},
+        }))
+        await self.ws.send(json.dumps({
+            "table": "liquidation", "action": "partial", "keys": ["orderID"], "filter": {}, "data": [],
+        }))
+        self.streaming = True
+
+
+def load_scripts(directory: Path) -> dict[Exchange, list[str]]:
+    scripts = {}
+    for exchange in Exchange:
+        path = directory / f"{exchange.value}.jsonl"
+        if path.exists():
+            scripts[exchange] = [line for line in path.read_text().splitlines() if line]
+    return scripts
+
+
+async def serve_forever(server: FakeExchangeServer, report: Callable[[], None], interval: float) -> None:
+    async with server:
+        for exchange in Exchange:
+            print(f"{exchange.label:<8} {server.url(exchange)}")
+        print(f"{'':<8} {server.url(Exchange.BINANCE, combined=True)} (combined streams)")
+        while True:
+            await asyncio.sleep(interval)
+            report()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=100.0, help="frames per second per connection")
+    parser.add_argument("--frames", type=Path, help="directory of <exchange>.jsonl frames to cycle instead of random ones")
+    parser.add_argument("--seed", type=int, help="seed for the random liquidations and faults")
+    parser.add_argument("--disconnect-after", type=float, default=0.0, help="close connections after N seconds")
+    parser.add_argument("--stall-every", type=float, default=0.0, help="go silent every N seconds...")
+    parser.add_argument("--stall-for", type=float, default=0.0, help="...for this many seconds")
+    parser.add_argument("--malformed", type=float, default=0.0, help="fraction of frames sent truncated")
+    args = parser.parse_args()
+
+    server = FakeExchangeServer(
+        args.host,
+        args.port,
+        rate=args.rate,
+        scripts=load_scripts(args.frames) if args.frames else None,
+        faults=Faults(args.disconnect_after, args.stall_every, args.stall_for, args.malformed),
+        seed=args.seed,
+    )
+    last = dict(server.sent)
+
+    def report() -> None:
+        rates = ", ".join(f"{e.label} {(server.sent[e] - last[e]) / 10:,.0f}/s" for e in Exchange)
+        last.update(server.sent)
+        print(f"{server.connections} connections; {rates}")
+
+    try:
+        asyncio.run(serve_forever(server, report, 10.0))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
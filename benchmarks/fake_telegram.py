@@ -0,0 +1,196 @@
+"""
+Local stand-in for the Telegram Bot API.
+
+Serves the Bot API over HTTP the way aiogram calls it, so alert fan-out can
+be load-tested without reaching Telegram. sendMessage is rate limited like
+Telegram, globally and per chat, answering 429 with retry_after once a
+limit is exceeded; blocked chats get 403, every call can be delayed by a
+fixed latency plus random jitter, and accepted messages are recorded in
+arrival order. getMe, getUpdates and deleteWebhook answer just enough for
+the bot to start polling.
+
+    python -m benchmarks.fake_telegram [--port 8081] [--global-rate 30] [--chat-rate 1]
+                                       [--latency 0.05] [--jitter 0.05] [--blocked 42 43]
+
+Point the bot at it with:
+
+    TELEGRAM_API_URL=http://127.0.0.1:8081
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from typing import Any, NamedTuple
+
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from bot.services.liquidation_monitor.delivery import TokenBucket
+
+
+class DeliveredMessage(NamedTuple):
+    chat_id: int
+    text: str
+    received_at: float
+
+
+class FakeTelegramServer:
+    """aiohttp application answering Bot API calls at /bot<token>/<method>."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        blocked: set[int] | None = None,
+        seed: int | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.chat_rate = chat_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.blocked = blocked or set()
+        self.rng = random.Random(seed)
+        self.delivered: list[DeliveredMessage] = []
+        self.rate_limited = 0
+        self.forbidden = 0
+        self._global = TokenBucket(global_rate, now=time.monotonic())
+        self._chats: dict[int, TokenBucket] = {}
+        self._message_id = 0
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def api(self) -> TelegramAPIServer:
+        return TelegramAPIServer.from_base(self.url)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def __aenter__(self) -> "FakeTelegramServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        params = dict(await request.post())
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+        method = request.match_info["method"].lower()
+        if method == "sendmessage":
+            return self._send_message(params)
+        if method == "getme":
+            return ok({"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"})
+        if method == "getupdates":
+            await asyncio.sleep(min(float(params.get("timeout") or 0), 1.0))
+            return ok([])
+        if method in ("deletewebhook", "setmycommands", "deletemycommands"):
+            return ok(True)
+        return error(404, "Not Found")
+
+    def _send_message(self, params: dict[str, Any]) -> web.Response:
+        chat_id = int(params["chat_id"])
+        if chat_id in self.blocked:
+            self.forbidden += 1
+            return error(403, "Forbidden: bot was blocked by the user")
+
+        now = time.monotonic()
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, now=now)
+        wait = max(bucket.reserve(now), self._global.reserve(now))
+        if wait > 0:
+            # A rejected call does not count against the limits
+            bucket.tokens += 1
+            self._global.tokens += 1
+            self.rate_limited += 1
+            retry_after = math.ceil(wait)
+            return error(429, f"Too Many Requests: retry after {retry_after}", retry_after=retry_after)
+
+        self._message_id += 1
+        self.delivered.append(DeliveredMessage(chat_id, params["text"], now))
+        return ok({
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params["text"],
+        })
+
+
+def ok(result: Any) -> web.Response:
+    return web.json_response({"ok": True, "result": result})
+
+
+def error(code: int, description: str, **parameters: Any) -> web.Response:
+    body: dict[str, Any] = {"ok": False, "error_code": code, "description": description}
+    if parameters:
+        body["parameters"] = parameters
+    return web.json_response(body, status=code)
+
+
+async def serve_forever(server: FakeTelegramServer, interval: float) -> None:
+    async with server:
+        print(f"Bot API at {server.url}")
+        last = 0
+        while True:
+            await asyncio.sleep(interval)
+            delivered = len(server.delivered)
+            print(
+                f"{(delivered - last) / interval:,.1f} msg/s, {delivered:,} delivered, "
+                f"{server.rate_limited:,} rate limited, {server.forbidden:,} forbidden"
+            )
+            last = delivered
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--global-rate", type=float, default=30.0, help="messages per second across all chats")
+    parser.add_argument("--chat-rate", type=float, default=1.0, help="messages per second to a single chat")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds added to every call")
+    parser.add_argument("--blocked", type=int, nargs="*", default=[], help="chat ids that blocked the bot")
+    parser.add_argument("--seed", type=int, help="seed for the latency jitter")
+    args = parser.parse_args()
+
+    server = FakeTelegramServer(
+        args.host,
+        args.port,
+        global_rate=args.global_rate,
+        chat_rate=args.chat_rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        blocked=set(args.blocked),
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(serve_forever(server, 10.0))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Replay recorded exchange frames through the liquidation pipeline offline.
+
+Feeds files written by the frame recorder (FEED_RECORD_DIR) through
+decode → deduplicate → match → deliver, with alerts going to an in-memory
+sink instead of Telegram, and reports throughput. Subscribers are either
+synthetic users watching every recorded symbol or, with --db, the enabled
+settings from the database.
+
+    python -m benchmarks.replay recordings/frames-*.jsonl.gz [--speed 0] [--subscribers 1000] [--db]
+"""
+import argparse
+import asyncio
+import random
+from pathlib import Path
+
+from benchmarks.common import SinkBot
+from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+from bot.services.liquidation_monitor.decoders import decoders
+from bot.services.liquidation_monitor.delivery import TelegramDelivery
+from bot.services.liquidation_monitor.event_queue import LiquidationQueue, OverflowPolicy
+from bot.services.liquidation_monitor.liquidation_starter import liquidation_worker, load_subscriptions
+from bot.services.liquidation_monitor.recording import read_recording, replay
+from bot.services.liquidation_monitor.subscriptions import subscription_index
+
+
+def synthetic_subscribers(paths: list[Path], count: int, seed: int) -> list[LiquidMonitorSettingsDB]:
+    watched: dict[str, set[str]] = {}
+    for recorded in read_recording(paths):
+        try:
+            events = decoders[recorded.exchange](recorded.frame)
+        except Exception:
+            continue
+        for event in events:
+            watched.setdefault(event.exchange.value, set()).add(event.symbol)
+
+    rng = random.Random(seed)
+    exchanges = sorted(watched)
+    return [
+        LiquidMonitorSettingsDB(
+            user_id=user_id,
+            enabled=True,
+            exchange=(exchange := exchanges[user_id % len(exchanges)]),
+            pairs=sorted(watched[exchange]),
+            threshold=float(rng.choice((1_000, 10_000, 50_000, 100_000, 1_000_000))),
+        )
+        for user_id in range(1, count + 1)
+    ] if exchanges else []
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.db:
+        await load_subscriptions()
+    else:
+        subscription_index.load(synthetic_subscribers(args.paths, args.subscribers, args.seed))
+
+    bot = SinkBot()
+    delivery = TelegramDelivery(bot, global_rate=1e9, chat_rate=1e9)  # type: ignore[arg-type]
+    delivery.start()
+    queue = LiquidationQueue(10_000, OverflowPolicy.BLOCK)
+    workers = [asyncio.create_task(liquidation_worker(delivery, queue)) for _ in range(args.workers)]
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    stats = await replay(read_recording(args.paths), queue, speed=args.speed)
+    await queue.join()
+    await delivery.join()
+    elapsed = loop.time() - started
+    for worker in workers:
+        worker.cancel()
+    await delivery.close()
+
+    print(f"subscribers  {len(subscription_index):>12,}")
+    print(f"frames       {stats.frames:>12,}  ({stats.errors} undecodable)")
+    print(f"events       {stats.events:>12,}  ({stats.duplicates} duplicates dropped)")
+    print(f"alerts       {bot.sent:>12,}  to {len(bot.chats)} chats")
+    print(f"elapsed      {elapsed:>12.2f}s")
+    print(f"events/s     {stats.events / elapsed:>12,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", type=Path, help="recording files, replayed in the order given")
+    parser.add_argument("--speed", type=float, default=0.0, help="pacing multiplier, 1 = as recorded, 0 = unpaced")
+    parser.add_argument("--subscribers", type=int, default=1000, help="synthetic subscribers to match against")
+    parser.add_argument("--seed", type=int, default=0, help="seed for synthetic subscriber thresholds")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent matcher/dispatcher tasks")
+    parser.add_argument("--db", action="store_true", help="match against the enabled settings in the database")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
-from collections.abc import Iterable, Sequence
+from collections.abc import AsyncIterator, Callable, Iterable, Sequence
 
 from typing import Any, Generic, Optional, TypeVar
 
 from pydantic import BaseModel
 
-from sqlalchemy import select, func, delete
+from sqlalchemy import Insert, Select, inspect, insert, select, func, delete, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.sql.expression import ColumnElement
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.db.base_class import Base
+from bot.db.cache import CacheKey, IdentityCache, affected_keys, key_columns, row_keys
 
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -17,8 +19,18 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: type[ModelType]):
+    def __init__(
+        self,
+        model: type[ModelType],
+        *,
+        cache: Optional[IdentityCache] = None,
+        cache_options: Optional[list[Any]] = None,
+    ):
         self.model = model
+        self.cache = cache
+        # Loader options applied to rows fetched for the cache, e.g. to keep
+        # a relationship loaded in the cached copy
+        self.cache_options = cache_options
 
     async def get(
         self,
@@ -27,7 +39,21 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         id: Any,
         options: Optional[list[Any]] = None,
     ) -> ModelType | None:
-        return await db.get(self.model, id, options=options)
+        """Row by primary key, served from the identity cache when one is set and no `options` are given."""
+        if self.cache is None or not self.cache.enabled or options is not None:
+            return await db.get(self.model, id, options=options)
+
+        cached = self.cache.get(self.model, id)
+        if cached is not None:
+            return await db.merge(cached, load=False)  # type: ignore[arg-type]
+        db_obj = await db.get(self.model, id, options=self.cache_options)
+        if db_obj is not None and not db.is_modified(db_obj):
+            self.cache.put(db_obj)
+        return db_obj
+
+    def _invalidate(self, db: AsyncSession, keys: Iterable[CacheKey]) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(keys, db.sync_session)
 
     async def get_multi(
         self,
@@ -51,6 +77,72 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.scalars(stmt)
         return result.all()
 
+    def _primary_key(self) -> ColumnElement[Any]:
+        primary_key = inspect(self.model).primary_key
+        if len(primary_key) != 1:
+            raise AttributeError(
+                f"Model {self.model.__name__} does not have a single-column primary key"
+            )
+        return primary_key[0]
+
+    def _select_ordered(
+        self,
+        where_conditions: list[Any],
+        options: Optional[list[Any]],
+    ) -> Select[tuple[ModelType]]:
+        stmt = select(self.model).where(*where_conditions).order_by(self._primary_key())
+        if options:
+            stmt = stmt.options(*options)
+        return stmt
+
+    async def stream_multi(
+        self,
+        db: AsyncSession,
+        *,
+        where_conditions: list[Any],
+        batch_size: int = 1000,
+        options: Optional[list[Any]] = None,
+    ) -> AsyncIterator[ModelType]:
+        """Every matching row, in primary key order, read through a server-side cursor.
+
+        Rows are fetched `batch_size` at a time, so memory stays bounded no
+        matter how many rows match. The cursor keeps the transaction open
+        until iteration ends; use `iter_batches` for work that commits or
+        takes long between rows.
+        """
+        stmt = self._select_ordered(where_conditions, options).execution_options(yield_per=batch_size)
+        result = await db.stream_scalars(stmt)
+        async for db_obj in result:
+            yield db_obj
+
+    async def iter_batches(
+        self,
+        db: AsyncSession,
+        *,
+        where_conditions: list[Any],
+        batch_size: int = 1000,
+        options: Optional[list[Any]] = None,
+    ) -> AsyncIterator[Sequence[ModelType]]:
+        """Every matching row, in primary key order, as batches of up to `batch_size`.
+
+        Each batch is its own query continuing after the last primary key
+        seen (keyset pagination), so deep pages cost the same as the first
+        and nothing is held open between batches.
+        """
+        primary_key = self._primary_key()
+        attribute = inspect(self.model).get_property_by_column(primary_key).key
+        stmt = self._select_ordered(where_conditions, options).limit(batch_size)
+        last = None
+        while True:
+            page = stmt if last is None else stmt.where(primary_key > last)
+            batch = (await db.scalars(page)).all()
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last = getattr(batch[-1], attribute)
+
     async def count(self, db: AsyncSession, *, where_conditions: list[Any]) -> int:
         stmt = (
             select(func.count("*"))
@@ -71,6 +163,124 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db.refresh(db_obj)
         return db_obj
 
+    async def bulk_create(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[CreateSchemaType],
+        batch_size: int = 1000,
+        commit: bool = True,
+    ) -> Sequence[ModelType]:
+        """Insert all rows with multi-row INSERT ... RETURNING, `batch_size` rows per statement.
+
+        Returns the created objects in the order of `objs_in`.
+        """
+        if not objs_in:
+            return []
+        stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        result = await db.scalars(
+            stmt,
+            [obj_in.model_dump(context={"db": True}) for obj_in in objs_in],
+            execution_options={"insertmanyvalues_page_size": batch_size},
+        )
+        db_objs = result.all()
+        self._invalidate(db, affected_keys(db_objs))
+        if commit:
+            await db.commit()
+        return db_objs
+
+    async def bulk_update(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: dict[Any, UpdateSchemaType],
+        commit: bool = True,
+    ) -> None:
+        """Apply each update schema to the row with that primary key, without loading the rows.
+
+        Only fields set on the schema are written. Unlike `update`, dict
+        values replace the stored value instead of being merged into it.
+        Rows setting the same fields are sent as one executemany.
+        """
+        if not objs_in:
+            return
+        primary_key = self._primary_key()
+        attribute = inspect(self.model).get_property_by_column(primary_key).key
+        if self.cache is not None:
+            # An UPDATE by primary key cannot return rows, so read the
+            # foreign keys of the cached parents beforehand
+            rows = await db.execute(select(*key_columns(self.model)).where(primary_key.in_(list(objs_in))))
+            self._invalidate(db, row_keys(self.model, rows))
+        await db.execute(
+            update(self.model),
+            [
+                {**obj_in.model_dump(exclude_unset=True, context={"db": True}), attribute: id}
+                for id, obj_in in objs_in.items()
+            ],
+        )
+        await (db.commit() if commit else db.flush())
+
+    def _insert_for(self, db: AsyncSession) -> Callable[[type[ModelType]], Insert]:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert
+        if dialect == "sqlite":
+            return sqlite.insert
+        raise NotImplementedError(f"Upsert is not supported on {dialect}")
+
+    async def upsert_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[CreateSchemaType],
+        index_elements: Sequence[str],
+        update_fields: Optional[Iterable[str]] = None,
+        batch_size: int = 1000,
+        commit: bool = True,
+    ) -> Sequence[ModelType]:
+        """Insert rows, updating the existing row wherever `index_elements` conflict.
+
+        `index_elements` must be covered by a unique index or constraint.
+        On conflict only `update_fields` are overwritten, by default every
+        field of the schema except the conflict columns, together with the
+        columns that have an SQL `onupdate`. Uses INSERT ... ON
+        CONFLICT DO UPDATE ... RETURNING on Postgres and SQLite, `batch_size`
+        rows per statement, and returns the resulting rows in the order of
+        `objs_in`.
+        """
+        if not objs_in:
+            return []
+        rows = [obj_in.model_dump(context={"db": True}) for obj_in in objs_in]
+        if update_fields is None:
+            update_fields = [field for field in rows[0] if field not in index_elements]
+        update_fields = list(update_fields)
+        if not update_fields:
+            raise ValueError("upsert_many needs at least one field to update on conflict")
+
+        stmt = self._insert_for(db)(self.model)
+        set_: dict[str, Any] = {field: stmt.excluded[field] for field in update_fields}
+        # ON CONFLICT DO UPDATE skips the ORM's onupdate defaults, so apply
+        # those that render as SQL, such as `updated_at`, by hand
+        for column in self.model.__table__.columns:
+            onupdate = column.onupdate
+            if onupdate is None or column.name in set_:
+                continue
+            if onupdate.is_clause_element or onupdate.is_scalar:
+                set_[column.name] = onupdate.arg
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_).returning(
+            self.model, sort_by_parameter_order=True
+        )
+        result = await db.scalars(
+            stmt,
+            rows,
+            execution_options={"insertmanyvalues_page_size": batch_size, "populate_existing": True},
+        )
+        db_objs = result.all()
+        self._invalidate(db, affected_keys(db_objs))
+        if commit:
+            await db.commit()
+        return db_objs
+
     async def update(
         self,
         db: AsyncSession,
@@ -105,7 +315,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 f"Model {self.model.__name__} does not have an 'id' column"
             )
 
-        stmt = delete(self.model).where(getattr(self.model, "id").in_(ids))
-        result = await db.execute(stmt)
+        stmt = (
+            delete(self.model)
+            .where(getattr(self.model, "id").in_(ids))
+            .returning(*key_columns(self.model))
+        )
+        rows = (await db.execute(stmt)).all()
+        self._invalidate(db, row_keys(self.model, rows))
         await (db.commit() if commit else db.flush())
-        return result.rowcount
+        return len(rows)
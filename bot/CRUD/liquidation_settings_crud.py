@@ -1,8 +1,12 @@
-from sqlalchemy import update, select
+from collections.abc import Iterable, Sequence
+
+from sqlalchemy import delete, insert, update, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot.db.cache import affected_keys, identity_cache
 from bot.exceptions.exceptions import NotFoundError
 from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+from bot.models.liquidation_subscription import LiquidationSubscriptionDB
 from bot.CRUD.base import CRUDBase
 from bot.schemas.liquidation_settings import (
     LiquidationSettingsCreate,
@@ -30,8 +34,116 @@ class LiquidSettingsCRUD(
         settings = await db.scalar(stmt)
         if not settings:
             raise NotFoundError(f"No settings for user_id: {user_id}")
+        self._invalidate(db, affected_keys([settings]))
         await db.commit()
         return settings
 
+    async def get_subscriptions(
+        self, db: AsyncSession, user_id: int
+    ) -> Sequence[LiquidationSubscriptionDB]:
+        result = await db.scalars(
+            select(LiquidationSubscriptionDB)
+            .where(LiquidationSubscriptionDB.user_id == user_id)
+            .order_by(LiquidationSubscriptionDB.exchange, LiquidationSubscriptionDB.symbol)
+        )
+        return result.all()
+
+    async def set_subscriptions(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        exchange: str,
+        symbols: Iterable[str],
+        threshold: float,
+        commit: bool = True,
+    ) -> Sequence[LiquidationSubscriptionDB]:
+        """Replace the user's subscriptions on `exchange` with `symbols`; other exchanges are kept."""
+        exchange = exchange.strip().lower()
+        await db.execute(
+            delete(LiquidationSubscriptionDB).where(
+                LiquidationSubscriptionDB.user_id == user_id,
+                LiquidationSubscriptionDB.exchange == exchange,
+            )
+        )
+        return await self._insert_subscriptions(
+            db, user_id=user_id, exchange=exchange, symbols=symbols, threshold=threshold, commit=commit
+        )
+
+    async def _insert_subscriptions(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        exchange: str,
+        symbols: Iterable[str],
+        threshold: float,
+        commit: bool,
+    ) -> Sequence[LiquidationSubscriptionDB]:
+        rows = [
+            {"user_id": user_id, "exchange": exchange, "symbol": symbol, "threshold": threshold}
+            for symbol in dict.fromkeys(s.strip().upper() for s in symbols)
+            if symbol
+        ]
+        subscriptions: Sequence[LiquidationSubscriptionDB] = []
+        if rows:
+            result = await db.scalars(
+                insert(LiquidationSubscriptionDB).returning(
+                    LiquidationSubscriptionDB, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+            subscriptions = result.all()
+        if commit:
+            await db.commit()
+        return subscriptions
+
+    async def delete_subscriptions(
+        self, db: AsyncSession, *, user_id: int, exchange: str | None = None, commit: bool = True
+    ) -> int:
+        stmt = delete(LiquidationSubscriptionDB).where(LiquidationSubscriptionDB.user_id == user_id)
+        if exchange is not None:
+            stmt = stmt.where(LiquidationSubscriptionDB.exchange == exchange.strip().lower())
+        result = await db.execute(stmt)
+        await (db.commit() if commit else db.flush())
+        return result.rowcount
+
+    async def sync_subscriptions(
+        self, db: AsyncSession, *, settings: LiquidMonitorSettingsDB, commit: bool = True
+    ) -> Sequence[LiquidationSubscriptionDB]:
+        """Make the user's subscription rows mirror their settings row."""
+        # Dropping every exchange's rows covers the one being set, so insert directly
+        await db.execute(
+            delete(LiquidationSubscriptionDB).where(LiquidationSubscriptionDB.user_id == settings.user_id)
+        )
+        return await self._insert_subscriptions(
+            db,
+            user_id=settings.user_id,
+            exchange=settings.exchange.strip().lower(),
+            symbols=settings.pairs,
+            threshold=settings.threshold,
+            commit=commit,
+        )
+
+    async def match_subscribers(
+        self, db: AsyncSession, *, exchange: str, symbol: str, usd_value: float
+    ) -> list[int]:
+        """Enabled users subscribed to `symbol` on `exchange` with a threshold at or below `usd_value`."""
+        result = await db.scalars(
+            select(LiquidationSubscriptionDB.user_id)
+            .join(
+                LiquidMonitorSettingsDB,
+                LiquidMonitorSettingsDB.user_id == LiquidationSubscriptionDB.user_id,
+            )
+            .where(
+                LiquidationSubscriptionDB.exchange == exchange.strip().lower(),
+                LiquidationSubscriptionDB.symbol == symbol.strip().upper(),
+                LiquidationSubscriptionDB.threshold <= usd_value,
+                LiquidMonitorSettingsDB.enabled,
+            )
+            .order_by(LiquidationSubscriptionDB.threshold)
+        )
+        return list(result.all())
+
 
-liquidation_settings = LiquidSettingsCRUD(LiquidMonitorSettingsDB)
+liquidation_settings = LiquidSettingsCRUD(LiquidMonitorSettingsDB, cache=identity_cache)
@@ -1,3 +1,8 @@
+from sqlalchemy.orm import joinedload
+
+from bot.db.cache import identity_cache
+# Registers the related model so the loader option below can configure the mappers
+from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB  # noqa: F401
 from bot.models.user import UserDB
 from bot.CRUD.base import CRUDBase
 from bot.schemas.user import UserCreate, UserUpdate
@@ -7,4 +12,9 @@ class UserCRUD(CRUDBase[UserDB, UserCreate, UserUpdate]):
     pass
 
 
-user = UserCRUD(UserDB)
+# Cached with the monitor settings loaded, so handlers reading them need no extra query
+user = UserCRUD(
+    UserDB,
+    cache=identity_cache,
+    cache_options=[joinedload(UserDB.liquid_monitor_settings)],
+)
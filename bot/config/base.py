@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings
 
@@ -5,6 +7,7 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # bot settings
     BOT_TOKEN: SecretStr
+    ADMIN_IDS: list[int] = []
 
     # postgres settings
     DATABASE_USER: str
@@ -12,6 +15,53 @@ class Settings(BaseSettings):
     DATABASE_PORT: int = 5432
     DATABASE_HOST: str = "localhost"
     DATABASE_PASSWORD: str = ""
+    CRUD_CACHE_SIZE: int = 10_000
+    CRUD_CACHE_TTL: float = 60.0
+
+    # liquidation monitor settings
+    MONITOR_QUEUE_SIZE: int = 10_000
+    MONITOR_QUEUE_OVERFLOW: Literal["block", "drop_newest", "drop_oldest"] = "drop_oldest"
+    MONITOR_WORKERS: int = 4
+
+    # exchange feed settings
+    BINANCE_WS_URLS: list[str] = ["wss://fstream.binance.com/ws/!forceOrder@arr"]
+    OKX_WS_URLS: list[str] = ["wss://ws.okx.com:8443/ws/v5/public"]
+    BITMEX_WS_URLS: list[str] = ["wss://www.bitmex.com/realtime?subscribe=liquidation"]
+    FEED_REDUNDANCY: int = 1
+    BINANCE_SYMBOL_STREAMS: bool = False
+    BINANCE_SYMBOL_STREAMS_MAX: int = 100
+    BINANCE_COMBINED_WS_URLS: list[str] = ["wss://fstream.binance.com/stream"]
+    FEED_BACKOFF_INITIAL: float = 1.0
+    FEED_BACKOFF_MAX: float = 60.0
+    FEED_STALE_AFTER: float = 90.0
+    FEED_HEARTBEAT_INTERVAL: float = 30.0
+    FEED_ROTATE_AFTER: float = 0.0
+    FEED_ROTATE_OVERLAP: float = 5.0
+    FEED_DEDUP_SIZE: int = 4096
+    FEED_RECORD_DIR: str = ""
+    FEED_RECORD_MAX_BYTES: int = 64 * 2**20
+    FEED_RECORD_KEEP: int = 24
+
+    # telegram delivery settings
+    TELEGRAM_API_URL: str = ""
+    TELEGRAM_WORKERS: int = 16
+    TELEGRAM_QUEUE_SIZE: int = 10_000
+    TELEGRAM_GLOBAL_RATE: float = 30.0
+    TELEGRAM_CHAT_RATE: float = 1.0
+    TELEGRAM_MAX_RETRIES: int = 3
+
+    # observability settings
+    METRICS_PORT: int = 0
+    METRICS_HOST: str = "0.0.0.0"
+    LOOP_LAG_INTERVAL: float = 0.5
+    SLOW_CALLBACK_BUDGET: float = 0.0
+    PROFILE_DIR: str = "profiles"
+    PROFILE_INTERVAL: float = 0.005
+    PROFILE_ON_START: float = 0.0
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_RATE_LIMIT_INTERVAL: float = 60.0
+    LOG_RATE_LIMIT_BURST: int = 5
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,123 @@
+import copy
+import json
+import logging
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from bot.config.base import settings
+
+
+# `extra` fields copied into every JSON line that carries them
+FIELDS = ("exchange", "symbol", "user_id", "latency", "feed", "suppressed")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and known extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                line[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line["exc"] = record.exc_text
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `burst` warnings or errors per key through every `interval` seconds.
+
+    The key is the logger, the unformatted message and the exchange, so the
+    same failure repeated for thousands of users collapses into a few lines.
+    The first line let through after a quiet period carries `suppressed`,
+    the number of lines dropped in between.
+    """
+
+    def __init__(self, interval: float = 60.0, burst: int = 5, max_keys: int = 10_000):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> [window start, lines let through, lines suppressed]
+        self.windows: dict[tuple[str, Any, Any], list[Any]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or not self.interval:
+            return True
+        key = (record.name, record.msg, getattr(record, "exchange", None))
+        now = time.monotonic()
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if window is not None and window[2]:
+                record.suppressed = window[2]
+            elif len(self.windows) >= self.max_keys:
+                self.windows.clear()
+            self.windows[key] = [now, 1, 0]
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+class LogQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread.
+
+    The stock handler formats every record before queueing it; here only
+    the message arguments are merged and any traceback rendered, since
+    both may refer to objects that change once the call returns.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+    level: str = settings.LOG_LEVEL,
+    fmt: str = settings.LOG_FORMAT,
+    rate_limit_interval: float = settings.LOG_RATE_LIMIT_INTERVAL,
+    rate_limit_burst: int = settings.LOG_RATE_LIMIT_BURST,
+) -> QueueListener:
+    """Route all logging through a queue to a stdout writer on a background thread.
+
+    Nothing on the event loop waits for stdout: a log call only appends to
+    the queue. Returns the started listener; stop it on shutdown to flush
+    what is still queued.
+    """
+    stream = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    handler = LogQueueHandler(queue.SimpleQueue())
+    handler.addFilter(RateLimitFilter(rate_limit_interval, rate_limit_burst))
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    listener.start()
+    return listener
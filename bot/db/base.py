@@ -1,5 +1,6 @@
 from .base_class import Base
 from bot.models.user import UserDB
 from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+from bot.models.liquidation_subscription import LiquidationSubscriptionDB
 
-__all__ = ["Base", "UserDB", "LiquidMonitorSettingsDB"]
+__all__ = ["Base", "UserDB", "LiquidMonitorSettingsDB", "LiquidationSubscriptionDB"]
@@ -0,0 +1,146 @@
+import pickle
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+from sqlalchemy import Column, Row, event, inspect
+from sqlalchemy.orm import MANYTOONE, Mapper, Session
+
+from bot.config.base import settings
+from bot.db.base_class import Base
+
+
+CacheKey = tuple[type[Base], Any]
+
+
+class IdentityCache:
+    """Bounded LRU of rows by (model, primary key), each kept for at most `ttl` seconds.
+
+    Rows are stored pickled, so a hit hands the caller a fresh copy to
+    merge into its own session and nothing a handler changes on it can leak
+    back into the cache. Changes flushed through any session drop the
+    affected keys, including those of the rows they point to, whose cached
+    copy may hold the changed row in a loaded relationship. Bulk statements
+    that bypass the unit of work must call `invalidate` themselves.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, tuple[float, bytes]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, model: type[Base], id: Any) -> Base | None:
+        key = (model, id)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return pickle.loads(entry[1])
+
+    def put(self, db_obj: Base) -> None:
+        if not self.enabled:
+            return
+        key = identity_key(db_obj)
+        self._entries[key] = (time.monotonic() + self.ttl, pickle.dumps(db_obj))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[CacheKey], session: Session | None = None) -> None:
+        """Drop `keys` now and, with `session`, once more when its transaction ends.
+
+        The second pass covers another session caching the old row between
+        the change and the commit.
+        """
+        keys = set(keys)
+        for key in keys:
+            self._entries.pop(key, None)
+        if session is not None:
+            session.info.setdefault("cache_invalidated", set()).update(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _key(model: type[Base], values: Sequence[Any]) -> CacheKey:
+    return model, values[0] if len(values) == 1 else tuple(values)
+
+
+def _parents(mapper: Mapper[Any]) -> Iterator[tuple[type[Base], list[Column[Any]]]]:
+    """Models this one points to through many-to-one relationships, with the local foreign key columns."""
+    for relationship in mapper.relationships:
+        if relationship.direction is MANYTOONE:
+            yield relationship.mapper.class_, [local for local, _ in relationship.local_remote_pairs]
+
+
+def identity_key(db_obj: Base) -> CacheKey:
+    state = inspect(db_obj)
+    return _key(state.mapper.class_, state.identity or state.mapper.primary_key_from_instance(db_obj))
+
+
+def affected_keys(db_objs: Iterable[Base]) -> set[CacheKey]:
+    """Keys of the rows themselves and of the rows they point to through many-to-one relationships."""
+    keys = set()
+    for db_obj in db_objs:
+        keys.add(identity_key(db_obj))
+        state = inspect(db_obj)
+        for parent, columns in _parents(state.mapper):
+            # Read from the loaded state so a flush never triggers a load
+            values = [state.dict.get(state.mapper.get_property_by_column(column).key) for column in columns]
+            if None not in values:
+                keys.add(_key(parent, values))
+    return keys
+
+
+def key_columns(model: type[Base]) -> list[Column[Any]]:
+    """Columns `row_keys` needs: the primary key and the many-to-one foreign keys."""
+    mapper = inspect(model)
+    columns = list(mapper.primary_key)
+    for _, local in _parents(mapper):
+        columns.extend(column for column in local if column not in columns)
+    return columns
+
+
+def row_keys(model: type[Base], rows: Iterable[Row[Any]]) -> set[CacheKey]:
+    """`affected_keys` for rows selected or returned with `key_columns(model)` instead of loaded objects."""
+    mapper = inspect(model)
+    keys = set()
+    for row in rows:
+        values = row._mapping
+        keys.add(_key(model, [values[column] for column in mapper.primary_key]))
+        for parent, columns in _parents(mapper):
+            parent_values = [values[column] for column in columns]
+            if None not in parent_values:
+                keys.add(_key(parent, parent_values))
+    return keys
+
+
+identity_cache = IdentityCache(settings.CRUD_CACHE_SIZE, settings.CRUD_CACHE_TTL)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed(session: Session, flush_context: Any) -> None:
+    identity_cache.invalidate(affected_keys([*session.new, *session.dirty, *session.deleted]), session)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_on_transaction_end(session: Session) -> None:
+    identity_cache.invalidate(session.info.pop("cache_invalidated", ()))
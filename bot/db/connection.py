@@ -1,9 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from bot.config.base import settings
+from bot.db.stats import instrument_engine
 
 
 engine = create_async_engine(settings.postgres_url, future=True, echo=False)
+instrument_engine(engine)
 
 db_session_maker = async_sessionmaker(
     bind=engine,
@@ -0,0 +1,61 @@
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryStats:
+    """Count and total time of executed statements, by statement verb, and pool checkouts."""
+
+    __slots__ = ("counts", "seconds", "errors", "checkouts")
+
+    def __init__(self) -> None:
+        self.counts: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+        self.errors = 0
+        self.checkouts = 0
+
+    def record(self, statement: str, seconds: float) -> None:
+        verb = statement.split(None, 1)[0].upper() if statement.strip() else ""
+        self.counts[verb] = self.counts.get(verb, 0) + 1
+        self.seconds[verb] = self.seconds.get(verb, 0.0) + seconds
+
+
+query_stats = QueryStats()
+
+
+class SessionStats:
+    """Updates handled by DbSessionMiddleware and how many of them opened a session."""
+
+    __slots__ = ("updates", "sessions")
+
+    def __init__(self) -> None:
+        self.updates = 0
+        self.sessions = 0
+
+
+session_stats = SessionStats()
+
+
+def instrument_engine(engine: AsyncEngine, stats: QueryStats = query_stats) -> None:
+    """Time every statement `engine` executes, and count its pool checkouts, into `stats`."""
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        stats.checkouts += 1
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        stats.record(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def error(context: Any) -> None:
+        stats.errors += 1
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
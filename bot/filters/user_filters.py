@@ -1,9 +1,16 @@
 from aiogram.filters import BaseFilter
 from aiogram.types import Message, User
 
+from bot.config.base import settings
+
 
 class UserFilter(BaseFilter):
     async def __call__(self, message: Message) -> dict[str, User] | bool:
         if message.from_user:
             return {"user": message.from_user}
         return False
+
+
+class AdminFilter(BaseFilter):
+    async def __call__(self, message: Message) -> bool:
+        return message.from_user is not None and message.from_user.id in settings.ADMIN_IDS
@@ -0,0 +1,32 @@
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from bot.filters.user_filters import AdminFilter
+from bot.middlewares.db_session_middleware import NO_DB
+from bot.services.profiler import profiler
+
+
+router = Router()
+router.message.filter(AdminFilter())
+
+
+@router.message(Command("profile"), flags=NO_DB)
+async def cmd_profile(message: Message):
+    parts = (message.text or "").split(maxsplit=1)
+    seconds = 30.0
+    if len(parts) > 1:
+        try:
+            seconds = float(parts[1])
+        except ValueError:
+            return await message.answer("❗ Invalid format. Example: /profile 30")
+        if seconds <= 0:
+            return await message.answer("❗ The duration must be greater than zero.")
+
+    if profiler.running:
+        return await message.answer("⏳ A profile is already being collected")
+
+    seconds = min(seconds, profiler.max_duration)
+    await message.answer(f"🔬 Profiling the liquidation pipeline for {seconds:g}s...")
+    result = await profiler.profile(seconds)
+    return await message.answer(f"✅ Profile done\n{profiler.summary(result)}")
@@ -7,7 +7,9 @@ from aiogram.utils.formatting import Bold, as_marked_section
 
 from bot import CRUD
 from bot.filters.user_filters import UserFilter
+from bot.middlewares.db_session_middleware import NO_DB
 from bot.schemas.user import UserCreate
+from bot.services.liquidation_monitor import subscription_index
 
 
 router = Router()
@@ -30,7 +32,7 @@ async def cmd_start(message: Message, db: AsyncSession, user: User):
     )
 
 
-@router.message(Command("help"))
+@router.message(Command("help"), flags=NO_DB)
 async def cmd_help(message: Message, user: User):
     help_text = as_marked_section(
         Bold("Help"),
@@ -40,6 +42,7 @@ async def cmd_help(message: Message, user: User):
         " /setup_lm - start setting up liquidation monitor settings",
         " /start_lm & /stop_lm - start/stop the liquidation monitor",
         " /set_threshold - set the minimum liquidation amount",
+        " /set_digest - group alerts into one message per N seconds (or 'off')",
         " /set_pairs - set trading pairs",
         " /show_lm_settings - check liquidation monitor settings",
         " /drop_lm_settings - delete liquidation monitor settings",
@@ -54,6 +57,7 @@ async def cmd_stop(message: Message, db: AsyncSession, user: User):
     answer = "Goodbye\n"
     if user_db := await CRUD.user.delete(db, id=user.id):
         answer = f"Goodbye, {user_db.username}!\n"
+    subscription_index.remove(user.id)
     await message.answer(
         f"{answer} You have been unsubscribed from notifications.",
         reply_markup=ReplyKeyboardRemove(),
@@ -1,5 +1,6 @@
 from typing import Protocol, Any
 
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from aiogram.types import (
@@ -16,8 +17,11 @@ from aiogram.fsm.state import State, StatesGroup
 
 from bot import CRUD
 from bot.filters.user_filters import UserFilter
+from bot.middlewares.db_session_middleware import NO_DB
+from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
 from bot.models.user import UserDB
 from bot.schemas.liquidation_settings import LiquidationSettingsCreate, LiquidationSettingsUpdate
+from bot.services.liquidation_monitor import subscription_index
 
 
 router = Router()
@@ -32,6 +36,13 @@ class TypeLMSCallback(Protocol):
     async def answer(self, *args: Any, **kwargs: Any) -> None: ...
 
 
+async def load_settings(db: AsyncSession, user_db: UserDB) -> LiquidMonitorSettingsDB | None:
+    """The user's monitor settings; only queried when the (cached) user came without them."""
+    if "liquid_monitor_settings" in inspect(user_db).unloaded:
+        await db.refresh(user_db, ("liquid_monitor_settings",))
+    return user_db.liquid_monitor_settings
+
+
 class MonitorSettings(StatesGroup):
     waiting_for_exchange = State()
     waiting_for_threshold = State()
@@ -90,14 +101,14 @@ def pairs_kb():
 
 
 # --- Handlers ---
-@router.message(F.text == "/setup_lm")
+@router.message(F.text == "/setup_lm", flags=NO_DB)
 async def cmd_set_monitor(message: Message, state: FSMContext):
     await message.answer("Select exchange:", reply_markup=exchange_kb())
     await state.set_state(MonitorSettings.waiting_for_exchange)
 
 
 @router.callback_query(
-    MonitorSettings.waiting_for_exchange, F.data.startswith("exchange:")
+    MonitorSettings.waiting_for_exchange, F.data.startswith("exchange:"), flags=NO_DB
 )
 async def process_exchange(callback: TypeLMSCallback, state: FSMContext):
     _, exchange = callback.data.split(":")
@@ -109,7 +120,7 @@ async def process_exchange(callback: TypeLMSCallback, state: FSMContext):
 
 
 @router.callback_query(
-    MonitorSettings.waiting_for_threshold, F.data.startswith("threshold:")
+    MonitorSettings.waiting_for_threshold, F.data.startswith("threshold:"), flags=NO_DB
 )
 async def process_threshold(callback: TypeLMSCallback, state: FSMContext):
     _, value = callback.data.split(":")
@@ -123,7 +134,7 @@ async def process_threshold(callback: TypeLMSCallback, state: FSMContext):
     await state.set_state(MonitorSettings.waiting_for_pairs)
 
 
-@router.message(MonitorSettings.waiting_for_custom_threshold)
+@router.message(MonitorSettings.waiting_for_custom_threshold, flags=NO_DB)
 async def process_custom_threshold(message: Message, state: FSMContext):
     try:
         threshold = float(message.text or 0)
@@ -136,7 +147,7 @@ async def process_custom_threshold(message: Message, state: FSMContext):
     await state.set_state(MonitorSettings.waiting_for_pairs)
 
 
-@router.callback_query(MonitorSettings.waiting_for_pairs, F.data.startswith("pair:"))
+@router.callback_query(MonitorSettings.waiting_for_pairs, F.data.startswith("pair:"), flags=NO_DB)
 async def process_pair(callback: TypeLMSCallback, state: FSMContext):
     _, pair = callback.data.split(":")
     data = await state.get_data()
@@ -147,7 +158,7 @@ async def process_pair(callback: TypeLMSCallback, state: FSMContext):
     await callback.answer(f"Added: {pair}")
 
 
-@router.callback_query(MonitorSettings.waiting_for_pairs, F.data == "pairs:custom")
+@router.callback_query(MonitorSettings.waiting_for_pairs, F.data == "pairs:custom", flags=NO_DB)
 async def process_custom_pairs(callback: TypeLMSCallback, state: FSMContext):
     await callback.message.answer(
         "Enter the list of pairs separated by commas (e.g.: BTCUSDT, ETHUSDT):"
@@ -155,7 +166,7 @@ async def process_custom_pairs(callback: TypeLMSCallback, state: FSMContext):
     await state.set_state(MonitorSettings.waiting_for_custom_pairs)
 
 
-@router.message(MonitorSettings.waiting_for_custom_pairs)
+@router.message(MonitorSettings.waiting_for_custom_pairs, flags=NO_DB)
 async def process_custom_pairs_input(message: Message, state: FSMContext):
     raw_pairs = (message.text or "").replace(" ", "")
     pairs = [p.upper() for p in raw_pairs.split(",") if p]
@@ -172,20 +183,18 @@ async def process_done(
     callback: TypeLMSCallback, state: FSMContext, db: AsyncSession, user: User
 ):
     data = await state.get_data()
-    settings = await CRUD.liquidation_settings.get_by_user_id(db, user_id=user.id)
-    if not settings:
-        data.update(user_id=user.id, enabled=True)
-        settings = await CRUD.liquidation_settings.create(
-            db=db,
-            obj_in=LiquidationSettingsCreate.model_validate(data),
-        )
-    else:
-        settings = await CRUD.liquidation_settings.update(
-            db=db,
-            db_obj=settings,
-            obj_in=LiquidationSettingsUpdate.model_validate(data),
-        )
+    # New settings start enabled; existing ones only get the fields chosen in this dialog
+    updated = LiquidationSettingsUpdate.model_validate(data).model_dump(exclude_unset=True)
+    [settings] = await CRUD.liquidation_settings.upsert_many(
+        db,
+        objs_in=[LiquidationSettingsCreate.model_validate({**data, "user_id": user.id, "enabled": True})],
+        index_elements=["user_id"],
+        update_fields=list(updated),
+        commit=False,
+    )
+    await CRUD.liquidation_settings.sync_subscriptions(db, settings=settings, commit=False)
     await db.commit()
+    subscription_index.upsert(settings)
 
     await callback.message.edit_text(
         f"✅ Liquidation monitor settings updated!\n\n"
@@ -198,13 +207,15 @@ async def process_done(
 
 @router.message(Command("start_lm"))
 async def cmd_start_liquidation_monitor(message: Message, db: AsyncSession, user: User):
-    await CRUD.liquidation_settings.toggle_monitor(db, user_id=user.id, turn_on=True)
+    settings = await CRUD.liquidation_settings.toggle_monitor(db, user_id=user.id, turn_on=True)
+    subscription_index.upsert(settings)
     await message.answer("Start liquidation monitor")
 
 
 @router.message(Command("stop_lm"))
 async def cmd_stop_liquidation_monitor(message: Message, db: AsyncSession, user: User):
-    await CRUD.liquidation_settings.toggle_monitor(db, user_id=user.id, turn_on=False)
+    settings = await CRUD.liquidation_settings.toggle_monitor(db, user_id=user.id, turn_on=False)
+    subscription_index.upsert(settings)
     await message.answer("Stop liquidation monitor")
 
 
@@ -221,16 +232,49 @@ async def cmd_set_threshold(message: Message, db: AsyncSession, user_db: UserDB)
     except ValueError:
         return await message.answer("❗ Invalid format. A number is required.")
 
-    await db.refresh(user_db, ("liquid_monitor_settings",))
-    settings = user_db.liquid_monitor_settings
+    settings = await load_settings(db, user_db)
     if not settings:
         return await message.answer("No settings pls type /setup_lm")
 
     settings.threshold = new_threshold
+    await CRUD.liquidation_settings.sync_subscriptions(db, settings=settings, commit=False)
     await db.commit()
+    subscription_index.upsert(settings)
     await message.answer(f"✅ Liquidation threshold updated: {new_threshold}")
 
 
+@router.message(Command("set_digest"))
+async def cmd_set_digest(message: Message, db: AsyncSession, user_db: UserDB):
+    parts = (message.text or "").split(maxsplit=1)
+    if len(parts) < 2:
+        return await message.answer(
+            "❗ Enter the window in seconds or 'off'. Example: /set_digest 2"
+        )
+
+    value = parts[1].strip().lower()
+    window = None
+    if value != "off":
+        try:
+            window = float(value)
+        except ValueError:
+            return await message.answer("❗ Invalid format. A number or 'off' is required.")
+        if window <= 0:
+            return await message.answer("❗ The window must be greater than zero.")
+
+    settings = await load_settings(db, user_db)
+    if not settings:
+        return await message.answer("No settings pls type /setup_lm")
+
+    settings.digest_enabled = window is not None
+    if window is not None:
+        settings.digest_window = window
+    await db.commit()
+    subscription_index.upsert(settings)
+    if window is None:
+        return await message.answer("✅ Digest disabled, every liquidation is sent separately")
+    return await message.answer(f"✅ Liquidations are now grouped into {window:g}s digests")
+
+
 @router.message(Command("set_pairs"))
 async def cmd_set_pairs(message: Message, db: AsyncSession, user_db: UserDB):
     parts = (message.text or "").split(maxsplit=1)
@@ -240,20 +284,20 @@ async def cmd_set_pairs(message: Message, db: AsyncSession, user_db: UserDB):
         )
 
     pairs = parts[1].upper().replace(" ", "").split(",")
-    await db.refresh(user_db, ("liquid_monitor_settings",))
-    settings = user_db.liquid_monitor_settings
+    settings = await load_settings(db, user_db)
     if not settings:
         return await message.answer("No settings pls type /setup_lm")
 
     settings.pairs = pairs
+    await CRUD.liquidation_settings.sync_subscriptions(db, settings=settings, commit=False)
     await db.commit()
+    subscription_index.upsert(settings)
     return await message.answer(f"✅ Pairs list updated: {', '.join(pairs)}")
 
 
 @router.message(Command("show_lm_settings"))
 async def cmd_show_liquidation_monitor_settings(message: Message, db: AsyncSession, user_db: UserDB):
-    await db.refresh(user_db, ("liquid_monitor_settings",))
-    settings = user_db.liquid_monitor_settings
+    settings = await load_settings(db, user_db)
     if not settings:
         return await message.answer("No settings pls type /setup_lm")
 
@@ -262,16 +306,17 @@ async def cmd_show_liquidation_monitor_settings(message: Message, db: AsyncSessi
         f"Exchange: {settings.exchange}\n"
         f"Threshold: {settings.threshold}\n"
         f"Pairs: {', '.join(settings.pairs)}\n"
+        f"Digest: {f'{settings.digest_window:g}s' if settings.digest_enabled else 'off'}\n"
         f"Status: {'active' if settings.enabled else 'not active'}"
     )
 
 
 @router.message(Command("drop_lm_settings"))
 async def cmd_drop_liquidation_monitor_settigngs(message: Message, db: AsyncSession, user_db: UserDB):
-    await db.refresh(user_db, ("liquid_monitor_settings",))
-    if user_db.liquid_monitor_settings:
-        await CRUD.liquidation_settings.delete(
-            db, id=user_db.liquid_monitor_settings.id
-        )
+    settings = await load_settings(db, user_db)
+    if settings:
+        await CRUD.liquidation_settings.delete_subscriptions(db, user_id=user_db.id, commit=False)
+        await CRUD.liquidation_settings.delete(db, id=settings.id)
+        subscription_index.remove(user_db.id)
         return await message.answer("Liquidation settings deleted")
     return await message.answer("No settings pls type /setup_lm")
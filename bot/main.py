@@ -1,34 +1,52 @@
 import asyncio
-import logging
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 from bot.config.base import settings
-from bot.handlers import base, liquidation
+from bot.config.log import setup_logging
+from bot.handlers import admin, base, liquidation
 from bot.db.connection import db_session_maker
 from bot.middlewares.db_session_middleware import DbSessionMiddleware
 from bot.middlewares.user_middleware import UserMiddleware
 from bot.services.liquidation_monitor import start_handler
+from bot.services.loop_monitor import loop_monitor
+from bot.services.metrics import register_collectors, registry, start_metrics_server
+from bot.services.profiler import profile_on_start
 
 
-logging.basicConfig(level=logging.INFO)
-
-bot: Bot = Bot(token=settings.BOT_TOKEN.get_secret_value())
+session = (
+    AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL))
+    if settings.TELEGRAM_API_URL
+    else None
+)
+bot: Bot = Bot(token=settings.BOT_TOKEN.get_secret_value(), session=session)
 dp: Dispatcher = Dispatcher()
 
 
 
 async def main(bot: Bot) -> None:
     asyncio.create_task(start_handler(bot))
+    asyncio.create_task(loop_monitor.run())
+    if settings.PROFILE_ON_START:
+        asyncio.create_task(profile_on_start(settings.PROFILE_ON_START))
+    if settings.METRICS_PORT:
+        register_collectors(registry)
+        await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
 
     dp.update.middleware.register(DbSessionMiddleware(db_session_maker=db_session_maker))
     dp.message.middleware.register(UserMiddleware())
     dp.callback_query.middleware.register(UserMiddleware())
-    dp.include_routers(base.router, liquidation.router)
+    dp.include_routers(admin.router, base.router, liquidation.router)
 
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot) # type: ignore
 
 
 if __name__ == "__main__":
-    asyncio.run(main(bot))
+    log_listener = setup_logging()
+    try:
+        asyncio.run(main(bot))
+    finally:
+        log_listener.stop()
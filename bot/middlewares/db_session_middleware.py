@@ -5,11 +5,56 @@ from aiogram.types import TelegramObject
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from bot.db.stats import SessionStats, session_stats
+
+
+# Handler flags declaring that a handler never uses the database, e.g.
+# @router.message(Command("help"), flags=NO_DB); UserMiddleware then skips
+# looking the user up, so the update opens no session at all.
+NO_DB = {"db": False}
+
+
+class LazySession:
+    """Stands in for an `AsyncSession` and only creates it on first use.
+
+    Every attribute is forwarded to the real session, so handlers use it
+    exactly like the `AsyncSession` they are annotated with. Updates that
+    never touch it cost neither a session nor a pool checkout.
+    """
+
+    __slots__ = ("_session_maker", "_session", "_stats")
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession], stats: SessionStats = session_stats):
+        self._session_maker = session_maker
+        self._session: AsyncSession | None = None
+        self._stats = stats
+
+    @property
+    def opened(self) -> bool:
+        return self._session is not None
+
+    def _open(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_maker()
+            self._stats.sessions += 1
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._open(), name)
+
+    def __contains__(self, instance: object) -> bool:
+        return self._session is not None and instance in self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
 
 class DbSessionMiddleware(BaseMiddleware):
-    def __init__(self, db_session_maker: async_sessionmaker[AsyncSession]):
+    def __init__(self, db_session_maker: async_sessionmaker[AsyncSession], stats: SessionStats = session_stats):
         super().__init__()
         self.db_session_maker: async_sessionmaker[AsyncSession] = db_session_maker
+        self.stats = stats
 
     async def __call__(
         self,
@@ -17,6 +62,10 @@ class DbSessionMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.db_session_maker() as session:
-            data["db"] = session
+        self.stats.updates += 1
+        session = LazySession(self.db_session_maker, self.stats)
+        data["db"] = session
+        try:
             return await handler(event, data)
+        finally:
+            await session.close()
@@ -1,6 +1,7 @@
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery, TelegramObject
 
 from bot import CRUD
@@ -14,6 +15,8 @@ class UserMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
+        if get_flag(data, "db", default=True) is False:
+            return await handler(event, data)
         db = data["db"]
         if isinstance(event, (Message, CallbackQuery)) and event.from_user:
             user = await CRUD.user.get(db=db, id=event.from_user.id)
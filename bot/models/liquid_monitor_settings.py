@@ -3,7 +3,7 @@ from typing import TYPE_CHECKING
 from datetime import datetime
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import JSON, DateTime, String, func, ForeignKey
+from sqlalchemy import JSON, DateTime, String, UniqueConstraint, false, func, ForeignKey
 
 from bot.db.base_class import Base
 
@@ -14,10 +14,11 @@ if TYPE_CHECKING:
 
 class LiquidMonitorSettingsDB(Base):
     __tablename__ = "liquid_monitor_settings"
+    __table_args__ = (UniqueConstraint("user_id", name="uq_liquid_monitor_settings_user_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
-    enabled: Mapped[bool] = mapped_column(default=False)
+    enabled: Mapped[bool] = mapped_column(default=False, index=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -30,5 +31,7 @@ class LiquidMonitorSettingsDB(Base):
     threshold: Mapped[float] = mapped_column(default=0.0)
     exchange: Mapped[str] = mapped_column(String(64))
     pairs: Mapped[list[str]] = mapped_column(JSON)
+    digest_enabled: Mapped[bool] = mapped_column(default=False, server_default=false())
+    digest_window: Mapped[float] = mapped_column(default=2.0, server_default="2")
 
     user: Mapped["UserDB"] = relationship(back_populates="liquid_monitor_settings", uselist=False)
\ No newline at end of file
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, ForeignKey, Index, String, UniqueConstraint, func
+
+from bot.db.base_class import Base
+
+
+class LiquidationSubscriptionDB(Base):
+    """One (user, exchange, symbol) a user wants alerts for, with their threshold.
+
+    `exchange` is stored lower case and `symbol` upper case, so lookups
+    compare them directly and can use the (exchange, symbol, threshold)
+    index to find every recipient of an event with one range scan.
+    """
+
+    __tablename__ = "liquidation_subscription"
+    __table_args__ = (
+        UniqueConstraint("user_id", "exchange", "symbol", name="uq_liquidation_subscription_user_exchange_symbol"),
+        Index("ix_liquidation_subscription_exchange_symbol_threshold", "exchange", "symbol", "threshold"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    exchange: Mapped[str] = mapped_column(String(64))
+    symbol: Mapped[str] = mapped_column(String(64))
+    threshold: Mapped[float] = mapped_column(default=0.0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
@@ -6,6 +6,8 @@ class LiquidationSettings(BaseModel):
     threshold: float | None = 0.0
     exchange: str | None = ''
     pairs: list[str] = []
+    digest_enabled: bool = False
+    digest_window: float = 2.0
 
 
 class LiquidationSettingsCreate(LiquidationSettings):
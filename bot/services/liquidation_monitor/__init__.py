@@ -1,6 +1,15 @@
-from .liquidation_starter import start_handler
+from .event_queue import liquidation_queue
+from .latency import latency_stats
+from .liquidation_starter import event_dedup, feed_status, frame_recorder, start_handler
+from .subscriptions import subscription_index
 
 
 __all__ = [
+    "event_dedup",
+    "feed_status",
+    "frame_recorder",
+    "latency_stats",
+    "liquidation_queue",
     "start_handler",
+    "subscription_index",
 ]
\ No newline at end of file
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from collections.abc import Collection, Iterator
+from typing import Any
+
+from bot.services.liquidation_monitor.events import Exchange
+from bot.services.liquidation_monitor.subscriptions import SubscriptionIndex
+
+
+FIREHOSE = "!forceOrder@arr"
+# Streams named in one SUBSCRIBE or UNSUBSCRIBE message; larger subscription
+# changes are split across several messages.
+PARAMS_PER_MESSAGE = 100
+# Binance accepts up to 10 control messages per second per connection.
+CONTROL_MESSAGE_INTERVAL = 0.1
+
+
+def symbol_stream(symbol: str) -> str:
+    return f"{symbol.lower()}@forceOrder"
+
+
+def wanted_streams(symbols: Collection[str], max_symbols: int) -> set[str]:
+    """Per-symbol streams for `symbols`, or the all-market stream above `max_symbols`."""
+    if len(symbols) > max_symbols:
+        return {FIREHOSE}
+    return {symbol_stream(symbol) for symbol in symbols}
+
+
+def _chunks(streams: Collection[str]) -> Iterator[list[str]]:
+    ordered = sorted(streams)
+    for i in range(0, len(ordered), PARAMS_PER_MESSAGE):
+        yield ordered[i:i + PARAMS_PER_MESSAGE]
+
+
+class StreamSubscriptions:
+    """Keeps a Binance combined-stream connection subscribed to what users watch.
+
+    Listens for changes to the subscription index and sends live
+    SUBSCRIBE/UNSUBSCRIBE requests for the difference, falling back to the
+    all-market stream once more than `max_symbols` symbols are watched.
+    """
+
+    def __init__(
+        self,
+        ws: Any,
+        index: SubscriptionIndex,
+        *,
+        max_symbols: int = 100,
+        debounce: float = 1.0,
+    ):
+        self.ws = ws
+        self.index = index
+        self.max_symbols = max_symbols
+        self.debounce = debounce
+        self.current: set[str] = set()
+        self._request_id = 0
+        self._changed = asyncio.Event()
+
+    async def _send(self, method: str, streams: Collection[str]) -> None:
+        for params in _chunks(streams):
+            self._request_id += 1
+            await self.ws.send(json.dumps({"method": method, "params": params, "id": self._request_id}))
+            await asyncio.sleep(CONTROL_MESSAGE_INTERVAL)
+
+    async def sync(self) -> None:
+        wanted = wanted_streams(self.index.symbols(Exchange.BINANCE.value), self.max_symbols)
+        removed = self.current - wanted
+        added = wanted - self.current
+        if removed:
+            await self._send("UNSUBSCRIBE", removed)
+        if added:
+            await self._send("SUBSCRIBE", added)
+        self.current = wanted
+
+    async def run(self) -> None:
+        self.index.add_watcher(self._changed.set)
+        try:
+            await self.sync()
+            while True:
+                await self._changed.wait()
+                await asyncio.sleep(self.debounce)
+                self._changed.clear()
+                await self.sync()
+        finally:
+            self.index.remove_watcher(self._changed.set)
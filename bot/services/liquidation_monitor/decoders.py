@@ -0,0 +1,201 @@
+import json
+from collections.abc import Callable
+from typing import Any, Protocol
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - msgspec is optional
+    msgspec = None
+
+from bot.services.liquidation_monitor.events import Exchange, LiquidationEvent, iso_to_ms
+
+
+class Decoder(Protocol):
+    def __call__(self, frame: str, received_at: float = 0.0) -> list[LiquidationEvent]: ...
+
+
+# Substrings every liquidation frame contains; anything else (OKX subscribe
+# acks, BitMEX welcome/info/partial frames, pongs) is skipped unparsed.
+BINANCE_MARKER = '"forceOrder"'
+BINANCE_COMBINED_PREFIX = '{"stream"'
+OKX_MARKER = '"data"'
+BITMEX_MARKER = '"insert"'
+
+
+def _json_decoders(loads: Callable[[str], Any]) -> dict[Exchange, Decoder]:
+    def decode_binance(frame: str, received_at: float = 0.0) -> list[LiquidationEvent]:
+        if BINANCE_MARKER not in frame:
+            return []
+        data = loads(frame)
+        data = data.get("data", data)
+        order = data["o"]
+        return [LiquidationEvent.create(
+            Exchange.BINANCE,
+            order["s"],
+            order["S"],
+            order["ap"],
+            order["q"],
+            order.get("T") or data.get("E", 0),
+            received_at=received_at,
+        )]
+
+    def decode_okx(frame: str, received_at: float = 0.0) -> list[LiquidationEvent]:
+        if OKX_MARKER not in frame:
+            return []
+        return [
+            LiquidationEvent.create(
+                Exchange.OKX,
+                entry["instId"],
+                detail["side"],
+                detail["bkPx"],
+                detail["sz"],
+                int(detail.get("ts") or 0),
+                received_at=received_at,
+            )
+            for entry in loads(frame).get("data", ())
+            for detail in entry.get("details", ())
+        ]
+
+    def decode_bitmex(frame: str, received_at: float = 0.0) -> list[LiquidationEvent]:
+        if BITMEX_MARKER not in frame:
+            return []
+        data = loads(frame)
+        if data.get("action") != "insert":
+            return []
+        return [
+            LiquidationEvent.create(
+                Exchange.BITMEX,
+                order["symbol"],
+                order["side"],
+                order["price"],
+                order.get("leavesQty", 0),
+                iso_to_ms(order.get("timestamp")),
+                order.get("orderID", ""),
+                received_at,
+            )
+            for order in data.get("data", ())
+        ]
+
+    return {
+        Exchange.BINANCE: decode_binance,
+        Exchange.OKX: decode_okx,
+        Exchange.BITMEX: decode_bitmex,
+    }
+
+
+def _msgspec_decoders() -> dict[Exchange, Decoder]:
+    class BinanceOrder(msgspec.Struct):
+        s: str
+        S: str
+        q: str
+        ap: str
+        T: int = 0
+
+    class BinanceFrame(msgspec.Struct):
+        o: BinanceOrder
+        E: int = 0
+
+    class BinanceCombinedFrame(msgspec.Struct):
+        data: BinanceFrame
+
+    class OkxDetail(msgspec.Struct):
+        side: str
+        sz: str
+        bkPx: str
+        ts: str = "0"
+
+    class OkxEntry(msgspec.Struct):
+        instId: str
+        details: list[OkxDetail] = []
+
+    class OkxFrame(msgspec.Struct):
+        data: list[OkxEntry] = []
+
+    class BitmexOrder(msgspec.Struct):
+        orderID: str
+        symbol: str
+        side: str
+        price: float
+        leavesQty: float = 0
+        timestamp: str | None = None
+
+    class BitmexFrame(msgspec.Struct):
+        action: str = ""
+        data: list[BitmexOrder] = []
+
+    binance = msgspec.json.Decoder(BinanceFrame)
+    binance_combined = msgspec.json.Decoder(BinanceCombinedFrame)
+    okx = msgspec.json.Decoder(OkxFrame)
+    bitmex = msgspec.json.Decoder(BitmexFrame)
+
+    def decode_binance(frame: str, received_at: float = 0.0) -> list[LiquidationEvent]:
+        if BINANCE_MARKER not in frame:
+            return []
+        if frame.startswith(BINANCE_COMBINED_PREFIX):
+            data = binance_combined.decode(frame).data
+        else:
+            data = binance.decode(frame)
+        order = data.o
+        return [LiquidationEvent.create(
+            Exchange.BINANCE, order.s, order.S, order.ap, order.q, order.T or data.E, received_at=received_at
+        )]
+
+    def decode_okx(frame: str, received_at: float = 0.0) -> list[LiquidationEvent]:
+        if OKX_MARKER not in frame:
+            return []
+        return [
+            LiquidationEvent.create(
+                Exchange.OKX,
+                entry.instId,
+                detail.side,
+                detail.bkPx,
+                detail.sz,
+                int(detail.ts or 0),
+                received_at=received_at,
+            )
+            for entry in okx.decode(frame).data
+            for detail in entry.details
+        ]
+
+    def decode_bitmex(frame: str, received_at: float = 0.0) -> list[LiquidationEvent]:
+        if BITMEX_MARKER not in frame:
+            return []
+        data = bitmex.decode(frame)
+        if data.action != "insert":
+            return []
+        return [
+            LiquidationEvent.create(
+                Exchange.BITMEX,
+                order.symbol,
+                order.side,
+                order.price,
+                order.leavesQty,
+                iso_to_ms(order.timestamp),
+                order.orderID,
+                received_at,
+            )
+            for order in data.data
+        ]
+
+    return {
+        Exchange.BINANCE: decode_binance,
+        Exchange.OKX: decode_okx,
+        Exchange.BITMEX: decode_bitmex,
+    }
+
+
+BACKENDS: dict[str, Callable[[], dict[Exchange, Decoder]]] = {
+    "json": lambda: _json_decoders(json.loads),
+}
+if msgspec is not None:
+    BACKENDS["msgspec"] = _msgspec_decoders
+
+
+def get_decoders(backend: str | None = None) -> dict[Exchange, Decoder]:
+    """Decoders for `backend`, or for the fastest installed one."""
+    if backend is None:
+        backend = "msgspec" if "msgspec" in BACKENDS else "json"
+    return BACKENDS[backend]()
+
+
+decoders = get_decoders()
@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+
+from bot.services.liquidation_monitor.events import LiquidationEvent
+
+
+EventKey = tuple[str, str] | tuple[str, int, float, float]
+
+
+def event_key(event: LiquidationEvent) -> EventKey | None:
+    if event.order_id:
+        return (event.symbol, event.order_id)
+    if event.timestamp:
+        return (event.symbol, event.timestamp, event.price, event.quantity)
+    return None
+
+
+class ConnectionStats:
+    """How often one connection delivered an event first, and how late it was otherwise."""
+
+    __slots__ = ("wins", "losses", "skew_total", "skew_max")
+
+    def __init__(self) -> None:
+        self.wins = 0
+        self.losses = 0
+        self.skew_total = 0.0
+        self.skew_max = 0.0
+
+    @property
+    def win_rate(self) -> float:
+        total = self.wins + self.losses
+        return self.wins / total if total else 0.0
+
+    @property
+    def skew_avg(self) -> float:
+        return self.skew_total / self.losses if self.losses else 0.0
+
+
+class EventDeduplicator:
+    """Bounded LRU of recently seen event identities for one exchange.
+
+    Lets several connections to the same feed run at once (redundant
+    connections, or one being rotated) while only the first arrival of each
+    event is forwarded. Identity is the exchange order id when the feed has
+    one, otherwise symbol + exchange time + price + quantity; events with
+    neither are never treated as duplicates, since two real liquidations
+    could share the rest of the key.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.duplicates = 0
+        self.stats: dict[int, ConnectionStats] = {}
+        self._seen: OrderedDict[EventKey, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _stats(self, connection: int) -> ConnectionStats:
+        stats = self.stats.get(connection)
+        if stats is None:
+            stats = self.stats[connection] = ConnectionStats()
+        return stats
+
+    def seen(self, event: LiquidationEvent, connection: int = 0) -> bool:
+        """Record the event and tell whether another arrival was recorded first."""
+        key = event_key(event)
+        if key is None:
+            return False
+
+        now = time.monotonic()
+        first_arrival = self._seen.get(key)
+        if first_arrival is not None:
+            self._seen.move_to_end(key)
+            self.duplicates += 1
+            stats = self._stats(connection)
+            stats.losses += 1
+            skew = now - first_arrival
+            stats.skew_total += skew
+            if skew > stats.skew_max:
+                stats.skew_max = skew
+            return True
+
+        self._seen[key] = now
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        self._stats(connection).wins += 1
+        return False
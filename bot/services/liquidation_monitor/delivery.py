@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot.services.liquidation_monitor.events import LiquidationEvent
+from bot.services.liquidation_monitor.latency import latency_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Reservation-style token bucket: `reserve` returns how long to wait for the slot."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float | None = None, now: float = 0.0):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class OutgoingMessage:
+    """A queued alert with its retry state.
+
+    `slot` is the loop time of the chat slot reserved for it, `None` until
+    one is reserved or after a flood-control pause voided it.
+    """
+
+    __slots__ = ("chat_id", "text", "kwargs", "event", "queued_at", "attempts", "slot")
+
+    def __init__(
+        self, chat_id: int, text: str, kwargs: dict[str, Any], event: LiquidationEvent | None, queued_at: float
+    ):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.event = event
+        self.queued_at = queued_at
+        self.attempts = 0
+        self.slot: float | None = None
+
+
+class TelegramDelivery:
+    """Concurrent, rate-limited fan-out of alert messages.
+
+    Messages are queued and sent by a pool of workers. Every send takes a slot
+    from the global bucket and from its chat's bucket; a `TelegramRetryAfter`
+    pauses only that chat before the message is retried. A message whose
+    chat slot or pause lies ahead is parked until then and put back on the
+    queue, so a busy or paused chat never holds a worker that could be
+    serving other chats. Alerts sent with the `event` they report feed the
+    send and end-to-end latency stats.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        *,
+        workers: int = 16,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        max_retries: int = 3,
+        queue_size: int = 0,
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.sent = 0
+        self.throttled = 0
+        self.failed = 0
+        self._queue: asyncio.Queue[OutgoingMessage] = asyncio.Queue(queue_size)
+        self._global = TokenBucket(global_rate)
+        self._chats: dict[int, TokenBucket] = {}
+        self._paused_until: dict[int, float] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+        self._parked: set[asyncio.Task[None]] = set()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() + len(self._parked)
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        tasks = [*self._tasks, *self._parked]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._parked.clear()
+
+    async def join(self) -> None:
+        await self._queue.join()
+
+    async def send(
+        self, chat_id: int, text: str, *, event: LiquidationEvent | None = None, **kwargs: Any
+    ) -> None:
+        await self._queue.put(OutgoingMessage(chat_id, text, kwargs, event, time.time()))
+
+    async def _worker(self) -> None:
+        while True:
+            message = await self._queue.get()
+            parked = False
+            try:
+                parked = await self._deliver(message)
+            finally:
+                # A parked message stays unfinished until it is back on the queue
+                if not parked:
+                    self._queue.task_done()
+
+    def _park(self, message: OutgoingMessage, delay: float) -> None:
+        task = asyncio.create_task(self._requeue(message, delay))
+        self._parked.add(task)
+        task.add_done_callback(self._parked.discard)
+
+    async def _requeue(self, message: OutgoingMessage, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._queue.put(message)
+        self._queue.task_done()
+
+    def _chat_delay(self, message: OutgoingMessage, now: float) -> float:
+        """Seconds until the message's chat may be sent to, reserving its slot on the way."""
+        paused = self._paused_until.get(message.chat_id, 0.0) - now
+        if paused > 0:
+            message.slot = None
+            return paused
+        if message.slot is None:
+            bucket = self._chats.get(message.chat_id)
+            if bucket is None:
+                bucket = self._chats[message.chat_id] = TokenBucket(self.chat_rate, now=now)
+            message.slot = now + bucket.reserve(now)
+        return message.slot - now
+
+    async def _deliver(self, message: OutgoingMessage) -> bool:
+        """Send the message, or park it and return `True` if its chat has to wait."""
+        loop = asyncio.get_running_loop()
+        delay = self._chat_delay(message, loop.time())
+        if delay > 0:
+            self._park(message, delay)
+            return True
+
+        # The global limit applies to every chat alike, so waiting for it
+        # here holds back nothing another worker could send
+        delay = self._global.reserve(loop.time())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        chat_id, event = message.chat_id, message.event
+        try:
+            await self.bot.send_message(chat_id, message.text, **message.kwargs)
+        except TelegramRetryAfter as e:
+            self.throttled += 1
+            message.attempts += 1
+            self._paused_until[chat_id] = loop.time() + e.retry_after
+            if message.attempts <= self.max_retries:
+                message.slot = None
+                self._park(message, e.retry_after)
+                return True
+            self.failed += 1
+            logger.warning(
+                "Giving up on message to %s after %s retries",
+                chat_id,
+                self.max_retries,
+                extra=self._log_fields(chat_id, event),
+            )
+        except Exception as e:
+            self.failed += 1
+            logger.warning(
+                "Error sending message to %s: %s", chat_id, e, extra=self._log_fields(chat_id, event)
+            )
+        else:
+            self.sent += 1
+            if event is not None:
+                self._record_latency(event, message.queued_at)
+        return False
+
+    @staticmethod
+    def _log_fields(chat_id: int, event: LiquidationEvent | None) -> dict[str, Any]:
+        if event is None:
+            return {"user_id": chat_id}
+        return {"user_id": chat_id, "exchange": event.exchange, "symbol": event.symbol}
+
+    @staticmethod
+    def _record_latency(event: LiquidationEvent, queued_at: float) -> None:
+        now = time.time()
+        latency_stats.record("send", event.exchange, now - queued_at)
+        if event.timestamp:
+            latency_stats.record("total", event.exchange, now - event.timestamp / 1000)
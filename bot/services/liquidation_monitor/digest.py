@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any
+
+from bot.services.liquidation_monitor.delivery import TelegramDelivery
+from bot.services.liquidation_monitor.events import LiquidationEvent, Side
+
+
+class _Digest:
+    __slots__ = (
+        "count", "total_usd", "long_count", "long_usd", "short_count", "short_usd",
+        "largest_usd", "largest_line", "first_text",
+    )
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_usd = 0.0
+        self.long_count = 0
+        self.long_usd = 0.0
+        self.short_count = 0
+        self.short_usd = 0.0
+        self.largest_usd = -1.0
+        self.largest_line = ""
+        self.first_text = ""
+
+    def add(self, event: LiquidationEvent, text: str) -> None:
+        if not self.count:
+            self.first_text = text
+        usd_value = event.usd_value
+        self.count += 1
+        self.total_usd += usd_value
+        if event.side is Side.SELL:
+            self.long_count += 1
+            self.long_usd += usd_value
+        elif event.side is Side.BUY:
+            self.short_count += 1
+            self.short_usd += usd_value
+        if usd_value > self.largest_usd:
+            self.largest_usd = usd_value
+            self.largest_line = (
+                f"{event.symbol} [{event.exchange.label}] {usd_value:,.0f} USDT @ {event.price}"
+            )
+
+    def render(self, window: float) -> str:
+        if self.count == 1:
+            return self.first_text
+        return (
+            f"💥 {self.count} liquidations in {window:g}s\n"
+            f"💰 Total: {self.total_usd:,.0f} USDT\n"
+            f"🐋 Largest: {self.largest_line}\n"
+            f"📉 Longs: {self.long_count} | {self.long_usd:,.0f} USDT\n"
+            f"🚀 Shorts: {self.short_count} | {self.short_usd:,.0f} USDT"
+        )
+
+
+class AlertDigests:
+    """Coalesces a user's alerts into one message per window.
+
+    The first matched event opens the user's window; everything matched until
+    it closes is merged and sent once. A window holding a single event is sent
+    as the normal alert.
+    """
+
+    def __init__(self, delivery: TelegramDelivery, **send_kwargs: Any):
+        self.delivery = delivery
+        self.send_kwargs = send_kwargs
+        self._pending: dict[int, _Digest] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, user_id: int, window: float, event: LiquidationEvent, text: str) -> None:
+        digest = self._pending.get(user_id)
+        if digest is None:
+            digest = self._pending[user_id] = _Digest()
+            task = asyncio.create_task(self._flush_after(user_id, window))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        digest.add(event, text)
+
+    async def _flush_after(self, user_id: int, window: float) -> None:
+        await asyncio.sleep(window)
+        digest = self._pending.pop(user_id)
+        await self.delivery.send(user_id, digest.render(window), **self.send_kwargs)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pending.clear()
@@ -0,0 +1,60 @@
+import asyncio
+from enum import Enum
+
+from bot.config.base import settings
+from bot.services.liquidation_monitor.events import LiquidationEvent
+
+
+class OverflowPolicy(str, Enum):
+    BLOCK = "block"
+    DROP_NEWEST = "drop_newest"
+    DROP_OLDEST = "drop_oldest"
+
+
+class LiquidationQueue:
+    """Bounded hand-off between the exchange listeners and the dispatch workers.
+
+    With the drop policies `put` never waits, so a listener keeps reading
+    its socket however slow delivery is; `dropped` counts what was shed.
+    """
+
+    def __init__(self, maxsize: int, overflow: OverflowPolicy | str = OverflowPolicy.DROP_OLDEST):
+        self._queue: asyncio.Queue[LiquidationEvent] = asyncio.Queue(maxsize)
+        self.overflow = OverflowPolicy(overflow)
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def maxsize(self) -> int:
+        return self._queue.maxsize
+
+    async def put(self, event: LiquidationEvent) -> None:
+        if self.overflow is OverflowPolicy.BLOCK:
+            await self._queue.put(event)
+            return
+
+        if self._queue.full():
+            self.dropped += 1
+            if self.overflow is OverflowPolicy.DROP_NEWEST:
+                return
+            self._queue.get_nowait()
+            self._queue.task_done()
+        self._queue.put_nowait(event)
+
+    async def get(self) -> LiquidationEvent:
+        return await self._queue.get()
+
+    def task_done(self) -> None:
+        self._queue.task_done()
+
+    async def join(self) -> None:
+        await self._queue.join()
+
+
+liquidation_queue = LiquidationQueue(
+    maxsize=settings.MONITOR_QUEUE_SIZE,
+    overflow=settings.MONITOR_QUEUE_OVERFLOW,
+)
@@ -0,0 +1,96 @@
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+
+
+class Exchange(str, Enum):
+    BINANCE = "binance"
+    OKX = "okx"
+    BITMEX = "bitmex"
+
+    @property
+    def label(self) -> str:
+        return _EXCHANGE_LABELS[self]
+
+
+_EXCHANGE_LABELS = {
+    Exchange.BINANCE: "Binance",
+    Exchange.OKX: "OKX",
+    Exchange.BITMEX: "BitMEX",
+}
+
+
+class Side(str, Enum):
+    BUY = "BUY"
+    SELL = "SELL"
+
+    @classmethod
+    def parse(cls, value: str | None) -> "Side | None":
+        return _SIDES.get(value) if value else None
+
+
+_SIDES = {
+    **{s: Side.BUY for s in ("BUY", "Buy", "buy")},
+    **{s: Side.SELL for s in ("SELL", "Sell", "sell")},
+}
+
+
+def iso_to_ms(value: str | None) -> int:
+    if not value:
+        return 0
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+@dataclass(frozen=True, slots=True)
+class LiquidationEvent:
+    """One normalised liquidation, shared by every stage of the pipeline.
+
+    `timestamp` is the exchange event time in milliseconds since the epoch,
+    0 when the feed does not provide one; `order_id` is set only by feeds
+    that identify liquidation orders (BitMEX). `received_at` is the wall
+    clock time in seconds the frame carrying the event arrived, 0.0 for
+    events that did not come from a live feed.
+    """
+
+    exchange: Exchange
+    symbol: str
+    side: Side | None
+    price: float
+    quantity: float
+    usd_value: float
+    timestamp: int = 0
+    order_id: str = ""
+    received_at: float = 0.0
+
+    @classmethod
+    def create(
+        cls,
+        exchange: Exchange,
+        symbol: str,
+        side: Side | str | None,
+        price: float | str,
+        quantity: float | str,
+        timestamp: int = 0,
+        order_id: str = "",
+        received_at: float = 0.0,
+    ) -> "LiquidationEvent":
+        price = float(price)
+        quantity = float(quantity)
+        return cls(
+            exchange,
+            sys.intern(symbol),
+            side if isinstance(side, Side) or side is None else Side.parse(side),
+            price,
+            quantity,
+            price * quantity,
+            timestamp,
+            order_id,
+            received_at,
+        )
+
+    @property
+    def link(self) -> str:
+        if self.exchange is Exchange.BINANCE:
+            return f"https://www.binance.com/uk-UA/futures/{self.symbol}"
+        return ""
@@ -0,0 +1,77 @@
+from bisect import bisect_left
+
+from bot.services.liquidation_monitor.events import Exchange
+
+
+# Upper bounds in seconds: 8 log-spaced buckets per decade from 100 µs to
+# 100 s, so a quantile read from a histogram is within ~33% of the truth.
+BUCKET_BOUNDS: tuple[float, ...] = tuple(1e-4 * 10 ** (i / 8) for i in range(49))
+
+# Pipeline stages, in the order an alert passes through them:
+#   wire     exchange event time → frame received (includes clock skew)
+#   decode   frame received → events decoded
+#   queue    frame received → picked up by a monitor worker
+#   match    subscription lookup and alert formatting
+#   enqueue  handing the alerts to the delivery queue (backpressure)
+#   send     delivery queue → Telegram acknowledged the message
+#   total    exchange event time → Telegram acknowledged the message
+STAGES = ("wire", "decode", "queue", "match", "enqueue", "send", "total")
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; memory does not grow with samples."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        if seconds < 0:
+            seconds = 0.0
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q` quantile, capped at the maximum seen."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class LatencyStats:
+    """Latency histograms per pipeline stage and exchange."""
+
+    def __init__(self) -> None:
+        self.histograms: dict[tuple[str, Exchange], LatencyHistogram] = {}
+
+    def record(self, stage: str, exchange: Exchange, seconds: float) -> None:
+        histogram = self.histograms.get((stage, exchange))
+        if histogram is None:
+            histogram = self.histograms[(stage, exchange)] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def get(self, stage: str, exchange: Exchange) -> LatencyHistogram:
+        return self.histograms.get((stage, exchange)) or LatencyHistogram()
+
+    def clear(self) -> None:
+        self.histograms.clear()
+
+
+latency_stats = LatencyStats()
@@ -1,7 +1,9 @@
 import asyncio
 import websockets
-from websockets.exceptions import ConnectionClosedError
 import json
+import logging
+import time
+from functools import partial
 
 from typing import Any
 
@@ -9,109 +11,218 @@ from aiogram import Bot
 from aiogram.types import LinkPreviewOptions
 
 from bot import CRUD
+from bot.config.base import settings
 from bot.db.connection import db_session_maker
 from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+from bot.services.liquidation_monitor.binance_streams import StreamSubscriptions
+from bot.services.liquidation_monitor.decoders import decoders
+from bot.services.liquidation_monitor.dedup import EventDeduplicator
+from bot.services.liquidation_monitor.delivery import TelegramDelivery
+from bot.services.liquidation_monitor.digest import AlertDigests
+from bot.services.liquidation_monitor.event_queue import LiquidationQueue, liquidation_queue
+from bot.services.liquidation_monitor.events import Exchange, LiquidationEvent, Side
+from bot.services.liquidation_monitor.latency import latency_stats
+from bot.services.liquidation_monitor.recording import FrameRecorder
+from bot.services.liquidation_monitor.subscriptions import subscription_index
+from bot.services.liquidation_monitor.supervisor import FeedStatus, FeedSupervisor
+
+
+logger = logging.getLogger(__name__)
 
 
 async def get_active_liq_settings() -> list[LiquidMonitorSettingsDB]:
     async with db_session_maker() as db:
-        return list(await CRUD.liquidation_settings.get_multi(
-            db, where_conditions=[LiquidMonitorSettingsDB.enabled]
-        ))
+        return [
+            settings
+            async for settings in CRUD.liquidation_settings.stream_multi(
+                db, where_conditions=[LiquidMonitorSettingsDB.enabled]
+            )
+        ]
 
 
-async def process_liquidation(bot: Bot, source: str, info: dict[str, Any]):
-    symbol = info["symbol"]
-    price = float(info["price"])
-    quantity = float(info["quantity"])
-    usd_value = price * quantity
+async def load_subscriptions() -> None:
+    subscription_index.load(await get_active_liq_settings())
 
-    settings = await get_active_liq_settings()
-    user_ids = [
-        s.user_id for s in settings if usd_value >= s.threshold and symbol in s.pairs and source.lower() == s.exchange.lower()
-    ]
-
-    if not user_ids:
-        return
 
+def format_liquidation(event: LiquidationEvent) -> str:
     explanation = "❓ Unknown liquidation type"
-    if info.get("side") == "BUY":
+    if event.side is Side.BUY:
         explanation = "🚀 Short liquidation (market went up)"
-    elif info.get("side") == "SELL":
+    elif event.side is Side.SELL:
         explanation = "📉 Long liquidation (market went down)"
 
-    text = (
-        f"💥 Liquidation [{source}]\n"
-        f"📌 {symbol} | {explanation}\n"
-        f"💰 Amount: {usd_value:,.0f} USDT\n"
-        f"💵 Price: {price}\n"
-        f"{info.get('link', '')}"
+    return (
+        f"💥 Liquidation [{event.exchange.label}]\n"
+        f"📌 {event.symbol} | {explanation}\n"
+        f"💰 Amount: {event.usd_value:,.0f} USDT\n"
+        f"💵 Price: {event.price}\n"
+        f"{event.link}"
     )
+
+
+async def process_liquidation(
+    delivery: TelegramDelivery,
+    event: LiquidationEvent,
+    digests: AlertDigests | None = None,
+):
+    started = time.time()
+    user_ids = subscription_index.match(event.exchange.value, event.symbol, event.usd_value)
+
+    if not user_ids:
+        latency_stats.record("match", event.exchange, time.time() - started)
+        return
+
+    counts = event_counts[event.exchange]
+    counts.matched += 1
+    counts.alerts += len(user_ids)
+    text = format_liquidation(event)
     options_1 = LinkPreviewOptions(is_disabled=True)
+    matched = time.time()
+    latency_stats.record("match", event.exchange, matched - started)
     for user_id in user_ids:
-        try:
-            await bot.send_message(user_id, text, link_preview_options=options_1)
-        except Exception as e:
-            print(f"Error sending message to {user_id}: {e}")
+        window = subscription_index.digest_window(user_id)
+        if window and digests is not None:
+            digests.add(user_id, window, event, text)
+        else:
+            await delivery.send(user_id, text, event=event, link_preview_options=options_1)
+    latency_stats.record("enqueue", event.exchange, time.time() - matched)
+
+
+# Cheap requests each exchange answers with a frame, so a quiet but healthy
+# stream still looks alive to the supervisor's watchdog.
+HEARTBEATS = {
+    Exchange.BINANCE: json.dumps({"method": "LIST_SUBSCRIPTIONS", "id": 0}),
+    Exchange.OKX: "ping",
+    Exchange.BITMEX: "ping",
+}
+
+FEED_URLS = {
+    Exchange.BINANCE: (
+        settings.BINANCE_COMBINED_WS_URLS if settings.BINANCE_SYMBOL_STREAMS else settings.BINANCE_WS_URLS
+    ),
+    Exchange.OKX: settings.OKX_WS_URLS,
+    Exchange.BITMEX: settings.BITMEX_WS_URLS,
+}
+
+
+def connection_name(exchange: Exchange, connection: int) -> str:
+    return f"{exchange.label}#{connection + 1}" if connection else exchange.label
+
+
+# One status per redundant connection; the connections of an exchange share
+# a deduplicator, so only the first arrival of each event is forwarded and
+# its per-connection stats show which endpoint tends to win.
+feed_status = {
+    exchange: [FeedStatus(connection_name(exchange, i)) for i in range(settings.FEED_REDUNDANCY)]
+    for exchange in Exchange
+}
+event_dedup = {exchange: EventDeduplicator(settings.FEED_DEDUP_SIZE) for exchange in Exchange}
+
+
+class EventCounts:
+    """Per-exchange pipeline counters, bumped in place and read by the metrics endpoint."""
+
+    __slots__ = ("decoded", "decode_errors", "matched", "alerts")
+
+    def __init__(self) -> None:
+        self.decoded = 0
+        self.decode_errors = 0
+        self.matched = 0
+        self.alerts = 0
+
+
+event_counts = {exchange: EventCounts() for exchange in Exchange}
+telegram_delivery: TelegramDelivery | None = None
+frame_recorder = (
+    FrameRecorder(
+        settings.FEED_RECORD_DIR,
+        max_bytes=settings.FEED_RECORD_MAX_BYTES,
+        keep=settings.FEED_RECORD_KEEP,
+    )
+    if settings.FEED_RECORD_DIR
+    else None
+)
+
+
+async def send_heartbeats(ws: Any, message: str, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await ws.send(message)
+
+
+async def forward_frames(
+    ws: Any,
+    exchange: Exchange,
+    queue: LiquidationQueue,
+    feed: FeedStatus,
+    connection: int = 0,
+):
+    decode = decoders[exchange]
+    dedup = event_dedup[exchange]
+    counts = event_counts[exchange]
+    recorder = frame_recorder
+    feed.connected()
+    logger.info("Connected to %s", feed.name, extra={"exchange": exchange, "feed": feed.name})
+    heartbeat = asyncio.create_task(
+        send_heartbeats(ws, HEARTBEATS[exchange], settings.FEED_HEARTBEAT_INTERVAL)
+    )
+    try:
+        async for msg in ws:
+            received_at = time.time()
+            feed.touch()
+            if recorder is not None:
+                recorder.record(exchange, connection, msg, received_at)
+            try:
+                events = decode(msg, received_at)
+            except Exception as e:
+                counts.decode_errors += 1
+                logger.warning(
+                    "%s decode error: %s", feed.name, e, extra={"exchange": exchange, "feed": feed.name}
+                )
+                continue
+            if not events:
+                continue
+            counts.decoded += len(events)
+            latency_stats.record("decode", exchange, time.time() - received_at)
+            for event in events:
+                if event.timestamp:
+                    latency_stats.record("wire", exchange, received_at - event.timestamp / 1000)
+                if not dedup.seen(event, connection):
+                    await queue.put(event)
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
 
 
 # ----------------------
 # Binance Listener
-async def binance_listener(bot: Bot):
-    url = "wss://fstream.binance.com/ws/!forceOrder@arr"
+async def binance_listener(queue: LiquidationQueue, url: str, connection: int, feed: FeedStatus):
     async with websockets.connect(url) as ws:
-        print("Connected to Binance")
-        async for msg in ws:
-            data = json.loads(msg)
-            await process_liquidation(
-                bot,
-                "Binance",
-                {
-                    "symbol": data["o"]["s"],
-                    "side": data["o"]["S"],
-                    "price": data["o"]["ap"],
-                    "quantity": data["o"]["q"],
-                    "link": f"https://www.binance.com/uk-UA/futures/{data['o']['s']}",
-                },
-            )
+        if not settings.BINANCE_SYMBOL_STREAMS:
+            return await forward_frames(ws, Exchange.BINANCE, queue, feed, connection)
+
+        streams = StreamSubscriptions(
+            ws, subscription_index, max_symbols=settings.BINANCE_SYMBOL_STREAMS_MAX
+        )
+        sync = asyncio.create_task(streams.run())
+        try:
+            await forward_frames(ws, Exchange.BINANCE, queue, feed, connection)
+        finally:
+            sync.cancel()
+            await asyncio.gather(sync, return_exceptions=True)
 
 
 # ----------------------
 # BitMEX Listener
-async def bitmex_listener(bot: Bot):
-    url = "wss://www.bitmex.com/realtime?subscribe=liquidation"
-    while True:
-        try:
-            async with websockets.connect(url, ping_interval=20, ping_timeout=20) as ws:
-                print("Connected to BitMEX")
-                async for msg in ws:
-                    data = json.loads(msg)
-                    if "data" in data:
-                        for order in data["data"]:
-                            await process_liquidation(
-                                bot,
-                                "BitMEX",
-                                {
-                                    "symbol": order["symbol"],
-                                    "side": order["side"],
-                                    "price": order["price"],
-                                    "quantity": order.get("leavesQty", 0),
-                                },
-                            )
-        except ConnectionClosedError as e:
-            print(f"BitMEX WS closed: {e}, reconnecting in 5s...")
-            await asyncio.sleep(5)
-        except Exception as e:
-            print(f"BitMEX error: {e}, reconnecting in 5s...")
-            await asyncio.sleep(5)
+async def bitmex_listener(queue: LiquidationQueue, url: str, connection: int, feed: FeedStatus):
+    async with websockets.connect(url, ping_interval=20, ping_timeout=20) as ws:
+        await forward_frames(ws, Exchange.BITMEX, queue, feed, connection)
 
 
 # ----------------------
 # OKX Listener
-async def okx_listener(bot: Bot):
-    url = "wss://ws.okx.com:8443/ws/v5/public"
+async def okx_listener(queue: LiquidationQueue, url: str, connection: int, feed: FeedStatus):
     async with websockets.connect(url) as ws:
-        print("Connected to OKX")
         await ws.send(
             json.dumps(
                 {
@@ -125,24 +236,76 @@ async def okx_listener(bot: Bot):
                 }
             )
         )
-        async for msg in ws:
-            data = json.loads(msg)
-            for entry in data.get("data", []):
-                await process_liquidation(
-                    bot,
-                    "OKX",
-                    {
-                        "symbol": entry["instId"],
-                        "side": entry["side"],
-                        "price": entry["p"],
-                        "quantity": entry["sz"],
-                    },
-                )
+        await forward_frames(ws, Exchange.OKX, queue, feed, connection)
+
+
+LISTENERS = {
+    Exchange.BINANCE: binance_listener,
+    Exchange.OKX: okx_listener,
+    Exchange.BITMEX: bitmex_listener,
+}
+
+
+def supervise(exchange: Exchange, queue: LiquidationQueue, connection: int = 0) -> FeedSupervisor:
+    urls = FEED_URLS[exchange]
+    return FeedSupervisor(
+        feed_status[exchange][connection],
+        partial(LISTENERS[exchange], queue, urls[connection % len(urls)], connection),
+        backoff_initial=settings.FEED_BACKOFF_INITIAL,
+        backoff_max=settings.FEED_BACKOFF_MAX,
+        stale_after=settings.FEED_STALE_AFTER,
+        rotate_after=settings.FEED_ROTATE_AFTER,
+        overlap=settings.FEED_ROTATE_OVERLAP,
+    )
+
+
+async def liquidation_worker(
+    delivery: TelegramDelivery,
+    queue: LiquidationQueue,
+    digests: AlertDigests | None = None,
+):
+    while True:
+        event = await queue.get()
+        if event.received_at:
+            latency_stats.record("queue", event.exchange, time.time() - event.received_at)
+        try:
+            await process_liquidation(delivery, event, digests)
+        except Exception:
+            logger.exception(
+                "Error processing %s liquidation",
+                event.exchange.label,
+                extra={"exchange": event.exchange, "symbol": event.symbol},
+            )
+        finally:
+            queue.task_done()
 
 
 async def start_handler(bot: Bot):
-    await asyncio.gather(
-        binance_listener(bot),
-        bitmex_listener(bot),
-        okx_listener(bot),
+    global telegram_delivery
+    await load_subscriptions()
+    delivery = telegram_delivery = TelegramDelivery(
+        bot,
+        workers=settings.TELEGRAM_WORKERS,
+        global_rate=settings.TELEGRAM_GLOBAL_RATE,
+        chat_rate=settings.TELEGRAM_CHAT_RATE,
+        max_retries=settings.TELEGRAM_MAX_RETRIES,
+        queue_size=settings.TELEGRAM_QUEUE_SIZE,
     )
+    delivery.start()
+    digests = AlertDigests(delivery, link_preview_options=LinkPreviewOptions(is_disabled=True))
+    try:
+        await asyncio.gather(
+            *(
+                liquidation_worker(delivery, liquidation_queue, digests)
+                for _ in range(settings.MONITOR_WORKERS)
+            ),
+            *(
+                supervise(exchange, liquidation_queue, connection).run()
+                for exchange in Exchange
+                for connection in range(settings.FEED_REDUNDANCY)
+            ),
+            *((frame_recorder.run(),) if frame_recorder is not None else ()),
+        )
+    finally:
+        if frame_recorder is not None:
+            await frame_recorder.close()
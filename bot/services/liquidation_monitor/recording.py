@@ -0,0 +1,190 @@
+import asyncio
+import gzip
+import json
+import logging
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, NamedTuple
+
+from bot.services.liquidation_monitor.decoders import Decoder, decoders as default_decoders
+from bot.services.liquidation_monitor.dedup import EventDeduplicator
+from bot.services.liquidation_monitor.event_queue import LiquidationQueue
+from bot.services.liquidation_monitor.events import Exchange
+
+
+logger = logging.getLogger(__name__)
+
+
+RECORDING_GLOB = "frames-*.jsonl.gz"
+
+
+class RecordedFrame(NamedTuple):
+    received_at: float
+    exchange: Exchange
+    connection: int
+    frame: str
+
+
+def recordings(directory: str | Path) -> list[Path]:
+    """Recording files in `directory`, oldest first."""
+    return sorted(Path(directory).glob(RECORDING_GLOB))
+
+
+class FrameRecorder:
+    """Appends every raw feed frame to rotating gzip-compressed JSON lines files.
+
+    `record` only buffers the frame with its receive time; encoding,
+    compression and file IO happen in a worker thread every
+    `flush_interval` seconds, so the listeners never wait on the disk. A
+    new file is started once the current one holds `max_bytes` of
+    uncompressed frames, and only the newest `keep` files are kept.
+    Frames arriving while `max_pending` are already waiting are dropped
+    and counted.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        max_bytes: int = 64 * 2**20,
+        keep: int = 24,
+        flush_interval: float = 1.0,
+        max_pending: int = 100_000,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.recorded = 0
+        self.dropped = 0
+        self.path: Path | None = None
+        self._pending: list[tuple[float, str, int, str]] = []
+        self._file: IO[bytes] | None = None
+        self._written = 0
+        self._lock = asyncio.Lock()
+
+    def record(self, exchange: Exchange, connection: int, frame: str, received_at: float | None = None) -> None:
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((received_at or time.time(), exchange.value, connection, frame))
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            records, self._pending = self._pending, []
+            await asyncio.to_thread(self._write, records)
+            self.recorded += len(records)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                # Recording is a diagnostic side path and must never take
+                # the monitor it runs alongside down with it
+                logger.exception("Frame recorder write failed")
+
+    async def close(self) -> None:
+        await self.flush()
+        async with self._lock:
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
+
+    def _write(self, records: list[tuple[float, str, int, str]]) -> None:
+        for record in records:
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode()
+            if self._file is None or self._written >= self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._written += len(line)
+        self._file.flush()
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        self.path = self.directory / f"frames-{stamp}.jsonl.gz"
+        self._file = gzip.open(self.path, "ab")
+        self._written = 0
+        for old in recordings(self.directory)[:-self.keep]:
+            old.unlink(missing_ok=True)
+
+
+def read_recording(paths: Iterable[str | Path]) -> Iterator[RecordedFrame]:
+    """Frames from recording files in the order given.
+
+    A file cut short by a crash is read up to its last complete frame.
+    """
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    received_at, exchange, connection, frame = json.loads(line)
+                    yield RecordedFrame(received_at, Exchange(exchange), connection, frame)
+            except (EOFError, json.JSONDecodeError):
+                logger.warning("Recording %s is truncated, skipping the rest", path)
+
+
+class ReplayStats:
+    __slots__ = ("frames", "events", "duplicates", "errors", "elapsed")
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.events = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+
+async def replay(
+    frames: Iterable[RecordedFrame],
+    queue: LiquidationQueue,
+    *,
+    speed: float = 1.0,
+    decoders: dict[Exchange, Decoder] | None = None,
+) -> ReplayStats:
+    """Feed recorded frames through decoding and deduplication into `queue`.
+
+    Frames are released at their recorded pacing divided by `speed`, or as
+    fast as the queue takes them when `speed` is 0. Every replay of the
+    same recording puts the same events on the queue in the same order,
+    since deduplication starts empty and follows the recorded arrivals.
+    """
+    decoders = decoders or default_decoders
+    dedup = {exchange: EventDeduplicator() for exchange in Exchange}
+    stats = ReplayStats()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    origin: float | None = None
+
+    for recorded in frames:
+        if speed:
+            if origin is None:
+                origin = recorded.received_at
+            delay = started + (recorded.received_at - origin) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        stats.frames += 1
+        try:
+            events = decoders[recorded.exchange](recorded.frame)
+        except Exception:
+            stats.errors += 1
+            continue
+        for event in events:
+            if dedup[recorded.exchange].seen(event, recorded.connection):
+                stats.duplicates += 1
+                continue
+            stats.events += 1
+            await queue.put(event)
+
+    stats.elapsed = loop.time() - started
+    return stats
@@ -0,0 +1,166 @@
+import sys
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from operator import itemgetter
+
+from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+
+
+BucketKey = tuple[str, str]
+
+
+@lru_cache(maxsize=None)
+def normalize_exchange(exchange: str) -> str:
+    return sys.intern(exchange.strip().lower())
+
+
+def normalize_symbol(symbol: str) -> str:
+    return sys.intern(symbol.strip().upper())
+
+
+class _Bucket:
+    """Subscribers of one (exchange, symbol), kept sorted by threshold."""
+
+    __slots__ = ("thresholds", "user_ids")
+
+    def __init__(self) -> None:
+        self.thresholds: list[float] = []
+        self.user_ids: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @classmethod
+    def from_pairs(cls, pairs: list[tuple[float, int]]) -> "_Bucket":
+        """Build a bucket from (threshold, user_id) pairs with a single sort."""
+        bucket = cls()
+        # Stable on threshold, so equal thresholds keep their order like `add`
+        pairs.sort(key=itemgetter(0))
+        bucket.thresholds = [threshold for threshold, _ in pairs]
+        bucket.user_ids = [user_id for _, user_id in pairs]
+        return bucket
+
+    def add(self, user_id: int, threshold: float) -> None:
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.user_ids.insert(i, user_id)
+
+    def discard(self, user_id: int, threshold: float) -> None:
+        lo = bisect_left(self.thresholds, threshold)
+        hi = bisect_right(self.thresholds, threshold, lo)
+        for i in range(lo, hi):
+            if self.user_ids[i] == user_id:
+                del self.thresholds[i]
+                del self.user_ids[i]
+                return
+
+    def up_to(self, usd_value: float) -> list[int]:
+        return self.user_ids[:bisect_right(self.thresholds, usd_value)]
+
+
+class SubscriptionIndex:
+    """Resident copy of the enabled monitor settings keyed by (exchange, symbol).
+
+    Built once at startup and kept in sync by the settings handlers, so
+    matching a liquidation never touches the database. Each bucket is sorted
+    by threshold, so a match is one bisect plus a slice of the recipients.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: dict[BucketKey, _Bucket] = {}
+        self._user_keys: dict[int, tuple[list[BucketKey], float]] = {}
+        self._digest_windows: dict[int, float] = {}
+        self._watchers: list[Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._user_keys)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._user_keys
+
+    def load(self, settings: Iterable[LiquidMonitorSettingsDB]) -> None:
+        self._buckets.clear()
+        self._user_keys.clear()
+        self._digest_windows.clear()
+        # Sorting each bucket once keeps a full load O(n log n); inserting
+        # row by row would shift the lists on every add
+        pairs: dict[BucketKey, list[tuple[float, int]]] = {}
+        for s in settings:
+            keys = self._register(s)
+            if keys:
+                pair = (s.threshold, s.user_id)
+                for key in keys:
+                    pairs.setdefault(key, []).append(pair)
+        self._buckets = {key: _Bucket.from_pairs(bucket_pairs) for key, bucket_pairs in pairs.items()}
+        self._notify()
+
+    def upsert(self, settings: LiquidMonitorSettingsDB) -> None:
+        self._remove(settings.user_id)
+        self._upsert(settings)
+        self._notify()
+
+    def remove(self, user_id: int) -> None:
+        if self._remove(user_id):
+            self._notify()
+
+    def _register(self, settings: LiquidMonitorSettingsDB) -> list[BucketKey]:
+        """Record the user's keys and digest window; return the buckets they belong in."""
+        if not settings.enabled:
+            return []
+
+        exchange = normalize_exchange(settings.exchange)
+        keys = list({(exchange, normalize_symbol(pair)) for pair in settings.pairs})
+        self._user_keys[settings.user_id] = (keys, settings.threshold)
+        if settings.digest_enabled and settings.digest_window > 0:
+            self._digest_windows[settings.user_id] = settings.digest_window
+        return keys
+
+    def _upsert(self, settings: LiquidMonitorSettingsDB) -> None:
+        for key in self._register(settings):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+            bucket.add(settings.user_id, settings.threshold)
+
+    def _remove(self, user_id: int) -> bool:
+        self._digest_windows.pop(user_id, None)
+        keys, threshold = self._user_keys.pop(user_id, ((), 0.0))
+        for key in keys:
+            bucket = self._buckets[key]
+            bucket.discard(user_id, threshold)
+            if not bucket:
+                del self._buckets[key]
+        return bool(keys)
+
+    def match(self, exchange: str, symbol: str, usd_value: float) -> list[int]:
+        """Return users whose threshold is at or below `usd_value`.
+
+        `exchange` must already be normalised with `normalize_exchange`.
+        """
+        bucket = self._buckets.get((exchange, symbol))
+        if bucket is None:
+            return []
+        return bucket.up_to(usd_value)
+
+    def symbols(self, exchange: str) -> set[str]:
+        """Symbols at least one enabled user watches on a normalised exchange."""
+        return {symbol for ex, symbol in self._buckets if ex == exchange}
+
+    def add_watcher(self, callback: Callable[[], None]) -> None:
+        """Call `callback` after every change to the index."""
+        self._watchers.append(callback)
+
+    def remove_watcher(self, callback: Callable[[], None]) -> None:
+        self._watchers.remove(callback)
+
+    def _notify(self) -> None:
+        for callback in self._watchers:
+            callback()
+
+    def digest_window(self, user_id: int) -> float:
+        """Coalescing window in seconds, 0.0 when the user wants every alert."""
+        return self._digest_windows.get(user_id, 0.0)
+
+
+subscription_index = SubscriptionIndex()
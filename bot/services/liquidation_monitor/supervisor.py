@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from enum import Enum
+
+
+logger = logging.getLogger(__name__)
+
+
+class FeedState(str, Enum):
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"
+    STOPPED = "stopped"
+
+
+class StaleFeedError(Exception):
+    pass
+
+
+class FeedStatus:
+    """Connection state of one feed, updated by its session and supervisor.
+
+    Downtime counts every second the feed was not connected, including the
+    time before the first connect, so it tells how long we were blind.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = FeedState.CONNECTING
+        self.connects = 0
+        self.reconnects = 0
+        self.rotations = 0
+        self.messages = 0
+        self.last_error: str | None = None
+        self.last_message_at = 0.0
+        self._down_since: float | None = time.monotonic()
+        self._downtime = 0.0
+        self._connect_waiters: list[asyncio.Future[None]] = []
+
+    @property
+    def downtime(self) -> float:
+        if self._down_since is None:
+            return self._downtime
+        return self._downtime + time.monotonic() - self._down_since
+
+    def connected(self) -> None:
+        now = time.monotonic()
+        if self._down_since is not None:
+            self._downtime += now - self._down_since
+            self._down_since = None
+        self.state = FeedState.CONNECTED
+        self.connects += 1
+        self.last_message_at = now
+        for waiter in self._connect_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._connect_waiters.clear()
+
+    def wait_connected(self) -> "asyncio.Future[None]":
+        """Future resolved by the next `connected` call."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._connect_waiters.append(waiter)
+        return waiter
+
+    def disconnected(self, error: BaseException | None = None) -> None:
+        if self._down_since is None:
+            self._down_since = time.monotonic()
+        self.state = FeedState.RECONNECTING
+        self.reconnects += 1
+        self.last_error = f"{type(error).__name__}: {error}" if error else "connection closed"
+
+    def touch(self) -> None:
+        self.messages += 1
+        self.last_message_at = time.monotonic()
+
+    def silent_for(self) -> float:
+        return time.monotonic() - self.last_message_at
+
+
+FeedSession = Callable[[FeedStatus], Awaitable[None]]
+
+
+class FeedSupervisor:
+    """Keeps one feed session running.
+
+    The session is restarted with exponential backoff and jitter whenever it
+    returns or raises, and a watchdog restarts it when a connected feed has
+    been silent for longer than `stale_after` seconds (0 disables it).
+
+    With `rotate_after` set, a replacement session is opened every
+    `rotate_after` seconds and the old one is only retired `overlap` seconds
+    after the new one connected, so scheduled reconnects leave no gap. Both
+    sessions feed the same pipeline meanwhile; the caller must deduplicate.
+    """
+
+    def __init__(
+        self,
+        status: FeedStatus,
+        session: FeedSession,
+        *,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0,
+        stale_after: float = 0.0,
+        rotate_after: float = 0.0,
+        overlap: float = 5.0,
+        connect_timeout: float = 30.0,
+    ):
+        self.status = status
+        self.session = session
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stale_after = stale_after
+        self.rotate_after = rotate_after
+        self.overlap = overlap
+        self.connect_timeout = connect_timeout
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def run(self) -> None:
+        attempt = 0
+        try:
+            while True:
+                connects = self.status.connects
+                error: BaseException | None = None
+                try:
+                    await self._run_session()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    error = e
+                self.status.disconnected(error)
+
+                attempt = 0 if self.status.connects > connects else attempt + 1
+                delay = self.backoff(attempt)
+                logger.warning(
+                    "%s feed down (%s), reconnecting in %.1fs...",
+                    self.status.name,
+                    self.status.last_error,
+                    delay,
+                    extra={"feed": self.status.name},
+                )
+                await asyncio.sleep(delay)
+        finally:
+            self.status.state = FeedState.STOPPED
+
+    def _check_interval(self) -> float | None:
+        intervals = [t for t in (self.stale_after / 4, self.rotate_after / 4) if t]
+        return min(intervals) if intervals else None
+
+    async def _run_session(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = asyncio.create_task(self.session(self.status))
+        started = loop.time()
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self._check_interval())
+                if done:
+                    return task.result()
+                if (
+                    self.stale_after
+                    and self.status.state is FeedState.CONNECTED
+                    and self.status.silent_for() > self.stale_after
+                ):
+                    raise StaleFeedError(f"no messages for {self.status.silent_for():.0f}s")
+                if self.rotate_after and loop.time() - started >= self.rotate_after:
+                    task = await self._rotate(task)
+                    started = loop.time()
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _rotate(self, old: "asyncio.Task[None]") -> "asyncio.Task[None]":
+        """Start a replacement session and retire `old` once both overlapped."""
+        connected = self.status.wait_connected()
+        new = asyncio.create_task(self.session(self.status))
+        try:
+            await asyncio.wait(
+                {connected, new}, timeout=self.connect_timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            replaced = connected.done()
+            if replaced:
+                await asyncio.wait({new}, timeout=self.overlap)
+                replaced = not new.done()
+        except BaseException:
+            new.cancel()
+            await asyncio.gather(new, return_exceptions=True)
+            raise
+        finally:
+            connected.cancel()
+
+        if not replaced:
+            new.cancel()
+            await asyncio.gather(new, return_exceptions=True)
+            logger.warning(
+                "%s rotation failed, keeping the current connection",
+                self.status.name,
+                extra={"feed": self.status.name},
+            )
+            return old
+
+        old.cancel()
+        await asyncio.gather(old, return_exceptions=True)
+        self.status.rotations += 1
+        return new
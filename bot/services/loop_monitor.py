@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, NamedTuple
+
+from bot.config.base import settings
+from bot.services.liquidation_monitor.latency import LatencyHistogram
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlowCallback(NamedTuple):
+    duration: float
+    task: str
+    stack: str
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop runs a callback scheduled `interval` ahead.
+
+    Any lag means something held the loop: a blocking call, a long
+    synchronous step, or simply more ready work than the loop can keep up
+    with.
+
+    With `slow_callback_budget` set, a watchdog thread also pings the loop
+    and, when a ping is not answered within the budget, captures the stack
+    of the loop thread and the task running at that moment, i.e. the code
+    that is blocking. The report is logged and kept in `slow_callbacks`
+    once the loop is responsive again.
+    """
+
+    def __init__(self, interval: float = 0.5, slow_callback_budget: float = 0.0, keep: int = 50):
+        self.interval = interval
+        self.slow_callback_budget = slow_callback_budget
+        self.histogram = LatencyHistogram()
+        self.last = 0.0
+        self.slow_callback_count = 0
+        self.slow_callbacks: deque[SlowCallback] = deque(maxlen=keep)
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.slow_callback_budget:
+            self._stop.clear()
+            threading.Thread(
+                target=self._watch, args=(loop, threading.get_ident()), name="loop-watchdog", daemon=True
+            ).start()
+        try:
+            while True:
+                started = loop.time()
+                await asyncio.sleep(self.interval)
+                self.last = max(0.0, loop.time() - started - self.interval)
+                self.histogram.record(self.last)
+        finally:
+            self._stop.set()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "samples": self.histogram.count,
+            "lag_last": self.last,
+            "lag_p50": self.histogram.quantile(0.5),
+            "lag_p99": self.histogram.quantile(0.99),
+            "lag_max": self.histogram.max,
+            "slow_callbacks": self.slow_callback_count,
+        }
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, thread_id: int) -> None:
+        budget = self.slow_callback_budget
+        while not self._stop.wait(budget / 2):
+            answered = threading.Event()
+            started = time.monotonic()
+            try:
+                loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:  # loop closed
+                return
+            if answered.wait(budget):
+                continue
+
+            frame = sys._current_frames().get(thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            # Read from another thread, so only good enough for a report
+            task = asyncio.current_task(loop)
+            while not answered.wait(budget) and not self._stop.is_set():
+                pass
+            report = SlowCallback(time.monotonic() - started, repr(task) if task else "", stack)
+            self.slow_callback_count += 1
+            self.slow_callbacks.append(report)
+            logger.warning(
+                "Event loop blocked for %.3fs%s:\n%s",
+                report.duration,
+                " in " + report.task if report.task else "",
+                report.stack,
+                extra={"latency": report.duration},
+            )
+
+
+loop_monitor = LoopLagMonitor(settings.LOOP_LAG_INTERVAL, settings.SLOW_CALLBACK_BUDGET)
@@ -0,0 +1,11 @@
+from .collectors import register_collectors
+from .registry import MetricsRegistry, registry
+from .server import start_metrics_server
+
+
+__all__ = [
+    "MetricsRegistry",
+    "register_collectors",
+    "registry",
+    "start_metrics_server",
+]
@@ -0,0 +1,154 @@
+from collections.abc import Iterator
+
+from bot.db.cache import identity_cache
+from bot.db.stats import query_stats, session_stats
+from bot.services.liquidation_monitor import liquidation_starter
+from bot.services.liquidation_monitor.event_queue import liquidation_queue
+from bot.services.liquidation_monitor.events import Exchange
+from bot.services.liquidation_monitor.latency import STAGES, LatencyHistogram, latency_stats
+from bot.services.liquidation_monitor.supervisor import FeedState
+from bot.services.loop_monitor import loop_monitor
+from bot.services.metrics.registry import Metric, MetricsRegistry, counter, gauge, histogram
+
+
+def feed_metrics() -> Iterator[Metric]:
+    connections = [
+        ({"exchange": exchange.value, "connection": status.name}, status)
+        for exchange, statuses in liquidation_starter.feed_status.items()
+        for status in statuses
+    ]
+    yield counter(
+        "liquidation_feed_frames_received_total", "Frames received from the exchange websocket.",
+        ((labels, status.messages) for labels, status in connections),
+    )
+    yield counter(
+        "liquidation_feed_reconnects_total", "Times the feed connection was lost and restarted.",
+        ((labels, status.reconnects) for labels, status in connections),
+    )
+    yield counter(
+        "liquidation_feed_rotations_total", "Scheduled connection rotations completed.",
+        ((labels, status.rotations) for labels, status in connections),
+    )
+    yield gauge(
+        "liquidation_feed_connected", "1 while the feed connection is up.",
+        ((labels, int(status.state is FeedState.CONNECTED)) for labels, status in connections),
+    )
+    yield counter(
+        "liquidation_feed_downtime_seconds_total", "Seconds the feed connection was not up.",
+        ((labels, status.downtime) for labels, status in connections),
+    )
+
+    exchanges = [({"exchange": exchange.value}, exchange) for exchange in liquidation_starter.event_counts]
+    counts = liquidation_starter.event_counts
+    yield counter(
+        "liquidation_events_decoded_total", "Liquidation events decoded from frames.",
+        ((labels, counts[exchange].decoded) for labels, exchange in exchanges),
+    )
+    yield counter(
+        "liquidation_decode_errors_total", "Frames that failed to decode.",
+        ((labels, counts[exchange].decode_errors) for labels, exchange in exchanges),
+    )
+    yield counter(
+        "liquidation_events_duplicate_total", "Events dropped as duplicates of an earlier arrival.",
+        ((labels, liquidation_starter.event_dedup[exchange].duplicates) for labels, exchange in exchanges),
+    )
+    # Per-connection arrival race, which shows whether redundant connections pay off
+    connection_name = liquidation_starter.connection_name
+    races = [
+        ({"exchange": exchange.value, "connection": connection_name(exchange, connection)}, stats)
+        for exchange, dedup in liquidation_starter.event_dedup.items()
+        for connection, stats in sorted(dedup.stats.items())
+    ]
+    yield counter(
+        "liquidation_feed_wins_total", "Events this connection delivered before any other.",
+        ((labels, stats.wins) for labels, stats in races),
+    )
+    yield counter(
+        "liquidation_feed_losses_total", "Events this connection delivered after another one already had.",
+        ((labels, stats.losses) for labels, stats in races),
+    )
+    yield counter(
+        "liquidation_feed_arrival_skew_seconds_total", "Summed delay of lost arrivals behind the first one.",
+        ((labels, stats.skew_total) for labels, stats in races),
+    )
+    yield gauge(
+        "liquidation_feed_arrival_skew_max_seconds", "Largest delay of a lost arrival behind the first one.",
+        ((labels, stats.skew_max) for labels, stats in races),
+    )
+    yield counter(
+        "liquidation_events_matched_total", "Events that matched at least one subscriber.",
+        ((labels, counts[exchange].matched) for labels, exchange in exchanges),
+    )
+    yield counter(
+        "liquidation_alerts_total", "Alerts generated for subscribers.",
+        ((labels, counts[exchange].alerts) for labels, exchange in exchanges),
+    )
+    yield histogram(
+        "liquidation_stage_latency_seconds", "Alert latency per pipeline stage.",
+        (
+            ({"stage": stage, "exchange": exchange.value}, h)
+            for (stage, exchange), h in sorted(latency_stats.histograms.items(), key=_stage_order)
+        ),
+    )
+
+
+def _stage_order(item: tuple[tuple[str, Exchange], LatencyHistogram]) -> tuple[int, str]:
+    (stage, exchange), _ = item
+    return STAGES.index(stage), exchange.value
+
+
+def queue_metrics() -> Iterator[Metric]:
+    yield gauge("liquidation_queue_depth", "Events waiting for a monitor worker.", [({}, liquidation_queue.depth)])
+    yield gauge("liquidation_queue_capacity", "Size of the event queue.", [({}, liquidation_queue.maxsize)])
+    yield counter(
+        "liquidation_queue_dropped_total", "Events dropped because the event queue was full.",
+        [({}, liquidation_queue.dropped)],
+    )
+
+    delivery = liquidation_starter.telegram_delivery
+    if delivery is None:
+        return
+    yield gauge("telegram_queue_depth", "Messages waiting to be sent.", [({}, delivery.depth)])
+    yield counter("telegram_messages_sent_total", "Messages Telegram accepted.", [({}, delivery.sent)])
+    yield counter("telegram_messages_failed_total", "Messages given up on.", [({}, delivery.failed)])
+    yield counter(
+        "telegram_rate_limited_total", "Sends answered with 429 Too Many Requests.", [({}, delivery.throttled)]
+    )
+
+
+def db_metrics() -> Iterator[Metric]:
+    verbs = sorted(query_stats.counts)
+    yield counter(
+        "db_queries_total", "Statements executed, by verb.",
+        (({"verb": verb}, query_stats.counts[verb]) for verb in verbs),
+    )
+    yield counter(
+        "db_query_seconds_total", "Time spent executing statements, by verb.",
+        (({"verb": verb}, query_stats.seconds[verb]) for verb in verbs),
+    )
+    yield counter("db_query_errors_total", "Statements that raised.", [({}, query_stats.errors)])
+    yield counter("db_pool_checkouts_total", "Connections checked out of the pool.", [({}, query_stats.checkouts)])
+    yield counter("bot_updates_total", "Telegram updates handled.", [({}, session_stats.updates)])
+    yield counter(
+        "db_sessions_opened_total", "Updates that used the database and so opened a session.",
+        [({}, session_stats.sessions)],
+    )
+    yield counter("crud_cache_hits_total", "Lookups served from the identity cache.", [({}, identity_cache.hits)])
+    yield counter("crud_cache_misses_total", "Lookups that went to the database.", [({}, identity_cache.misses)])
+    yield gauge("crud_cache_entries", "Rows held in the identity cache.", [({}, len(identity_cache))])
+
+
+def loop_metrics() -> Iterator[Metric]:
+    yield gauge("event_loop_lag_seconds", "Latest event-loop scheduling delay.", [({}, loop_monitor.last)])
+    yield histogram(
+        "event_loop_lag_histogram_seconds", "Event-loop scheduling delay.", [({}, loop_monitor.histogram)]
+    )
+    yield counter(
+        "event_loop_slow_callbacks_total", "Times the loop was blocked past the slow callback budget.",
+        [({}, loop_monitor.slow_callback_count)],
+    )
+
+
+def register_collectors(registry: MetricsRegistry) -> None:
+    for collector in (feed_metrics, queue_metrics, db_metrics, loop_metrics):
+        registry.register(collector)
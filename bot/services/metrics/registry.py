@@ -0,0 +1,77 @@
+from collections.abc import Callable, Iterable
+from typing import NamedTuple
+
+from bot.services.liquidation_monitor.latency import BUCKET_BOUNDS, LatencyHistogram
+
+
+Labels = dict[str, str]
+
+
+class Metric(NamedTuple):
+    name: str
+    kind: str  # counter | gauge | histogram
+    help: str
+    samples: list[tuple[str, Labels, float]]  # (name suffix, labels, value)
+
+
+Collector = Callable[[], Iterable[Metric]]
+
+
+def counter(name: str, help: str, samples: Iterable[tuple[Labels, float]]) -> Metric:
+    return Metric(name, "counter", help, [("", labels, value) for labels, value in samples])
+
+
+def gauge(name: str, help: str, samples: Iterable[tuple[Labels, float]]) -> Metric:
+    return Metric(name, "gauge", help, [("", labels, value) for labels, value in samples])
+
+
+def histogram(name: str, help: str, histograms: Iterable[tuple[Labels, LatencyHistogram]]) -> Metric:
+    samples = []
+    for labels, h in histograms:
+        cumulative = 0
+        for bound, count in zip(BUCKET_BOUNDS, h.counts):
+            cumulative += count
+            samples.append(("_bucket", {**labels, "le": f"{bound:.6g}"}, cumulative))
+        samples.append(("_bucket", {**labels, "le": "+Inf"}, h.count))
+        samples.append(("_sum", labels, h.total))
+        samples.append(("_count", labels, h.count))
+    return Metric(name, "histogram", help, samples)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        name += "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+    return f"{name} {value:.17g}" if isinstance(value, float) else f"{name} {value}"
+
+
+class MetricsRegistry:
+    """Collectors read the pipeline's own counters only when scraped.
+
+    Nothing is recorded through the registry: the hot path keeps bumping
+    plain attributes on the objects it already owns, and `render` turns
+    their current values into the Prometheus text exposition format.
+    """
+
+    def __init__(self) -> None:
+        self._collectors: list[Collector] = []
+
+    def register(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def collect(self) -> list[Metric]:
+        return [metric for collector in self._collectors for metric in collector()]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(_format(metric.name + suffix, labels, value) for suffix, labels, value in metric.samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,27 @@
+import logging
+
+from aiohttp import web
+
+from bot.services.metrics.registry import MetricsRegistry, registry as default_registry
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+
+async def start_metrics_server(
+    host: str, port: int, registry: MetricsRegistry = default_registry
+) -> web.AppRunner:
+    """Serve `registry` at /metrics; the caller cleans the returned runner up."""
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Metrics served at http://%s:%s/metrics", host, port)
+    return runner
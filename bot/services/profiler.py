@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from typing import NamedTuple
+
+from bot.config.base import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Hot-path functions, by (file name, function name), and the section their
+# samples are attributed to.
+SECTIONS = {
+    ("liquidation_starter.py", "forward_frames"): "feed",
+    ("decoders.py", "decode_binance"): "decode",
+    ("decoders.py", "decode_okx"): "decode",
+    ("decoders.py", "decode_bitmex"): "decode",
+    ("liquidation_starter.py", "process_liquidation"): "match",
+    ("delivery.py", "_deliver"): "delivery",
+}
+
+
+class ProfileResult(NamedTuple):
+    path: Path
+    duration: float
+    samples: int
+    sections: Counter[str]
+
+
+def _collapse(frame: FrameType | None) -> tuple[str, str | None]:
+    """Stack as a root-first `file:function;...` string and its innermost hot-path section."""
+    names = []
+    section = None
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        names.append(f"{filename}:{code.co_name}")
+        if section is None:
+            section = SECTIONS.get((filename, code.co_name))
+        frame = frame.f_back
+    return ";".join(reversed(names)), section
+
+
+class SamplingProfiler:
+    """Samples the event-loop thread's stack on a CPU-time timer.
+
+    Nothing runs while the profiler is idle, so it costs nothing until a
+    profile is requested. During a profile, SIGPROF fires every `interval`
+    seconds of CPU time and its handler, which runs on the loop thread
+    between bytecodes, records the stack that was executing. Sampling from
+    another thread instead would only see the loop whenever it released the
+    GIL, i.e. almost always waiting in select(). Samples that pass through
+    one of the hot-path `SECTIONS` are written to `directory` as a
+    collapsed-stack file for flamegraph.pl or speedscope, with CPU time per
+    section estimated from the sample counts; the rest are only counted.
+
+    Must be used from the main thread, where the bot's event loop runs.
+    """
+
+    def __init__(self, directory: str | Path, interval: float = 0.005, max_duration: float = 300.0):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.max_duration = max_duration
+        self.running = False
+
+    async def profile(self, duration: float) -> ProfileResult:
+        if self.running:
+            raise RuntimeError("A profile is already being collected")
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError("Profiling is only possible on the main thread")
+        duration = min(duration, self.max_duration)
+        self.running = True
+        stacks: Counter[str] = Counter()
+        sections: Counter[str] = Counter()
+
+        def sample(signum: int, frame: FrameType | None) -> None:
+            stack, section = _collapse(frame)
+            sections[section or "other"] += 1
+            if section is not None:
+                stacks[stack] += 1
+
+        previous = signal.signal(signal.SIGPROF, sample)
+        try:
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+            await asyncio.sleep(duration)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+            self.running = False
+        path = await asyncio.to_thread(self._dump, stacks)
+        return ProfileResult(path, duration, sum(sections.values()), sections)
+
+    def _dump(self, stacks: Counter[str]) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = self.directory / f"profile-{stamp}.collapsed"
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def summary(self, result: ProfileResult) -> str:
+        lines = [f"{result.samples} samples over {result.duration:g}s, saved to {result.path}"]
+        for section, count in result.sections.most_common():
+            lines.append(
+                f"{section}: {count * self.interval:.2f}s CPU ({count / max(result.samples, 1):.1%})"
+            )
+        return "\n".join(lines)
+
+
+profiler = SamplingProfiler(settings.PROFILE_DIR, settings.PROFILE_INTERVAL)
+
+
+async def profile_on_start(duration: float) -> None:
+    result = await profiler.profile(duration)
+    logger.info("Startup profile finished: %s", profiler.summary(result))
@@ -49,6 +49,16 @@ async def test_engine():
     await engine.dispose()
 
 
+@pytest.fixture(autouse=True)
+def clear_identity_cache():
+    """Start every test with an empty CRUD identity cache; the database is recreated per test."""
+    from bot.db.cache import identity_cache
+
+    identity_cache.clear()
+    yield
+    identity_cache.clear()
+
+
 @pytest.fixture(scope="function")
 async def db_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
     """Create a test database session."""
@@ -1,6 +1,8 @@
 """
 Tests for CRUD operations
 """
+from datetime import datetime
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -171,3 +173,327 @@ class TestLiquidationSettingsCRUD:
         assert len(enabled_settings) >= 1
         assert all(s.enabled for s in enabled_settings)
 
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestLiquidationSubscriptionCRUD:
+    """Tests for the normalised liquidation subscriptions."""
+
+    async def test_sync_subscriptions_mirrors_settings(
+        self, db_session: AsyncSession, test_engine, test_liquidation_settings
+    ):
+        """Test that one normalised row is stored per watched pair, replacing every exchange with one DELETE."""
+        from bot.db.stats import QueryStats, instrument_engine
+
+        await CRUD.liquidation_settings.set_subscriptions(
+            db_session, user_id=test_liquidation_settings.user_id, exchange="okx", symbols=["BTC"], threshold=1.0
+        )
+        test_liquidation_settings.exchange = " Binance"
+        test_liquidation_settings.pairs = ["btcusdt", "BTCUSDT", "ethusdt", ""]
+        stats = QueryStats()
+        instrument_engine(test_engine, stats)
+
+        await CRUD.liquidation_settings.sync_subscriptions(db_session, settings=test_liquidation_settings)
+
+        assert stats.counts["DELETE"] == 1
+
+        rows = await CRUD.liquidation_settings.get_subscriptions(db_session, test_liquidation_settings.user_id)
+        assert [(r.exchange, r.symbol, r.threshold) for r in rows] == [
+            ("binance", "BTCUSDT", test_liquidation_settings.threshold),
+            ("binance", "ETHUSDT", test_liquidation_settings.threshold),
+        ]
+
+    async def test_set_subscriptions_keeps_other_exchanges(
+        self, db_session: AsyncSession, test_user
+    ):
+        """Test that replacing one exchange's symbols leaves the others alone."""
+        crud = CRUD.liquidation_settings
+        await crud.set_subscriptions(
+            db_session, user_id=test_user.id, exchange="binance", symbols=["BTCUSDT"], threshold=1000.0
+        )
+        await crud.set_subscriptions(
+            db_session, user_id=test_user.id, exchange="okx", symbols=["BTC-USDT-SWAP"], threshold=2000.0
+        )
+        await crud.set_subscriptions(
+            db_session, user_id=test_user.id, exchange="binance", symbols=["ETHUSDT"], threshold=1000.0
+        )
+
+        rows = await crud.get_subscriptions(db_session, test_user.id)
+        assert [(r.exchange, r.symbol) for r in rows] == [("binance", "ETHUSDT"), ("okx", "BTC-USDT-SWAP")]
+
+        assert await crud.delete_subscriptions(db_session, user_id=test_user.id, exchange="OKX") == 1
+        assert len(await crud.get_subscriptions(db_session, test_user.id)) == 1
+
+    async def test_match_subscribers(self, db_session: AsyncSession, test_liquidation_settings):
+        """Test matching by exchange, symbol, threshold and the enabled flag."""
+        crud = CRUD.liquidation_settings
+        user_id = test_liquidation_settings.user_id
+        test_liquidation_settings.enabled = True
+        await crud.set_subscriptions(
+            db_session, user_id=user_id, exchange="binance", symbols=["BTCUSDT"], threshold=10000.0
+        )
+
+        assert await crud.match_subscribers(db_session, exchange="binance", symbol="BTCUSDT", usd_value=20000) == [user_id]
+        assert await crud.match_subscribers(db_session, exchange="Binance", symbol="btcusdt", usd_value=10000) == [user_id]
+        assert await crud.match_subscribers(db_session, exchange="binance", symbol="BTCUSDT", usd_value=5000) == []
+        assert await crud.match_subscribers(db_session, exchange="okx", symbol="BTCUSDT", usd_value=20000) == []
+
+        await crud.toggle_monitor(db_session, user_id=user_id, turn_on=False)
+        assert await crud.match_subscribers(db_session, exchange="binance", symbol="BTCUSDT", usd_value=20000) == []
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestBulkOperations:
+    """Tests for bulk create, update and upsert."""
+
+    async def test_bulk_create(self, db_session: AsyncSession):
+        """Test that rows are created in one call and returned in input order."""
+        objs_in = [UserCreate(id=500 - i, first_name=f"User {i}") for i in range(5)]
+
+        users = await CRUD.user.bulk_create(db_session, objs_in=objs_in, batch_size=2)
+
+        assert [u.id for u in users] == [500, 499, 498, 497, 496]
+        assert (await CRUD.user.get(db_session, id=498)).first_name == "User 2"
+        assert await CRUD.user.bulk_create(db_session, objs_in=[]) == []
+
+    async def test_bulk_update(self, db_session: AsyncSession):
+        """Test that only the fields set on each schema are written."""
+        await CRUD.user.bulk_create(
+            db_session, objs_in=[UserCreate(id=i, first_name="Old", last_name="Name") for i in (1, 2, 3)]
+        )
+
+        await CRUD.user.bulk_update(
+            db_session,
+            objs_in={1: UserUpdate(first_name="One"), 2: UserUpdate(first_name="Two"), 3: UserUpdate(last_name="Three")},
+        )
+
+        db_session.expire_all()
+        users = {u.id: u for u in await CRUD.user.get_multi(db_session, where_conditions=[])}
+        assert (users[1].first_name, users[1].last_name) == ("One", "Name")
+        assert (users[2].first_name, users[2].last_name) == ("Two", "Name")
+        assert (users[3].first_name, users[3].last_name) == ("Old", "Three")
+
+    async def test_upsert_many(self, db_session: AsyncSession, test_liquidation_settings):
+        """Test that conflicting rows are updated and new rows inserted."""
+        existing_user = test_liquidation_settings.user_id
+        test_liquidation_settings.updated_at = datetime(2000, 1, 1)
+        await db_session.commit()
+        await CRUD.user.create(db_session, obj_in=UserCreate(id=42))
+        objs_in = [
+            LiquidationSettingsCreate(user_id=existing_user, exchange="okx", pairs=["BTC-USDT-SWAP"], threshold=1.0),
+            LiquidationSettingsCreate(user_id=42, exchange="bitmex", pairs=["XBTUSD"], enabled=True),
+        ]
+
+        settings = await CRUD.liquidation_settings.upsert_many(
+            db_session, objs_in=objs_in, index_elements=["user_id"], update_fields=["exchange", "pairs"]
+        )
+
+        assert [s.user_id for s in settings] == [existing_user, 42]
+        assert settings[0].id == test_liquidation_settings.id
+        assert settings[0].exchange == "okx" and settings[0].pairs == ["BTC-USDT-SWAP"]
+        # Not in update_fields, so the stored values are kept
+        assert settings[0].threshold == test_liquidation_settings.threshold
+        assert settings[0].enabled is True
+        # The onupdate default still applies
+        assert settings[0].updated_at.year > 2000
+        assert settings[1].exchange == "bitmex" and settings[1].enabled is True
+        assert await CRUD.liquidation_settings.count(db_session, where_conditions=[]) == 2
+
+    async def test_upsert_many_needs_update_fields(self, db_session: AsyncSession):
+        """Test that an upsert with nothing to update is refused."""
+        with pytest.raises(ValueError):
+            await CRUD.user.upsert_many(
+                db_session, objs_in=[UserCreate(id=1)], index_elements=["id"], update_fields=[]
+            )
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestBatchedIteration:
+    """Tests for streaming and keyset-paginated iteration."""
+
+    @pytest.fixture
+    async def many_settings(self, db_session: AsyncSession):
+        """250 users with settings, every other one enabled."""
+        from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+        from bot.models.user import UserDB
+
+        db_session.add_all(UserDB(id=1000 + i, first_name=f"User {i}") for i in range(250))
+        db_session.add_all(
+            LiquidMonitorSettingsDB(
+                user_id=1000 + i, enabled=i % 2 == 0, threshold=0.0, exchange="binance", pairs=[]
+            )
+            for i in range(250)
+        )
+        await db_session.commit()
+
+    async def test_stream_multi_returns_every_row(self, db_session: AsyncSession, many_settings):
+        """Test that streaming is not capped at get_multi's default limit."""
+        from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+
+        rows = [
+            s async for s in CRUD.liquidation_settings.stream_multi(
+                db_session,
+                where_conditions=[LiquidMonitorSettingsDB.enabled.is_(True)],
+                batch_size=50,
+            )
+        ]
+
+        assert len(rows) == 125
+        assert all(s.enabled for s in rows)
+        assert [s.id for s in rows] == sorted(s.id for s in rows)
+
+    async def test_iter_batches_pages_by_primary_key(self, db_session: AsyncSession, many_settings):
+        """Test that batches are bounded, ordered and cover every row exactly once."""
+        from sqlalchemy import true
+
+        batches = [
+            batch async for batch in CRUD.user.iter_batches(
+                db_session, where_conditions=[true()], batch_size=100
+            )
+        ]
+
+        assert [len(batch) for batch in batches] == [100, 100, 50]
+        ids = [u.id for batch in batches for u in batch]
+        assert ids == sorted(set(ids))
+        assert ids[0] == 1000 and ids[-1] == 1249
+
+    async def test_iter_batches_empty(self, db_session: AsyncSession):
+        """Test that no batches are yielded when nothing matches."""
+        from sqlalchemy import false
+
+        batches = [
+            batch async for batch in CRUD.user.iter_batches(db_session, where_conditions=[false()])
+        ]
+
+        assert batches == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestIdentityCache:
+    """Tests for the read-through identity cache on CRUDBase."""
+
+    @pytest.fixture
+    def new_session(self, test_engine):
+        """Factory for sessions separate from db_session, like consecutive updates."""
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        return async_sessionmaker(bind=test_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def test_get_is_served_from_cache(self, new_session, test_liquidation_settings):
+        """Test that a second lookup in a new session hits the cache, with settings loaded."""
+        from bot.db.cache import identity_cache
+
+        user_id = test_liquidation_settings.user_id
+        async with new_session() as db:
+            await CRUD.user.get(db, id=user_id)
+        misses = identity_cache.misses
+
+        async with new_session() as db:
+            user = await CRUD.user.get(db, id=user_id)
+            assert user in db
+            assert user.liquid_monitor_settings.threshold == test_liquidation_settings.threshold
+
+        assert identity_cache.hits == 1
+        assert identity_cache.misses == misses
+
+    async def test_flushed_changes_invalidate(self, new_session, test_liquidation_settings):
+        """Test that updating a row, or a row it owns, drops the cached copy."""
+        user_id = test_liquidation_settings.user_id
+        async with new_session() as db:
+            user = await CRUD.user.get(db, id=user_id)
+            await CRUD.user.update(db, db_obj=user, obj_in=UserUpdate(first_name="Renamed"))
+        async with new_session() as db:
+            user = await CRUD.user.get(db, id=user_id)
+            assert user.first_name == "Renamed"
+            user.liquid_monitor_settings.threshold = 777.0
+            await db.commit()
+
+        async with new_session() as db:
+            user = await CRUD.user.get(db, id=user_id)
+            assert user.liquid_monitor_settings.threshold == 777.0
+
+    async def test_statements_invalidate(self, new_session, test_liquidation_settings):
+        """Test that toggle_monitor and delete_many, which bypass the flush, invalidate too."""
+        from bot.db.cache import identity_cache
+        from bot.models.user import UserDB
+
+        user_id = test_liquidation_settings.user_id
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=user_id)).liquid_monitor_settings.enabled is True
+            await CRUD.liquidation_settings.toggle_monitor(db, user_id=user_id, turn_on=False)
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=user_id)).liquid_monitor_settings.enabled is False
+            await CRUD.user.delete_many(db, ids=[user_id])
+
+        assert identity_cache.get(UserDB, user_id) is None
+        async with new_session() as db:
+            assert await CRUD.user.get(db, id=user_id) is None
+
+    async def test_bulk_create_invalidates_parent(self, new_session, test_user):
+        """Test that bulk_create drops the cached user the new settings belong to."""
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=test_user.id)).liquid_monitor_settings is None
+            await CRUD.liquidation_settings.bulk_create(
+                db,
+                objs_in=[LiquidationSettingsCreate(user_id=test_user.id, exchange="binance", pairs=["BTCUSDT"])],
+            )
+
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=test_user.id)).liquid_monitor_settings.exchange == "binance"
+
+    async def test_bulk_update_invalidates_parent(self, new_session, test_liquidation_settings):
+        """Test that bulk_update drops the cached user holding the updated settings."""
+        user_id = test_liquidation_settings.user_id
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=user_id)).liquid_monitor_settings.threshold == 1000.0
+            await CRUD.liquidation_settings.bulk_update(
+                db, objs_in={test_liquidation_settings.id: LiquidationSettingsUpdate(threshold=99.0)}
+            )
+
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=user_id)).liquid_monitor_settings.threshold == 99.0
+
+    async def test_delete_many_invalidates_parent(self, new_session, test_liquidation_settings):
+        """Test that delete_many drops the cached user holding the deleted settings."""
+        user_id = test_liquidation_settings.user_id
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=user_id)).liquid_monitor_settings is not None
+            deleted = await CRUD.liquidation_settings.delete_many(db, ids=[test_liquidation_settings.id])
+
+        assert deleted == 1
+        async with new_session() as db:
+            assert (await CRUD.user.get(db, id=user_id)).liquid_monitor_settings is None
+
+    async def test_bot_imports_in_fresh_process(self):
+        """Test that the entrypoint imports on its own, without conftest registering the models first."""
+        import os
+        import subprocess
+        import sys
+
+        env = {"BOT_TOKEN": "123:abc", "DATABASE_USER": "u", "DATABASE_DB": "d", **os.environ}
+        result = subprocess.run(
+            [sys.executable, "-c", "import bot.main"], env=env, capture_output=True, text=True, timeout=60
+        )
+
+        assert result.returncode == 0, result.stderr
+
+    async def test_lru_and_ttl(self, db_session: AsyncSession):
+        """Test that the cache is bounded and entries expire."""
+        from bot.db.cache import IdentityCache
+        from bot.models.user import UserDB
+
+        users = await CRUD.user.bulk_create(db_session, objs_in=[UserCreate(id=i) for i in (1, 2, 3)])
+        cache = IdentityCache(maxsize=2, ttl=60.0)
+        for user in users:
+            cache.put(user)
+
+        assert len(cache) == 2
+        assert cache.get(UserDB, 1) is None
+        assert cache.get(UserDB, 3).id == 3
+
+        cache.ttl = -1.0
+        cache.put(users[0])
+        assert cache.get(UserDB, 1) is None
+        assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
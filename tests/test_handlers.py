@@ -7,7 +7,9 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from aiogram.types import Message, User, Chat, CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.handlers import base, liquidation
+from bot import CRUD
+from bot.filters.user_filters import AdminFilter
+from bot.handlers import admin, base, liquidation
 from bot.schemas.user import UserCreate
 
 
@@ -98,6 +100,46 @@ class TestLiquidationHandlers:
         mock_message.answer.assert_called_once()
         mock_state.set_state.assert_called_once()
 
+    async def test_process_done_creates_settings(self, mock_callback, db_session: AsyncSession, test_user):
+        """Test that finishing the setup dialog creates enabled settings and subscriptions."""
+        from aiogram.fsm.context import FSMContext
+
+        mock_state = MagicMock(spec=FSMContext)
+        mock_state.get_data = AsyncMock(
+            return_value={"exchange": "binance", "threshold": 5000.0, "pairs": ["BTCUSDT"]}
+        )
+        mock_state.clear = AsyncMock()
+
+        await liquidation.process_done(mock_callback, mock_state, db_session, test_user)
+
+        settings = await CRUD.liquidation_settings.get_by_user_id(db_session, test_user.id)
+        assert settings.enabled is True
+        assert (settings.exchange, settings.threshold, settings.pairs) == ("binance", 5000.0, ["BTCUSDT"])
+        subscriptions = await CRUD.liquidation_settings.get_subscriptions(db_session, test_user.id)
+        assert [s.symbol for s in subscriptions] == ["BTCUSDT"]
+        mock_state.clear.assert_called_once()
+
+    async def test_process_done_updates_settings(
+        self, mock_callback, db_session: AsyncSession, test_liquidation_settings
+    ):
+        """Test that finishing the dialog again only changes the chosen fields."""
+        from aiogram.fsm.context import FSMContext
+        from bot.models.user import UserDB
+
+        user_db = await db_session.get(UserDB, test_liquidation_settings.user_id)
+        await CRUD.liquidation_settings.toggle_monitor(db_session, user_id=user_db.id, turn_on=False)
+        mock_state = MagicMock(spec=FSMContext)
+        mock_state.get_data = AsyncMock(return_value={"exchange": "okx", "pairs": ["BTC-USDT-SWAP"]})
+        mock_state.clear = AsyncMock()
+
+        await liquidation.process_done(mock_callback, mock_state, db_session, user_db)
+
+        settings = await CRUD.liquidation_settings.get_by_user_id(db_session, user_db.id)
+        assert settings.id == test_liquidation_settings.id
+        assert (settings.exchange, settings.pairs) == ("okx", ["BTC-USDT-SWAP"])
+        assert settings.threshold == 1000.0
+        assert settings.enabled is False
+
     async def test_cmd_show_lm_settings(
         self, mock_message, db_session: AsyncSession, test_liquidation_settings
     ):
@@ -150,6 +192,135 @@ class TestLiquidationHandlers:
         await db_session.refresh(test_liquidation_settings)
         assert len(test_liquidation_settings.pairs) == 3
         assert "SOLUSDT" in test_liquidation_settings.pairs
+        subscriptions = await CRUD.liquidation_settings.get_subscriptions(db_session, user_db.id)
+        assert sorted(s.symbol for s in subscriptions) == ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
         
         mock_message.answer.assert_called_once()
 
+
+    async def test_cmd_set_threshold_updates_index(
+        self, mock_message, db_session: AsyncSession, test_liquidation_settings
+    ):
+        """Test that /set_threshold is reflected in the subscription index."""
+        from bot.models.user import UserDB
+        from bot.services.liquidation_monitor import subscription_index
+
+        subscription_index.load([test_liquidation_settings])
+        user_db = await db_session.get(UserDB, test_liquidation_settings.user_id)
+        mock_message.text = "/set_threshold 50000"
+
+        await liquidation.cmd_set_threshold(mock_message, db_session, user_db)
+
+        assert subscription_index.match("binance", "BTCUSDT", 10000) == []
+        assert subscription_index.match("binance", "BTCUSDT", 50000) == [user_db.id]
+
+    async def test_cmd_set_digest(
+        self, mock_message, db_session: AsyncSession, test_liquidation_settings
+    ):
+        """Test /set_digest command enables and disables coalescing."""
+        from bot.models.user import UserDB
+        from bot.services.liquidation_monitor import subscription_index
+
+        user_db = await db_session.get(UserDB, test_liquidation_settings.user_id)
+        mock_message.text = "/set_digest 5"
+
+        await liquidation.cmd_set_digest(mock_message, db_session, user_db)
+
+        await db_session.refresh(test_liquidation_settings)
+        assert test_liquidation_settings.digest_enabled is True
+        assert test_liquidation_settings.digest_window == 5.0
+        assert subscription_index.digest_window(user_db.id) == 5.0
+
+        mock_message.text = "/set_digest off"
+        await liquidation.cmd_set_digest(mock_message, db_session, user_db)
+
+        await db_session.refresh(test_liquidation_settings)
+        assert test_liquidation_settings.digest_enabled is False
+        assert subscription_index.digest_window(user_db.id) == 0.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestAdminHandlers:
+    """Tests for admin-only handlers."""
+
+    async def test_admin_filter(self, mock_message):
+        """Test that only ids listed in ADMIN_IDS pass the admin filter."""
+        with patch("bot.filters.user_filters.settings") as mock_settings:
+            mock_settings.ADMIN_IDS = [mock_message.from_user.id]
+            assert await AdminFilter()(mock_message) is True
+
+            mock_settings.ADMIN_IDS = []
+            assert await AdminFilter()(mock_message) is False
+
+    async def test_cmd_profile(self, mock_message, tmp_path):
+        """Test that /profile collects a profile and reports where it was saved."""
+        mock_message.text = "/profile 0.05"
+        with patch.object(admin.profiler, "directory", tmp_path):
+            await admin.cmd_profile(mock_message)
+
+        assert mock_message.answer.await_count == 2
+        report = mock_message.answer.await_args.args[0]
+        assert "Profile done" in report
+        assert str(tmp_path) in report
+
+    async def test_cmd_profile_invalid_duration(self, mock_message):
+        """Test /profile with a duration that is not a number."""
+        mock_message.text = "/profile soon"
+        await admin.cmd_profile(mock_message)
+
+        mock_message.answer.assert_called_once_with("❗ Invalid format. Example: /profile 30")
+
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestMiddlewares:
+    """Tests for the session and user middlewares."""
+
+    @pytest.fixture
+    def session_maker(self, test_engine):
+        """Session maker bound to the test database."""
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        return async_sessionmaker(bind=test_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def test_session_opened_only_when_used(self, mock_message, session_maker):
+        """Test that updates not touching the database open no session."""
+        from sqlalchemy import text
+        from bot.db.stats import SessionStats
+        from bot.middlewares.db_session_middleware import DbSessionMiddleware
+
+        stats = SessionStats()
+        middleware = DbSessionMiddleware(session_maker, stats)
+        sessions = []
+
+        async def idle_handler(event, data):
+            sessions.append(data["db"])
+
+        async def db_handler(event, data):
+            sessions.append(data["db"])
+            return await data["db"].scalar(text("SELECT 1"))
+
+        await middleware(idle_handler, mock_message, {})
+        assert await middleware(db_handler, mock_message, {}) == 1
+
+        assert (stats.updates, stats.sessions) == (2, 1)
+        assert not sessions[0].opened
+        assert sessions[1].opened
+        assert not sessions[1].in_transaction()
+
+    async def test_user_lookup_skipped_for_no_db_handlers(self, mock_message):
+        """Test that handlers flagged NO_DB get no user lookup."""
+        from bot.middlewares.db_session_middleware import NO_DB
+        from bot.middlewares.user_middleware import UserMiddleware
+
+        handler = AsyncMock()
+        with patch.object(CRUD.user, "get", AsyncMock()) as get_user:
+            await UserMiddleware()(handler, mock_message, {"db": MagicMock(), "handler": MagicMock(flags=NO_DB)})
+            get_user.assert_not_called()
+
+            await UserMiddleware()(handler, mock_message, {"db": MagicMock(), "handler": MagicMock(flags={})})
+            get_user.assert_awaited_once()
+
+        assert handler.await_count == 2
@@ -1,16 +1,70 @@
 """
 Tests for service layer (liquidation monitoring)
 """
+import asyncio
+import json
+import logging
+import time
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import websockets
 from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiohttp import ClientSession
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from benchmarks.fake_exchange import FakeExchangeServer, Faults
+from benchmarks.fake_telegram import FakeTelegramServer
+from bot.config.log import JsonFormatter, RateLimitFilter, setup_logging
+from bot.services.liquidation_monitor.binance_streams import (
+    FIREHOSE,
+    StreamSubscriptions,
+    wanted_streams,
+)
+from bot.services.liquidation_monitor.decoders import BACKENDS, get_decoders
+from bot.services.liquidation_monitor.dedup import EventDeduplicator
+from bot.services.liquidation_monitor.delivery import TelegramDelivery, TokenBucket
+from bot.services.liquidation_monitor.digest import AlertDigests
+from bot.services.liquidation_monitor.event_queue import LiquidationQueue
+from bot.services.liquidation_monitor.events import Exchange, LiquidationEvent, Side, iso_to_ms
+from bot.db.stats import QueryStats, instrument_engine
+from bot.services.liquidation_monitor.latency import BUCKET_BOUNDS, LatencyHistogram, latency_stats
 from bot.services.liquidation_monitor.liquidation_starter import (
+    LISTENERS,
+    forward_frames,
     get_active_liq_settings,
+    liquidation_worker,
+    load_subscriptions,
     process_liquidation,
 )
+from bot.services.liquidation_monitor.recording import (
+    FrameRecorder,
+    RecordedFrame,
+    read_recording,
+    recordings,
+    replay,
+)
+from bot.services.liquidation_monitor.subscriptions import subscription_index
+from bot.services.liquidation_monitor.supervisor import FeedState, FeedStatus, FeedSupervisor
+from bot.services.loop_monitor import LoopLagMonitor
+from bot.services.profiler import SamplingProfiler
+from bot.services.metrics import MetricsRegistry, register_collectors, start_metrics_server
+from bot.services.metrics.registry import counter, histogram
+
+
+@pytest.fixture
+async def delivery():
+    """Delivery engine around a mock bot, with limits high enough not to slow tests."""
+    mock_bot = MagicMock(spec=Bot)
+    mock_bot.send_message = AsyncMock()
+    delivery = TelegramDelivery(mock_bot, global_rate=1000, chat_rate=1000)
+    delivery.start()
+    yield delivery
+    await delivery.close()
 
 
 @pytest.mark.asyncio
@@ -19,7 +73,7 @@ class TestLiquidationMonitor:
     """Tests for liquidation monitoring service."""
 
     async def test_get_active_liq_settings(
-        self, db_session: AsyncSession, test_liquidation_settings
+        self, db_session: AsyncSession, test_liquidation_settings, delivery
     ):
         """Test retrieving active liquidation settings."""
         # Ensure settings are enabled
@@ -38,7 +92,7 @@ class TestLiquidationMonitor:
             assert all(s.enabled for s in settings)
 
     async def test_process_liquidation_with_match(
-        self, db_session: AsyncSession, test_liquidation_settings
+        self, db_session: AsyncSession, test_liquidation_settings, delivery
     ):
         """Test processing liquidation that matches user criteria."""
         # Set up settings to match
@@ -48,34 +102,26 @@ class TestLiquidationMonitor:
         test_liquidation_settings.exchange = "binance"
         await db_session.commit()
         
-        mock_bot = MagicMock(spec=Bot)
-        mock_bot.send_message = AsyncMock()
+        mock_bot = delivery.bot
         
-        liquidation_info = {
-            "symbol": "BTCUSDT",
-            "side": "SELL",
-            "price": "50000",
-            "quantity": "0.1",
-            "link": "https://example.com",
-        }
+        liquidation_event = LiquidationEvent.create(
+            Exchange.BINANCE, "BTCUSDT", "SELL", 50000, 0.1
+        )
         
-        # Mock get_active_liq_settings
-        with patch(
-            "bot.services.liquidation_monitor.liquidation_starter.get_active_liq_settings"
-        ) as mock_get_settings:
-            mock_get_settings.return_value = [test_liquidation_settings]
-            
-            await process_liquidation(mock_bot, "Binance", liquidation_info)
-            
-            # Verify message was sent (USD value = 50000 * 0.1 = 5000 > 1000 threshold)
-            mock_bot.send_message.assert_called_once()
-            call_args = mock_bot.send_message.call_args
-            assert call_args[0][0] == test_liquidation_settings.user_id
-            assert "Liquidation" in call_args[0][1]
-            assert "BTCUSDT" in call_args[0][1]
+        subscription_index.load([test_liquidation_settings])
+
+        await process_liquidation(delivery, liquidation_event)
+        await delivery.join()
+        
+        # Verify message was sent (USD value = 50000 * 0.1 = 5000 > 1000 threshold)
+        mock_bot.send_message.assert_called_once()
+        call_args = mock_bot.send_message.call_args
+        assert call_args[0][0] == test_liquidation_settings.user_id
+        assert "Liquidation" in call_args[0][1]
+        assert "BTCUSDT" in call_args[0][1]
 
     async def test_process_liquidation_below_threshold(
-        self, db_session: AsyncSession, test_liquidation_settings
+        self, db_session: AsyncSession, test_liquidation_settings, delivery
     ):
         """Test processing liquidation below threshold."""
         test_liquidation_settings.enabled = True
@@ -84,28 +130,22 @@ class TestLiquidationMonitor:
         test_liquidation_settings.exchange = "binance"
         await db_session.commit()
         
-        mock_bot = MagicMock(spec=Bot)
-        mock_bot.send_message = AsyncMock()
+        mock_bot = delivery.bot
         
-        liquidation_info = {
-            "symbol": "BTCUSDT",
-            "side": "SELL",
-            "price": "50000",
-            "quantity": "0.1",  # USD value = 5000 < 10000 threshold
-        }
+        liquidation_event = LiquidationEvent.create(
+            Exchange.BINANCE, "BTCUSDT", "SELL", 50000, 0.1
+        )
         
-        with patch(
-            "bot.services.liquidation_monitor.liquidation_starter.get_active_liq_settings"
-        ) as mock_get_settings:
-            mock_get_settings.return_value = [test_liquidation_settings]
-            
-            await process_liquidation(mock_bot, "Binance", liquidation_info)
-            
-            # Should not send message (below threshold)
-            mock_bot.send_message.assert_not_called()
+        subscription_index.load([test_liquidation_settings])
+
+        await process_liquidation(delivery, liquidation_event)
+        await delivery.join()
+        
+        # Should not send message (below threshold)
+        mock_bot.send_message.assert_not_called()
 
     async def test_process_liquidation_wrong_pair(
-        self, db_session: AsyncSession, test_liquidation_settings
+        self, db_session: AsyncSession, test_liquidation_settings, delivery
     ):
         """Test processing liquidation for wrong trading pair."""
         test_liquidation_settings.enabled = True
@@ -114,28 +154,22 @@ class TestLiquidationMonitor:
         test_liquidation_settings.exchange = "binance"
         await db_session.commit()
         
-        mock_bot = MagicMock(spec=Bot)
-        mock_bot.send_message = AsyncMock()
+        mock_bot = delivery.bot
         
-        liquidation_info = {
-            "symbol": "BTCUSDT",  # Different symbol
-            "side": "SELL",
-            "price": "50000",
-            "quantity": "0.1",
-        }
+        liquidation_event = LiquidationEvent.create(
+            Exchange.BINANCE, "BTCUSDT", "SELL", 50000, 0.1
+        )
         
-        with patch(
-            "bot.services.liquidation_monitor.liquidation_starter.get_active_liq_settings"
-        ) as mock_get_settings:
-            mock_get_settings.return_value = [test_liquidation_settings]
-            
-            await process_liquidation(mock_bot, "Binance", liquidation_info)
-            
-            # Should not send message (wrong pair)
-            mock_bot.send_message.assert_not_called()
+        subscription_index.load([test_liquidation_settings])
+
+        await process_liquidation(delivery, liquidation_event)
+        await delivery.join()
+        
+        # Should not send message (wrong pair)
+        mock_bot.send_message.assert_not_called()
 
     async def test_process_liquidation_wrong_exchange(
-        self, db_session: AsyncSession, test_liquidation_settings
+        self, db_session: AsyncSession, test_liquidation_settings, delivery
     ):
         """Test processing liquidation from wrong exchange."""
         test_liquidation_settings.enabled = True
@@ -144,28 +178,22 @@ class TestLiquidationMonitor:
         test_liquidation_settings.exchange = "okx"  # Different exchange
         await db_session.commit()
         
-        mock_bot = MagicMock(spec=Bot)
-        mock_bot.send_message = AsyncMock()
+        mock_bot = delivery.bot
         
-        liquidation_info = {
-            "symbol": "BTCUSDT",
-            "side": "SELL",
-            "price": "50000",
-            "quantity": "0.1",
-        }
+        liquidation_event = LiquidationEvent.create(
+            Exchange.BINANCE, "BTCUSDT", "SELL", 50000, 0.1
+        )
         
-        with patch(
-            "bot.services.liquidation_monitor.liquidation_starter.get_active_liq_settings"
-        ) as mock_get_settings:
-            mock_get_settings.return_value = [test_liquidation_settings]
-            
-            await process_liquidation(mock_bot, "Binance", liquidation_info)
-            
-            # Should not send message (wrong exchange)
-            mock_bot.send_message.assert_not_called()
+        subscription_index.load([test_liquidation_settings])
+
+        await process_liquidation(delivery, liquidation_event)
+        await delivery.join()
+        
+        # Should not send message (wrong exchange)
+        mock_bot.send_message.assert_not_called()
 
     async def test_process_liquidation_long_vs_short(
-        self, db_session: AsyncSession, test_liquidation_settings
+        self, db_session: AsyncSession, test_liquidation_settings, delivery
     ):
         """Test liquidation type detection (long vs short)."""
         test_liquidation_settings.enabled = True
@@ -174,25 +202,1135 @@ class TestLiquidationMonitor:
         test_liquidation_settings.exchange = "binance"
         await db_session.commit()
         
-        mock_bot = MagicMock(spec=Bot)
-        mock_bot.send_message = AsyncMock()
+        mock_bot = delivery.bot
         
         # Test SELL (long liquidation)
-        liquidation_info = {
-            "symbol": "BTCUSDT",
-            "side": "SELL",
-            "price": "50000",
-            "quantity": "0.1",
-        }
+        liquidation_event = LiquidationEvent.create(
+            Exchange.BINANCE, "BTCUSDT", "SELL", 50000, 0.1
+        )
+        
+        subscription_index.load([test_liquidation_settings])
+
+        await process_liquidation(delivery, liquidation_event)
+        await delivery.join()
         
+        mock_bot.send_message.assert_called_once()
+        message_text = mock_bot.send_message.call_args[0][1]
+        assert "Long liquidation" in message_text or "📉" in message_text
+
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestSubscriptionIndex:
+    """Tests for the in-memory subscription index."""
+
+    async def test_load_subscriptions(
+        self, db_session: AsyncSession, test_liquidation_settings, delivery
+    ):
+        """Test building the index from enabled settings."""
         with patch(
             "bot.services.liquidation_monitor.liquidation_starter.get_active_liq_settings"
         ) as mock_get_settings:
             mock_get_settings.return_value = [test_liquidation_settings]
-            
-            await process_liquidation(mock_bot, "Binance", liquidation_info)
-            
-            mock_bot.send_message.assert_called_once()
-            message_text = mock_bot.send_message.call_args[0][1]
-            assert "Long liquidation" in message_text or "📉" in message_text
 
+            await load_subscriptions()
+
+        assert test_liquidation_settings.user_id in subscription_index
+        assert subscription_index.match("binance", "BTCUSDT", 5000) == [
+            test_liquidation_settings.user_id
+        ]
+
+    async def test_upsert_replaces_previous_settings(self, test_liquidation_settings):
+        """Test that upserting a user drops their old pairs."""
+        subscription_index.load([test_liquidation_settings])
+
+        test_liquidation_settings.pairs = ["SOLUSDT"]
+        subscription_index.upsert(test_liquidation_settings)
+
+        assert subscription_index.match("binance", "BTCUSDT", 5000) == []
+        assert subscription_index.match("binance", "SOLUSDT", 5000) == [
+            test_liquidation_settings.user_id
+        ]
+
+    async def test_upsert_disabled_removes_user(self, test_liquidation_settings):
+        """Test that disabled settings are not matched."""
+        subscription_index.load([test_liquidation_settings])
+
+        test_liquidation_settings.enabled = False
+        subscription_index.upsert(test_liquidation_settings)
+
+        assert test_liquidation_settings.user_id not in subscription_index
+        assert subscription_index.match("binance", "BTCUSDT", 5000) == []
+
+    async def test_remove(self, test_liquidation_settings):
+        """Test removing a user from the index."""
+        subscription_index.load([test_liquidation_settings])
+        subscription_index.remove(test_liquidation_settings.user_id)
+
+        assert len(subscription_index) == 0
+
+    async def test_match_returns_users_up_to_value(self):
+        """Test that only users with a threshold at or below the value match."""
+        from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+
+        subscription_index.load(
+            LiquidMonitorSettingsDB(
+                user_id=user_id,
+                enabled=True,
+                threshold=threshold,
+                exchange=" Binance",
+                pairs=["btcusdt"],
+            )
+            for user_id, threshold in [(1, 50000.0), (2, 1000.0), (3, 5000.0), (4, 5000.0)]
+        )
+
+        assert subscription_index.match("binance", "BTCUSDT", 999) == []
+        assert subscription_index.match("binance", "BTCUSDT", 5000) == [2, 3, 4]
+        assert subscription_index.match("binance", "BTCUSDT", 10**6) == [2, 3, 4, 1]
+
+        subscription_index.remove(3)
+        assert subscription_index.match("binance", "BTCUSDT", 5000) == [2, 4]
+
+    async def test_load_matches_incremental_upserts(self):
+        """Test that the sort-once bulk load orders buckets like inserting one by one."""
+        import random
+
+        from bot.models.liquid_monitor_settings import LiquidMonitorSettingsDB
+
+        rows = [
+            LiquidMonitorSettingsDB(
+                user_id=user_id,
+                enabled=True,
+                threshold=float(random.randrange(10)),
+                exchange="binance",
+                pairs=["BTCUSDT", "ETHUSDT"][: 1 + user_id % 2],
+            )
+            for user_id in range(200)
+        ]
+        subscription_index.load(rows)
+        loaded = {symbol: subscription_index.match("binance", symbol, 10**6) for symbol in ("BTCUSDT", "ETHUSDT")}
+
+        subscription_index.load([])
+        for row in rows:
+            subscription_index.upsert(row)
+
+        for symbol, user_ids in loaded.items():
+            assert subscription_index.match("binance", symbol, 10**6) == user_ids
+
+    async def test_symbols_and_watchers(self, test_liquidation_settings):
+        """Test listing watched symbols and notifying watchers of changes."""
+        changes = []
+        watcher = lambda: changes.append(1)  # noqa: E731
+        subscription_index.add_watcher(watcher)
+        try:
+            subscription_index.load([test_liquidation_settings])
+            assert subscription_index.symbols("binance") == set(test_liquidation_settings.pairs)
+            assert subscription_index.symbols("okx") == set()
+
+            subscription_index.remove(test_liquidation_settings.user_id)
+            subscription_index.remove(test_liquidation_settings.user_id)
+        finally:
+            subscription_index.remove_watcher(watcher)
+
+        assert subscription_index.symbols("binance") == set()
+        assert len(changes) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestLiquidationQueue:
+    """Tests for the bounded listener -> worker queue."""
+
+    async def test_drop_oldest(self):
+        """Test that a full queue sheds its oldest item."""
+        queue = LiquidationQueue(maxsize=2, overflow="drop_oldest")
+        for i in range(3):
+            await queue.put(LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", i, 1))
+
+        assert queue.depth == 2
+        assert queue.dropped == 1
+        assert (await queue.get()).price == 1
+
+    async def test_drop_newest(self):
+        """Test that a full queue rejects the incoming item."""
+        queue = LiquidationQueue(maxsize=2, overflow="drop_newest")
+        for i in range(3):
+            await queue.put(LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", i, 1))
+
+        assert queue.depth == 2
+        assert queue.dropped == 1
+        assert (await queue.get()).price == 0
+
+    async def test_worker_processes_queued_events(self, test_liquidation_settings, delivery):
+        """Test that workers deliver events put by listeners."""
+        subscription_index.load([test_liquidation_settings])
+        mock_bot = delivery.bot
+
+        queue = LiquidationQueue(maxsize=10)
+        worker = asyncio.create_task(liquidation_worker(delivery, queue))
+        await queue.put(LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", 50000, 0.1))
+        await asyncio.wait_for(queue.join(), timeout=1)
+        await delivery.join()
+        worker.cancel()
+
+        mock_bot.send_message.assert_called_once()
+        assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestTelegramDelivery:
+    """Tests for the rate-limited delivery engine."""
+
+    async def test_token_bucket_reserve(self):
+        """Test that reservations beyond the burst wait for refill."""
+        bucket = TokenBucket(rate=2, capacity=2)
+
+        assert bucket.reserve(0.0) == 0
+        assert bucket.reserve(0.0) == 0
+        assert bucket.reserve(0.0) == pytest.approx(0.5)
+        assert bucket.reserve(0.0) == pytest.approx(1.0)
+
+    async def test_send_counts(self, delivery):
+        """Test that successful and failed sends are counted."""
+        delivery.bot.send_message.side_effect = [None, RuntimeError("blocked"), None]
+        for chat_id in (1, 2, 3):
+            await delivery.send(chat_id, "text")
+        await delivery.join()
+
+        assert delivery.sent == 2
+        assert delivery.failed == 1
+
+    async def test_retry_after_pauses_chat_and_retries(self, delivery):
+        """Test that a flood-control error is retried after the pause."""
+        from aiogram.exceptions import TelegramRetryAfter
+
+        delivery.bot.send_message.side_effect = [
+            TelegramRetryAfter(method=MagicMock(), message="", retry_after=0),
+            None,
+        ]
+        await delivery.send(1, "text")
+        await delivery.join()
+
+        assert delivery.throttled == 1
+        assert delivery.sent == 1
+        assert delivery.bot.send_message.call_count == 2
+
+    async def test_retry_after_gives_up(self, delivery):
+        """Test that a message is dropped after the retry budget."""
+        from aiogram.exceptions import TelegramRetryAfter
+
+        delivery.bot.send_message.side_effect = TelegramRetryAfter(
+            method=MagicMock(), message="", retry_after=0
+        )
+        await delivery.send(1, "text")
+        await delivery.join()
+
+        assert delivery.throttled == delivery.max_retries + 1
+        assert delivery.failed == 1
+
+    async def test_paused_chat_does_not_block_workers(self):
+        """Test that with a single worker, a paused or throttled chat is parked while others are served."""
+        from aiogram.exceptions import TelegramRetryAfter
+
+        bot = MagicMock(spec=Bot)
+        bot.send_message = AsyncMock(
+            side_effect=[TelegramRetryAfter(method=MagicMock(), message="", retry_after=10), None, None]
+        )
+        delivery = TelegramDelivery(bot, workers=1, global_rate=1000, chat_rate=0.1)
+        delivery.start()
+        try:
+            await delivery.send(1, "paused")
+            await asyncio.sleep(0.01)
+            await delivery.send(2, "first")
+            await delivery.send(2, "throttled")
+            await delivery.send(3, "other")
+            await asyncio.sleep(0.05)
+
+            sent = [call.args for call in bot.send_message.call_args_list]
+            assert sent == [(1, "paused"), (2, "first"), (3, "other")]
+            assert delivery.throttled == 1
+            assert delivery.depth == 2
+        finally:
+            await delivery.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestAlertDigests:
+    """Tests for per-user alert coalescing."""
+
+    async def test_events_in_window_are_merged(self, test_liquidation_settings, delivery):
+        """Test that matches inside the window become one digest message."""
+        test_liquidation_settings.digest_enabled = True
+        test_liquidation_settings.digest_window = 0.01
+        subscription_index.load([test_liquidation_settings])
+        digests = AlertDigests(delivery)
+
+        for side, quantity in [("SELL", 0.1), ("BUY", 0.2), ("SELL", 0.3)]:
+            await process_liquidation(
+                delivery,
+                LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", side, 50000, quantity),
+                digests,
+            )
+        assert len(digests) == 1
+        await asyncio.sleep(0.05)
+        await delivery.join()
+
+        delivery.bot.send_message.assert_called_once()
+        text = delivery.bot.send_message.call_args[0][1]
+        assert "3 liquidations" in text
+        assert "30,000 USDT" in text
+        assert "Longs: 2 | 20,000 USDT" in text
+        assert "Shorts: 1 | 10,000 USDT" in text
+        assert "Largest: BTCUSDT [Binance] 15,000 USDT" in text
+
+    async def test_single_event_sent_as_plain_alert(self, test_liquidation_settings, delivery):
+        """Test that a window with one event sends the regular alert."""
+        test_liquidation_settings.digest_enabled = True
+        test_liquidation_settings.digest_window = 0.01
+        subscription_index.load([test_liquidation_settings])
+        digests = AlertDigests(delivery)
+
+        await process_liquidation(
+            delivery,
+            LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", 50000, 0.1),
+            digests,
+        )
+        await asyncio.sleep(0.05)
+        await delivery.join()
+
+        text = delivery.bot.send_message.call_args[0][1]
+        assert "Liquidation [Binance]" in text
+
+
+@pytest.mark.unit
+class TestLiquidationEvent:
+    """Tests for the normalised liquidation event."""
+
+    def test_create_normalises_fields(self):
+        """Test that raw feed values are parsed once on creation."""
+        event = LiquidationEvent.create(Exchange.OKX, "BTC-USDT-SWAP", "sell", "50000", "0.5", 1700000000000)
+
+        assert event.side is Side.SELL
+        assert event.price == 50000.0
+        assert event.quantity == 0.5
+        assert event.usd_value == 25000.0
+        assert event.timestamp == 1700000000000
+        assert event.exchange.label == "OKX"
+
+    def test_event_is_frozen(self):
+        """Test that events cannot be mutated between stages."""
+        import dataclasses
+
+        event = LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "BUY", 1, 1)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            event.price = 2.0  # type: ignore[misc]
+        assert not hasattr(event, "__dict__")
+
+    def test_unknown_side(self):
+        """Test that unexpected side values become None."""
+        assert Side.parse("Both") is None
+        assert Side.parse(None) is None
+
+    def test_iso_to_ms(self):
+        """Test BitMEX ISO timestamps are converted to epoch milliseconds."""
+        assert iso_to_ms("2023-11-14T22:13:20.000Z") == 1700000000000
+        assert iso_to_ms(None) == 0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("backend", list(BACKENDS))
+class TestDecoders:
+    """Tests for the per-exchange frame decoders, on every installed backend."""
+
+    def test_binance(self, backend):
+        """Test decoding a Binance forceOrder frame."""
+        frame = (
+            '{"e":"forceOrder","E":1568014460893,"o":{"s":"BTCUSDT","S":"SELL","o":"LIMIT",'
+            '"f":"IOC","q":"0.014","p":"9910","ap":"9910","X":"FILLED","l":"0.014",'
+            '"z":"0.014","T":1568014460890}}'
+        )
+        [event] = get_decoders(backend)[Exchange.BINANCE](frame)
+
+        assert event.exchange is Exchange.BINANCE
+        assert event.symbol == "BTCUSDT"
+        assert event.side is Side.SELL
+        assert event.usd_value == pytest.approx(138.74)
+        assert event.timestamp == 1568014460890
+
+    def test_binance_combined_stream(self, backend):
+        """Test decoding a forceOrder frame wrapped by a combined-stream connection."""
+        frame = (
+            '{"stream":"btcusdt@forceOrder","data":{"e":"forceOrder","E":1568014460893,'
+            '"o":{"s":"BTCUSDT","S":"BUY","q":"2","p":"100","ap":"100","T":1568014460890}}}'
+        )
+        [event] = get_decoders(backend)[Exchange.BINANCE](frame)
+
+        assert event.symbol == "BTCUSDT"
+        assert event.side is Side.BUY
+        assert event.usd_value == 200.0
+
+    def test_okx(self, backend):
+        """Test decoding an OKX liquidation-orders frame with several details."""
+        frame = (
+            '{"arg":{"channel":"liquidation-orders","instType":"FUTURES"},"data":[{"details":['
+            '{"bkLoss":"0","bkPx":"100","ccy":"","posSide":"short","side":"buy","sz":"2","ts":"1692266434010"},'
+            '{"bkLoss":"0","bkPx":"101","ccy":"","posSide":"long","side":"sell","sz":"3","ts":"1692266434011"}],'
+            '"instFamily":"BTC-USD","instId":"BTC-USD-251226","instType":"FUTURES","uly":"BTC-USD"}]}'
+        )
+        events = get_decoders(backend)[Exchange.OKX](frame)
+
+        assert [(e.side, e.usd_value, e.timestamp) for e in events] == [
+            (Side.BUY, 200.0, 1692266434010),
+            (Side.SELL, 303.0, 1692266434011),
+        ]
+        assert events[0].symbol == "BTC-USD-251226"
+
+    def test_bitmex_insert(self, backend):
+        """Test decoding a BitMEX liquidation insert."""
+        frame = (
+            '{"table":"liquidation","action":"insert","data":[{"orderID":"a","symbol":"XBTUSD",'
+            '"side":"Buy","price":50000.5,"leavesQty":100}]}'
+        )
+        [event] = get_decoders(backend)[Exchange.BITMEX](frame)
+
+        assert event.symbol == "XBTUSD"
+        assert event.side is Side.BUY
+        assert event.quantity == 100
+
+    @pytest.mark.parametrize(
+        "exchange, frame",
+        [
+            (Exchange.OKX, '{"event":"subscribe","arg":{"channel":"liquidation-orders"},"connId":"a"}'),
+            (Exchange.BITMEX, '{"info":"Welcome to the BitMEX Realtime API.","version":"1"}'),
+            (Exchange.BITMEX, '{"table":"liquidation","action":"partial","keys":["orderID"],"data":[]}'),
+            (Exchange.BITMEX, '{"table":"liquidation","action":"delete","data":[{"orderID":"a"}]}'),
+            (Exchange.BINANCE, '{"result":null,"id":1}'),
+        ],
+    )
+    def test_non_liquidation_frames_skipped(self, backend, exchange, frame):
+        """Test that acks and snapshots produce no events."""
+        assert get_decoders(backend)[exchange](frame) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestFeedSupervisor:
+    """Tests for feed reconnection and the stale-stream watchdog."""
+
+    async def test_backoff_grows_with_jitter(self):
+        """Test that the delay doubles per attempt, capped, with jitter."""
+        supervisor = FeedSupervisor(FeedStatus("test"), AsyncMock(), backoff_initial=1, backoff_max=8)
+
+        for attempt, ceiling in [(0, 1), (1, 2), (2, 4), (3, 8), (10, 8)]:
+            delay = supervisor.backoff(attempt)
+            assert ceiling / 2 <= delay <= ceiling
+
+    async def test_restarts_failed_session(self):
+        """Test that a failing session is restarted and the error recorded."""
+        status = FeedStatus("test")
+        calls = 0
+
+        async def session(feed: FeedStatus):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ConnectionError("refused")
+            feed.connected()
+            await asyncio.sleep(10)
+
+        supervisor = FeedSupervisor(status, session, backoff_initial=0.01, backoff_max=0.01)
+        task = asyncio.create_task(supervisor.run())
+        await asyncio.sleep(0.05)
+
+        assert calls == 2
+        assert status.state is FeedState.CONNECTED
+        assert status.reconnects == 1
+        assert "refused" in status.last_error
+        assert status.downtime > 0
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert status.state is FeedState.STOPPED
+
+    async def test_watchdog_reconnects_silent_feed(self):
+        """Test that a connected feed without messages is restarted."""
+        status = FeedStatus("test")
+        sessions = 0
+
+        async def session(feed: FeedStatus):
+            nonlocal sessions
+            sessions += 1
+            feed.connected()
+            await asyncio.sleep(10)
+
+        supervisor = FeedSupervisor(
+            status, session, backoff_initial=0.01, backoff_max=0.01, stale_after=0.04
+        )
+        task = asyncio.create_task(supervisor.run())
+        await asyncio.sleep(0.15)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert sessions >= 2
+        assert "StaleFeedError" in status.last_error
+
+    async def test_forward_frames(self):
+        """Test that a session marks the feed alive and queues decoded events."""
+        class FakeWebSocket:
+            def __init__(self, frames):
+                self.frames = frames
+                self.send = AsyncMock()
+
+            async def __aiter__(self):
+                for frame in self.frames:
+                    yield frame
+
+        ws = FakeWebSocket([
+            '{"event":"subscribe","arg":{"channel":"liquidation-orders"},"connId":"a"}',
+            "not json",
+            '{"arg":{},"data":[{"instId":"BTC-USD-251226","details":'
+            '[{"side":"buy","sz":"1","bkPx":"100","ts":"1"}]}]}',
+        ])
+        status = FeedStatus("OKX")
+        queue = LiquidationQueue(maxsize=10)
+
+        await forward_frames(ws, Exchange.OKX, queue, status)
+
+        assert status.connects == 1
+        assert status.messages == 3
+        assert queue.depth == 1
+        assert (await queue.get()).symbol == "BTC-USD-251226"
+
+        heartbeats = [task for task in asyncio.all_tasks() if task.get_coro().__name__ == "send_heartbeats"]
+        assert heartbeats == []
+
+    async def test_rotation_overlaps_connections(self):
+        """Test that a rotated feed connects the replacement before retiring the old one."""
+        status = FeedStatus("test")
+        live: set[int] = set()
+        max_live = 0
+        sessions = 0
+
+        async def session(feed: FeedStatus):
+            nonlocal max_live, sessions
+            sessions += 1
+            number = sessions
+            feed.connected()
+            live.add(number)
+            max_live = max(max_live, len(live))
+            try:
+                await asyncio.sleep(10)
+            finally:
+                live.discard(number)
+
+        supervisor = FeedSupervisor(status, session, rotate_after=0.04, overlap=0.01)
+        task = asyncio.create_task(supervisor.run())
+        await asyncio.sleep(0.15)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert status.rotations >= 1
+        assert status.reconnects == 0
+        assert max_live == 2
+        assert status.downtime < 0.05
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestBinanceStreams:
+    """Tests for per-symbol Binance stream subscriptions."""
+
+    async def test_wanted_streams_falls_back_to_firehose(self):
+        """Test per-symbol streams up to the limit and the all-market stream above it."""
+        assert wanted_streams({"BTCUSDT", "ETHUSDT"}, 2) == {"btcusdt@forceOrder", "ethusdt@forceOrder"}
+        assert wanted_streams({"BTCUSDT", "ETHUSDT", "SOLUSDT"}, 2) == {FIREHOSE}
+
+    async def test_sync_sends_difference(self, test_liquidation_settings):
+        """Test that only added and removed streams are (un)subscribed."""
+        ws = MagicMock()
+        ws.send = AsyncMock()
+        streams = StreamSubscriptions(ws, subscription_index, max_symbols=10)
+
+        with patch("bot.services.liquidation_monitor.binance_streams.asyncio.sleep", AsyncMock()):
+            test_liquidation_settings.pairs = ["BTCUSDT", "ETHUSDT"]
+            subscription_index.load([test_liquidation_settings])
+            await streams.sync()
+
+            test_liquidation_settings.pairs = ["ETHUSDT", "SOLUSDT"]
+            subscription_index.upsert(test_liquidation_settings)
+            await streams.sync()
+            await streams.sync()
+
+        sent = [json.loads(call.args[0]) for call in ws.send.await_args_list]
+        assert [(m["method"], m["params"]) for m in sent] == [
+            ("SUBSCRIBE", ["btcusdt@forceOrder", "ethusdt@forceOrder"]),
+            ("UNSUBSCRIBE", ["btcusdt@forceOrder"]),
+            ("SUBSCRIBE", ["solusdt@forceOrder"]),
+        ]
+        assert len({m["id"] for m in sent}) == 3
+
+    async def test_run_follows_index_changes(self, test_liquidation_settings):
+        """Test that index changes are pushed to the connection after the debounce."""
+        ws = MagicMock()
+        ws.send = AsyncMock()
+        subscription_index.load([])
+        streams = StreamSubscriptions(ws, subscription_index, debounce=0)
+        task = asyncio.create_task(streams.run())
+        await asyncio.sleep(0)
+
+        test_liquidation_settings.pairs = ["BTCUSDT"]
+        subscription_index.upsert(test_liquidation_settings)
+        for _ in range(50):
+            if streams.current:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert streams.current == {"btcusdt@forceOrder"}
+        assert subscription_index._watchers == []
+
+
+@pytest.mark.unit
+class TestEventDeduplicator:
+    """Tests for the recent-event identity cache."""
+
+    def test_duplicates_dropped(self):
+        """Test that the same event from two connections is seen once."""
+        dedup = EventDeduplicator(maxsize=10)
+        event = LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", 100, 1, 1700000000000)
+        copy = LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", "100", "1", 1700000000000)
+
+        assert dedup.seen(event) is False
+        assert dedup.seen(copy) is True
+        assert dedup.duplicates == 1
+
+    def test_bounded(self):
+        """Test that the oldest identities are evicted."""
+        dedup = EventDeduplicator(maxsize=2)
+        events = [
+            LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", 100, 1, ts)
+            for ts in (1, 2, 3)
+        ]
+        for event in events:
+            dedup.seen(event)
+
+        assert len(dedup) == 2
+        assert dedup.seen(events[0]) is False
+
+    def test_events_without_timestamp_never_duplicates(self):
+        """Test that events lacking an exchange time are always forwarded."""
+        dedup = EventDeduplicator()
+        event = LiquidationEvent.create(Exchange.BITMEX, "XBTUSD", "Sell", 100, 1000)
+
+        assert dedup.seen(event) is False
+        assert dedup.seen(event) is False
+
+    def test_first_arrival_wins(self):
+        """Test per-connection win rate and arrival skew across redundant connections."""
+        dedup = EventDeduplicator()
+        events = [
+            LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", 100, 1, ts)
+            for ts in (1, 2, 3, 4)
+        ]
+        for i, event in enumerate(events):
+            first, second = (0, 1) if i < 3 else (1, 0)
+            assert dedup.seen(event, first) is False
+            assert dedup.seen(event, second) is True
+
+        assert dedup.stats[0].win_rate == 0.75
+        assert dedup.stats[1].win_rate == 0.25
+        assert dedup.stats[1].losses == 3
+        assert dedup.stats[1].skew_max >= dedup.stats[1].skew_avg >= 0
+
+    def test_order_id_identity(self):
+        """Test that BitMEX events are deduplicated by order id."""
+        dedup = EventDeduplicator()
+        event = LiquidationEvent.create(Exchange.BITMEX, "XBTUSD", "Sell", 100, 1000, order_id="a")
+        other = LiquidationEvent.create(Exchange.BITMEX, "XBTUSD", "Sell", 100, 1000, order_id="b")
+
+        assert dedup.seen(event) is False
+        assert dedup.seen(other) is False
+        assert dedup.seen(event, 1) is True
+
+
+BINANCE_FRAME = (
+    '{"e":"forceOrder","E":2,"o":{"s":"BTCUSDT","S":"SELL","q":"1","p":"100","ap":"100","T":%d}}'
+)
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestFrameRecording:
+    """Tests for the raw frame recorder and the replay source."""
+
+    async def test_record_and_read_back(self, tmp_path):
+        """Test that recorded frames are read back in order with their metadata."""
+        recorder = FrameRecorder(tmp_path)
+        recorder.record(Exchange.BINANCE, 0, BINANCE_FRAME % 1, received_at=10.0)
+        recorder.record(Exchange.OKX, 1, "pong", received_at=11.0)
+        await recorder.close()
+
+        assert recorder.recorded == 2
+        assert list(read_recording(recordings(tmp_path))) == [
+            RecordedFrame(10.0, Exchange.BINANCE, 0, BINANCE_FRAME % 1),
+            RecordedFrame(11.0, Exchange.OKX, 1, "pong"),
+        ]
+
+    async def test_rotation_keeps_newest_files(self, tmp_path):
+        """Test that files rotate by size and old ones are deleted."""
+        recorder = FrameRecorder(tmp_path, max_bytes=1, keep=2)
+        for ts in range(5):
+            recorder.record(Exchange.BINANCE, 0, BINANCE_FRAME % ts, received_at=ts)
+        await recorder.close()
+
+        files = recordings(tmp_path)
+        assert len(files) == 2
+        assert [frame.received_at for frame in read_recording(files)] == [3, 4]
+
+    async def test_pending_frames_bounded(self, tmp_path):
+        """Test that frames beyond max_pending are dropped and counted."""
+        recorder = FrameRecorder(tmp_path, max_pending=1)
+        recorder.record(Exchange.BINANCE, 0, "a")
+        recorder.record(Exchange.BINANCE, 0, "b")
+        await recorder.close()
+
+        assert (recorder.recorded, recorder.dropped) == (1, 1)
+
+    async def test_run_survives_write_errors(self, tmp_path):
+        """Test that a frame that cannot be written is logged and later frames still get recorded."""
+        recorder = FrameRecorder(tmp_path, flush_interval=0.01)
+        task = asyncio.create_task(recorder.run())
+        try:
+            recorder.record(Exchange.BINANCE, 0, b"not json serialisable")
+            await asyncio.sleep(0.05)
+            recorder.record(Exchange.BINANCE, 0, "pong", received_at=1.0)
+            await asyncio.sleep(0.05)
+
+            assert not task.done()
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await recorder.close()
+
+        assert [frame.frame for frame in read_recording(recordings(tmp_path))] == ["pong"]
+
+    async def test_replay_decodes_and_deduplicates(self):
+        """Test that replay drops redundant arrivals and undecodable frames."""
+        frames = [
+            RecordedFrame(0.0, Exchange.BINANCE, 0, BINANCE_FRAME % 1),
+            RecordedFrame(0.1, Exchange.BINANCE, 1, BINANCE_FRAME % 1),
+            RecordedFrame(0.2, Exchange.BINANCE, 0, '{"forceOrder" broken'),
+            RecordedFrame(0.3, Exchange.BINANCE, 0, BINANCE_FRAME % 2),
+        ]
+        queue = LiquidationQueue(maxsize=10)
+
+        stats = await replay(frames, queue, speed=0)
+
+        assert (stats.frames, stats.events, stats.duplicates, stats.errors) == (4, 2, 1, 1)
+        assert [(await queue.get()).timestamp for _ in range(2)] == [1, 2]
+
+    async def test_replay_keeps_recorded_pacing(self):
+        """Test that frames are released at the recorded pacing scaled by speed."""
+        frames = [
+            RecordedFrame(100.0, Exchange.BINANCE, 0, BINANCE_FRAME % 1),
+            RecordedFrame(102.0, Exchange.BINANCE, 0, BINANCE_FRAME % 2),
+        ]
+
+        stats = await replay(frames, LiquidationQueue(maxsize=10), speed=20)
+
+        assert stats.elapsed == pytest.approx(0.1, abs=0.05)
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestFakeExchange:
+    """Tests running the feed listeners against the local fake exchange server."""
+
+    @pytest.mark.parametrize("exchange", list(Exchange))
+    async def test_listener_receives_liquidations(self, exchange):
+        """Test each listener completes its handshake and decodes the stream."""
+        queue = LiquidationQueue(maxsize=1000)
+        status = FeedStatus(exchange.label)
+        async with FakeExchangeServer(rate=500) as server:
+            task = asyncio.create_task(LISTENERS[exchange](queue, server.url(exchange), 0, status))
+            await wait_for(lambda: queue.depth >= 5)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        assert status.connects == 1
+        assert queue.depth >= 5
+        assert (await queue.get()).exchange is exchange
+
+    async def test_combined_stream_follows_subscriptions(self):
+        """Test that the combined endpoint only streams subscribed symbols."""
+        async with FakeExchangeServer(rate=500) as server:
+            async with websockets.connect(server.url(Exchange.BINANCE, combined=True)) as ws:
+                await ws.send(json.dumps({"method": "SUBSCRIBE", "params": ["ethusdt@forceOrder"], "id": 1}))
+                assert json.loads(await ws.recv()) == {"result": None, "id": 1}
+                frames = [json.loads(await ws.recv()) for _ in range(5)]
+
+        assert {frame["stream"] for frame in frames} == {"ethusdt@forceOrder"}
+        assert {frame["data"]["o"]["s"] for frame in frames} == {"ETHUSDT"}
+
+    async def test_disconnect_and_malformed_frames(self):
+        """Test that injected disconnects end the session and bad frames are skipped."""
+        queue = LiquidationQueue(maxsize=1000)
+        status = FeedStatus("Binance")
+        faults = Faults(disconnect_after=0.3, malformed=0.5)
+        async with FakeExchangeServer(rate=200, faults=faults, seed=1) as server:
+            await asyncio.wait_for(
+                LISTENERS[Exchange.BINANCE](queue, server.url(Exchange.BINANCE), 0, status), timeout=2
+            )
+
+        assert 0 < queue.depth < status.messages
+
+    async def test_stall_stops_frames(self):
+        """Test that a stalled connection goes silent."""
+        status = FeedStatus("OKX")
+        faults = Faults(stall_every=0.1, stall_for=10)
+        async with FakeExchangeServer(rate=500, faults=faults) as server:
+            task = asyncio.create_task(
+                LISTENERS[Exchange.OKX](LiquidationQueue(maxsize=1000), server.url(Exchange.OKX), 0, status)
+            )
+            await asyncio.sleep(0.3)
+            messages = status.messages
+            await asyncio.sleep(0.2)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        assert status.messages == messages
+
+
+@pytest.fixture
+async def fake_telegram():
+    async with FakeTelegramServer(global_rate=1000, chat_rate=1000) as server:
+        bot = Bot("123:fake", session=AiohttpSession(api=server.api))
+        yield server, bot
+        await bot.session.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestFakeTelegram:
+    """Tests delivering alerts through aiogram to the local fake Bot API."""
+
+    async def test_delivery_keeps_order_per_chat(self, fake_telegram):
+        """Test that every alert is delivered and a chat sees them in send order."""
+        server, bot = fake_telegram
+        delivery = TelegramDelivery(bot, workers=1, global_rate=1000, chat_rate=1000)
+        delivery.start()
+        for i in range(20):
+            await delivery.send(1 + i % 2, f"alert {i}")
+        await delivery.join()
+        await delivery.close()
+
+        assert delivery.sent == 20
+        assert [m.text for m in server.delivered if m.chat_id == 1] == [f"alert {i}" for i in range(0, 20, 2)]
+
+    async def test_rate_limit_is_retried(self, fake_telegram):
+        """Test that a 429 pauses the chat and the alert is delivered on retry."""
+        server, bot = fake_telegram
+        server.chat_rate = 1
+        delivery = TelegramDelivery(bot, global_rate=1000, chat_rate=1000)
+        delivery.start()
+        await delivery.send(1, "first")
+        await delivery.send(1, "second")
+        await delivery.join()
+        await delivery.close()
+
+        assert server.rate_limited >= 1
+        assert delivery.throttled == server.rate_limited
+        assert sorted(m.text for m in server.delivered) == ["first", "second"]
+
+    async def test_blocked_chat_fails(self, fake_telegram):
+        """Test that a chat which blocked the bot counts as failed without retries."""
+        server, bot = fake_telegram
+        server.blocked.add(7)
+        delivery = TelegramDelivery(bot, global_rate=1000, chat_rate=1000)
+        delivery.start()
+        await delivery.send(7, "alert")
+        await delivery.join()
+        await delivery.close()
+
+        assert (delivery.sent, delivery.failed, server.forbidden) == (0, 1, 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestLatencyStats:
+    """Tests for the per-stage latency histograms."""
+
+    async def test_histogram_quantiles(self):
+        """Test quantiles are bucket upper bounds within the bucket resolution."""
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(ms / 1000)
+
+        assert histogram.count == 100
+        assert histogram.mean == pytest.approx(0.0505)
+        assert 0.050 <= histogram.quantile(0.5) <= 0.050 * 1.34
+        assert 0.099 <= histogram.quantile(0.99) <= 0.1
+        assert histogram.quantile(1.0) == histogram.max == 0.1
+
+    async def test_histogram_memory_is_bounded(self):
+        """Test that outliers and negative skew land in the edge buckets."""
+        histogram = LatencyHistogram()
+        histogram.record(-1.0)
+        histogram.record(10_000.0)
+
+        assert len(histogram.counts) == len(BUCKET_BOUNDS) + 1
+        assert histogram.counts[0] == histogram.counts[-1] == 1
+        assert histogram.quantile(0.99) == 10_000.0
+
+    async def test_pipeline_records_every_stage(self, test_liquidation_settings):
+        """Test that an alert records wire, decode, queue, match, enqueue, send and total latency."""
+        latency_stats.clear()
+        subscription_index.load([test_liquidation_settings])
+        now_ms = int(time.time() * 1000)
+        frame = (
+            '{"e":"forceOrder","E":%d,"o":{"s":"BTCUSDT","S":"SELL","q":"1","p":"100000",'
+            '"ap":"100000","T":%d}}' % (now_ms, now_ms)
+        )
+
+        class FakeWebSocket:
+            send = AsyncMock()
+
+            async def __aiter__(self):
+                yield frame
+
+        bot = MagicMock(spec=Bot)
+        bot.send_message = AsyncMock()
+        delivery = TelegramDelivery(bot, global_rate=1000, chat_rate=1000)
+        delivery.start()
+        queue = LiquidationQueue(maxsize=10)
+        await forward_frames(FakeWebSocket(), Exchange.BINANCE, queue, FeedStatus("Binance"))
+        worker = asyncio.create_task(liquidation_worker(delivery, queue))
+        await queue.join()
+        await delivery.join()
+        worker.cancel()
+        await delivery.close()
+
+        for stage in ("wire", "decode", "queue", "match", "enqueue", "send", "total"):
+            assert latency_stats.get(stage, Exchange.BINANCE).count == 1, stage
+        assert latency_stats.get("total", Exchange.BINANCE).max < 5
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestMetrics:
+    """Tests for the Prometheus metrics endpoint and its collectors."""
+
+    async def test_render_text_format(self):
+        """Test counters with escaped labels and cumulative histogram buckets."""
+        registry = MetricsRegistry()
+        latency = LatencyHistogram()
+        latency.record(0.0001)
+        latency.record(50.0)
+        registry.register(lambda: [
+            counter("frames_total", "Frames.", [({"name": 'a"b'}, 3)]),
+            histogram("lag_seconds", "Lag.", [({}, latency)]),
+        ])
+
+        text = registry.render()
+
+        assert "# TYPE frames_total counter\n" in text
+        assert 'frames_total{name="a\\"b"} 3\n' in text
+        assert 'lag_seconds_bucket{le="0.0001"} 1\n' in text
+        assert 'lag_seconds_bucket{le="+Inf"} 2\n' in text
+        assert "lag_seconds_count 2\n" in text
+
+    async def test_endpoint_serves_collectors(self):
+        """Test scraping /metrics over HTTP."""
+        registry = MetricsRegistry()
+        register_collectors(registry)
+        runner = await start_metrics_server("127.0.0.1", 0, registry)
+        port = runner.addresses[0][1]
+        try:
+            async with ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    body = await response.text()
+                    content_type = response.headers["Content-Type"]
+        finally:
+            await runner.cleanup()
+
+        assert content_type.startswith("text/plain; version=0.0.4")
+        for name in (
+            'liquidation_feed_frames_received_total{exchange="binance",connection="Binance"}',
+            'liquidation_events_decoded_total{exchange="okx"}',
+            "liquidation_queue_depth ",
+            "event_loop_lag_seconds ",
+        ):
+            assert name in body
+
+    async def test_connection_race_metrics(self, monkeypatch):
+        """Test that per-connection wins, losses and arrival skew are exported."""
+        from bot.services.liquidation_monitor import liquidation_starter
+
+        dedup = EventDeduplicator()
+        monkeypatch.setitem(liquidation_starter.event_dedup, Exchange.BINANCE, dedup)
+        event = LiquidationEvent.create(Exchange.BINANCE, "BTCUSDT", "SELL", 100, 1, 1700000000000)
+        dedup.seen(event, 0)
+        dedup.seen(event, 1)
+        registry = MetricsRegistry()
+        register_collectors(registry)
+
+        text = registry.render()
+
+        assert 'liquidation_feed_wins_total{exchange="binance",connection="Binance"} 1\n' in text
+        assert 'liquidation_feed_losses_total{exchange="binance",connection="Binance#2"} 1\n' in text
+        assert 'liquidation_feed_arrival_skew_seconds_total{exchange="binance",connection="Binance#2"}' in text
+        assert 'liquidation_feed_arrival_skew_max_seconds{exchange="binance",connection="Binance#2"}' in text
+
+    async def test_query_stats(self, test_engine):
+        """Test that statements are counted and timed by verb."""
+        stats = QueryStats()
+        instrument_engine(test_engine, stats)
+        async with test_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM missing_table"))
+
+        assert stats.counts["SELECT"] >= 1
+        assert stats.seconds["SELECT"] > 0
+        assert stats.errors == 1
+        assert stats.checkouts == 1
+
+    async def test_loop_lag(self):
+        """Test that a blocking call shows up as loop lag."""
+        monitor = LoopLagMonitor(interval=0.01)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+        assert monitor.histogram.max >= 0.03
+
+    async def test_slow_callback_report(self):
+        """Test that a blocking step is reported with its task and stack."""
+        monitor = LoopLagMonitor(interval=0.01, slow_callback_budget=0.02)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+
+        async def blocking_step():
+            time.sleep(0.15)
+
+        await asyncio.create_task(blocking_step(), name="blocker")
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        [report] = monitor.slow_callbacks
+        assert report.duration >= 0.1
+        assert "blocker" in report.task
+        assert "blocking_step" in report.stack
+        assert monitor.stats()["slow_callbacks"] == 1
+        assert monitor.stats()["lag_max"] >= 0.1
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestSamplingProfiler:
+    """Tests for the opt-in sampling profiler."""
+
+    async def test_profile_attributes_hot_path(self, tmp_path):
+        """Test that decoder work shows up in the collapsed stacks and sections."""
+        profiler = SamplingProfiler(tmp_path, interval=0.001)
+        decode = get_decoders("json")[Exchange.BINANCE]
+        frame = BINANCE_FRAME % 1
+
+        async def busy():
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + 0.2
+            while loop.time() < deadline:
+                for _ in range(200):
+                    decode(frame)
+                await asyncio.sleep(0)
+
+        result, _ = await asyncio.gather(profiler.profile(0.2), busy())
+
+        assert not profiler.running
+        assert result.sections["decode"] > 0
+        lines = result.path.read_text().splitlines()
+        assert any("decoders.py:decode_binance" in line for line in lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+    async def test_one_profile_at_a_time(self, tmp_path):
+        """Test that a second profile is refused while one is running."""
+        profiler = SamplingProfiler(tmp_path)
+        first = asyncio.create_task(profiler.profile(0.05))
+        await asyncio.sleep(0)
+
+        with pytest.raises(RuntimeError):
+            await profiler.profile(0.05)
+        await first
+
+
+@pytest.mark.asyncio
+@pytest.mark.unit
+class TestStructuredLogging:
+    """Tests for JSON logging through the background queue."""
+
+    @staticmethod
+    def record(msg, *args, level=logging.WARNING, **extra):
+        record = logging.LogRecord("bot.test", level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    async def test_json_lines_carry_fields(self):
+        """Test that extra fields end up in the JSON line."""
+        record = self.record(
+            "Error sending message to %s: %s", 42, "blocked",
+            user_id=42, exchange=Exchange.BINANCE, symbol="BTCUSDT",
+        )
+
+        line = json.loads(JsonFormatter().format(record))
+
+        assert line["msg"] == "Error sending message to 42: blocked"
+        assert line["level"] == "WARNING"
+        assert line["user_id"] == 42
+        assert line["exchange"] == "binance"
+        assert line["symbol"] == "BTCUSDT"
+        assert "latency" not in line
+
+    async def test_rate_limit_collapses_repeats(self):
+        """Test that repeated errors are limited per key and the dropped count is reported."""
+        limit = RateLimitFilter(interval=60.0, burst=2)
+        passed = [limit.filter(self.record("Error sending message to %s", user_id)) for user_id in range(10)]
+
+        assert passed == [True, True] + [False] * 8
+        assert limit.filter(self.record("Other error"))
+        assert limit.filter(self.record("Info", level=logging.INFO))
+
+        limit.windows[("bot.test", "Error sending message to %s", None)][0] -= 60.0
+        record = self.record("Error sending message to %s", 11)
+        assert limit.filter(record)
+        assert record.suppressed == 8
+
+    async def test_setup_logging_writes_from_background_thread(self, capsys):
+        """Test that log calls are written to stdout by the queue listener."""
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        listener = setup_logging("INFO", "json", 60.0, 5)
+        try:
+            logging.getLogger("bot.test").info("Connected to %s", "Binance", extra={"feed": "Binance"})
+        finally:
+            listener.stop()
+            root.handlers[:] = handlers
+            root.setLevel(level)
+
+        line = json.loads(capsys.readouterr().out.strip())
+        assert line["msg"] == "Connected to Binance"
+        assert line["feed"] == "Binance"